@@ -104,7 +104,7 @@ class AdminService:
                 }
                 
         except Exception as e:
-            logger.error(f"Error getting bot statistics: {e}")
+            logger.error("Error getting bot statistics: %s", e)
             return {
                 "success": False,
                 "error": f"Failed to get statistics: {str(e)}"
@@ -150,7 +150,7 @@ class AdminService:
                 }
                 
         except Exception as e:
-            logger.error(f"Error getting user list: {e}")
+            logger.error("Error getting user list: %s", e)
             return {
                 "success": False,
                 "error": f"Failed to get user list: {str(e)}"
@@ -173,7 +173,7 @@ class AdminService:
             recent_conversions = self.db.get_conversion_history(user_id, 10)
             
             # هشدارهای کاربر
-            alerts = [a for a in self.db.get_active_price_alerts() if a["user_id"] == user_id]
+            alerts = self.db.get_active_price_alerts_for_user(user_id)
             
             return {
                 "success": True,
@@ -184,7 +184,7 @@ class AdminService:
             }
             
         except Exception as e:
-            logger.error(f"Error getting user details: {e}")
+            logger.error("Error getting user details: %s", e)
             return {
                 "success": False,
                 "error": f"Failed to get user details: {str(e)}"
@@ -209,7 +209,7 @@ class AdminService:
                     self.db.add_notification(user_id, "broadcast", message)
                     success_count += 1
                 except Exception as e:
-                    logger.error(f"Failed to add broadcast notification for user {user_id}: {e}")
+                    logger.error("Failed to add broadcast notification for user %s: %s", user_id, e)
                     failed_count += 1
             
             return {
@@ -221,7 +221,7 @@ class AdminService:
             }
             
         except Exception as e:
-            logger.error(f"Error broadcasting message: {e}")
+            logger.error("Error broadcasting message: %s", e)
             return {
                 "success": False,
                 "error": f"Failed to broadcast message: {str(e)}"
@@ -240,7 +240,7 @@ class AdminService:
             }
             
         except Exception as e:
-            logger.error(f"Error toggling maintenance mode: {e}")
+            logger.error("Error toggling maintenance mode: %s", e)
             return {
                 "success": False,
                 "error": f"Failed to toggle maintenance mode: {str(e)}"
@@ -287,7 +287,7 @@ class AdminService:
                 }
                 
         except Exception as e:
-            logger.error(f"Error managing cache: {e}")
+            logger.error("Error managing cache: %s", e)
             return {
                 "success": False,
                 "error": f"Failed to manage cache: {str(e)}"
@@ -314,7 +314,7 @@ class AdminService:
             }
             
         except Exception as e:
-            logger.error(f"Error getting all alerts: {e}")
+            logger.error("Error getting all alerts: %s", e)
             return {
                 "success": False,
                 "error": f"Failed to get alerts: {str(e)}"
@@ -332,7 +332,7 @@ class AdminService:
             }
             
         except Exception as e:
-            logger.error(f"Error getting recent logs: {e}")
+            logger.error("Error getting recent logs: %s", e)
             return {
                 "success": False,
                 "error": f"Failed to get logs: {str(e)}"
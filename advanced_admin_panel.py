@@ -3,6 +3,7 @@
 سیستم مدیریت کامل برای ادمین‌های ربات تبدیلا
 """
 
+import functools
 import logging
 import sqlite3
 from datetime import datetime, timedelta
@@ -17,6 +18,82 @@ from database import Database
 
 logger = logging.getLogger(__name__)
 
+# InlineKeyboardMarkup تغییرناپذیر است و بین پاسخ‌ها مشترک می‌ماند؛
+# کش در سطح ماژول است تا به نمونه پنل (self) گره نخورد
+@functools.lru_cache(maxsize=None)
+def _admin_keyboard() -> InlineKeyboardMarkup:
+    """کیبورد مدیریت"""
+    return GlassUI.get_admin_glass_keyboard()
+
+@functools.lru_cache(maxsize=256)
+def _user_management_keyboard(page: int, total_pages: int) -> InlineKeyboardMarkup:
+    """کیبورد مدیریت کاربران"""
+    keyboard = [
+        [
+            GlassUI.get_glass_button("📊 آمار کاربران", "admin_user_stats", emoji="📊"),
+            GlassUI.get_glass_button("🔍 جستجوی کاربر", "admin_search_user", emoji="🔍")
+        ],
+        [
+            GlassUI.get_glass_button("📋 لیست کاربران", "admin_user_list", emoji="📋"),
+            GlassUI.get_glass_button("➕ کاربر جدید", "admin_add_user", emoji="➕")
+        ]
+    ]
+
+    # صفحه‌بندی
+    if total_pages > 1:
+        pagination = GlassUI.get_pagination_glass_keyboard(page, total_pages, "admin_users")
+        keyboard.extend(pagination.inline_keyboard)
+
+    keyboard.append([
+        GlassUI.get_glass_button("🔙 بازگشت", "back_to_admin", emoji="🔙")
+    ])
+
+    return InlineKeyboardMarkup(keyboard)
+
+@functools.lru_cache(maxsize=None)
+def _broadcast_keyboard() -> InlineKeyboardMarkup:
+    """کیبورد ارسال پیام گروهی"""
+    keyboard = [
+        [
+            GlassUI.get_glass_button("📢 ارسال به همه", "admin_broadcast_all", emoji="📢"),
+            GlassUI.get_glass_button("👥 کاربران فعال", "admin_broadcast_active", emoji="👥")
+        ],
+        [
+            GlassUI.get_glass_button("🆕 کاربران جدید", "admin_broadcast_new", emoji="🆕"),
+            GlassUI.get_glass_button("🎯 انتخابی", "admin_broadcast_custom", emoji="🎯")
+        ],
+        [
+            GlassUI.get_glass_button("📊 آمار ارسال", "admin_broadcast_stats", emoji="📊"),
+            GlassUI.get_glass_button("📋 تاریخچه", "admin_broadcast_history", emoji="📋")
+        ],
+        [
+            GlassUI.get_glass_button("🔙 بازگشت", "back_to_admin", emoji="🔙")
+        ]
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
+@functools.lru_cache(maxsize=None)
+def _system_settings_keyboard() -> InlineKeyboardMarkup:
+    """کیبورد تنظیمات سیستم"""
+    keyboard = [
+        [
+            GlassUI.get_glass_button("🔧 حالت تعمیر", "admin_maintenance", emoji="🔧"),
+            GlassUI.get_glass_button("💾 مدیریت کش", "admin_cache", emoji="💾")
+        ],
+        [
+            GlassUI.get_glass_button("📊 آمار سیستم", "admin_system_stats", emoji="📊"),
+            GlassUI.get_glass_button("🔒 امنیت", "admin_security", emoji="🔒")
+        ],
+        [
+            GlassUI.get_glass_button("📋 لاگ‌ها", "admin_logs", emoji="📋"),
+            GlassUI.get_glass_button("🔄 پشتیبان‌گیری", "admin_backup", emoji="🔄")
+        ],
+        [
+            GlassUI.get_glass_button("🔙 بازگشت", "back_to_admin", emoji="🔙")
+        ]
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
 class AdvancedAdminPanel:
     """پنل مدیریت پیشرفته با قابلیت‌های کامل"""
     
@@ -61,7 +138,7 @@ class AdvancedAdminPanel:
             }
             
         except Exception as e:
-            logger.error(f"Error getting admin dashboard: {e}")
+            logger.error("Error getting admin dashboard: %s", e)
             return {
                 "success": False,
                 "error": f"Failed to get dashboard: {str(e)}"
@@ -149,7 +226,7 @@ class AdvancedAdminPanel:
                 }
                 
         except Exception as e:
-            logger.error(f"Error getting comprehensive stats: {e}")
+            logger.error("Error getting comprehensive stats: %s", e)
             return {
                 "users": {"total": 0, "active_24h": 0, "active_7d": 0, "new_24h": 0},
                 "conversions": {"total": 0, "last_24h": 0, "avg_response_time": 0},
@@ -182,7 +259,7 @@ class AdvancedAdminPanel:
             }
             
         except Exception as e:
-            logger.error(f"Error getting system status: {e}")
+            logger.error("Error getting system status: %s", e)
             return {"error": str(e)}
     
     async def check_database_status(self) -> Dict[str, Any]:
@@ -300,7 +377,7 @@ class AdvancedAdminPanel:
                     })
             
         except Exception as e:
-            logger.error(f"Error getting critical alerts: {e}")
+            logger.error("Error getting critical alerts: %s", e)
         
         return alerts
     
@@ -331,7 +408,7 @@ class AdvancedAdminPanel:
                 return activities
                 
         except Exception as e:
-            logger.error(f"Error getting recent activities: {e}")
+            logger.error("Error getting recent activities: %s", e)
             return []
     
     async def manage_users(self, action: str, user_id: Optional[int] = None, 
@@ -355,7 +432,7 @@ class AdvancedAdminPanel:
                 return {"success": False, "error": "Invalid action"}
                 
         except Exception as e:
-            logger.error(f"Error managing users: {e}")
+            logger.error("Error managing users: %s", e)
             return {"success": False, "error": str(e)}
     
     async def get_user_list_with_pagination(self, page: int = 1, limit: int = 20) -> Dict[str, Any]:
@@ -403,7 +480,7 @@ class AdvancedAdminPanel:
                 }
                 
         except Exception as e:
-            logger.error(f"Error getting user list: {e}")
+            logger.error("Error getting user list: %s", e)
             return {"success": False, "error": str(e)}
     
     async def block_user(self, user_id: int) -> Dict[str, Any]:
@@ -423,7 +500,7 @@ class AdvancedAdminPanel:
                 }
                 
         except Exception as e:
-            logger.error(f"Error blocking user: {e}")
+            logger.error("Error blocking user: %s", e)
             return {"success": False, "error": str(e)}
     
     async def unblock_user(self, user_id: int) -> Dict[str, Any]:
@@ -443,7 +520,7 @@ class AdvancedAdminPanel:
                 }
                 
         except Exception as e:
-            logger.error(f"Error unblocking user: {e}")
+            logger.error("Error unblocking user: %s", e)
             return {"success": False, "error": str(e)}
     
     async def delete_user(self, user_id: int) -> Dict[str, Any]:
@@ -466,7 +543,7 @@ class AdvancedAdminPanel:
                 }
                 
         except Exception as e:
-            logger.error(f"Error deleting user: {e}")
+            logger.error("Error deleting user: %s", e)
             return {"success": False, "error": str(e)}
     
     async def broadcast_message(self, message: str, target_type: str = "all", 
@@ -502,7 +579,7 @@ class AdvancedAdminPanel:
             }
             
         except Exception as e:
-            logger.error(f"Error broadcasting message: {e}")
+            logger.error("Error broadcasting message: %s", e)
             return {"success": False, "error": str(e)}
     
     async def get_all_user_ids(self) -> List[int]:
@@ -513,7 +590,7 @@ class AdvancedAdminPanel:
                 cursor.execute("SELECT user_id FROM users WHERE is_blocked = 0")
                 return [row[0] for row in cursor.fetchall()]
         except Exception as e:
-            logger.error(f"Error getting all user IDs: {e}")
+            logger.error("Error getting all user IDs: %s", e)
             return []
     
     async def get_active_user_ids(self) -> List[int]:
@@ -528,7 +605,7 @@ class AdvancedAdminPanel:
                 """)
                 return [row[0] for row in cursor.fetchall()]
         except Exception as e:
-            logger.error(f"Error getting active user IDs: {e}")
+            logger.error("Error getting active user IDs: %s", e)
             return []
     
     async def get_new_user_ids(self) -> List[int]:
@@ -543,7 +620,7 @@ class AdvancedAdminPanel:
                 """)
                 return [row[0] for row in cursor.fetchall()]
         except Exception as e:
-            logger.error(f"Error getting new user IDs: {e}")
+            logger.error("Error getting new user IDs: %s", e)
             return []
     
     async def toggle_maintenance_mode(self, enabled: bool) -> Dict[str, Any]:
@@ -565,7 +642,7 @@ class AdvancedAdminPanel:
             }
             
         except Exception as e:
-            logger.error(f"Error toggling maintenance mode: {e}")
+            logger.error("Error toggling maintenance mode: %s", e)
             return {"success": False, "error": str(e)}
     
     async def manage_cache(self, action: str) -> Dict[str, Any]:
@@ -607,7 +684,7 @@ class AdvancedAdminPanel:
                 }
                 
         except Exception as e:
-            logger.error(f"Error managing cache: {e}")
+            logger.error("Error managing cache: %s", e)
             return {"success": False, "error": str(e)}
     
     def format_dashboard_message(self, dashboard_data: Dict[str, Any]) -> str:
@@ -666,71 +743,17 @@ class AdvancedAdminPanel:
     
     def get_admin_keyboard(self) -> InlineKeyboardMarkup:
         """کیبورد مدیریت"""
-        return GlassUI.get_admin_glass_keyboard()
+        return _admin_keyboard()
     
     def get_user_management_keyboard(self, page: int = 1, total_pages: int = 1) -> InlineKeyboardMarkup:
         """کیبورد مدیریت کاربران"""
-        keyboard = [
-            [
-                GlassUI.get_glass_button("📊 آمار کاربران", "admin_user_stats", emoji="📊"),
-                GlassUI.get_glass_button("🔍 جستجوی کاربر", "admin_search_user", emoji="🔍")
-            ],
-            [
-                GlassUI.get_glass_button("📋 لیست کاربران", "admin_user_list", emoji="📋"),
-                GlassUI.get_glass_button("➕ کاربر جدید", "admin_add_user", emoji="➕")
-            ]
-        ]
-        
-        # صفحه‌بندی
-        if total_pages > 1:
-            pagination = GlassUI.get_pagination_glass_keyboard(page, total_pages, "admin_users")
-            keyboard.extend(pagination.inline_keyboard)
-        
-        keyboard.append([
-            GlassUI.get_glass_button("🔙 بازگشت", "back_to_admin", emoji="🔙")
-        ])
-        
-        return InlineKeyboardMarkup(keyboard)
+        return _user_management_keyboard(page, total_pages)
     
     def get_broadcast_keyboard(self) -> InlineKeyboardMarkup:
         """کیبورد ارسال پیام گروهی"""
-        keyboard = [
-            [
-                GlassUI.get_glass_button("📢 ارسال به همه", "admin_broadcast_all", emoji="📢"),
-                GlassUI.get_glass_button("👥 کاربران فعال", "admin_broadcast_active", emoji="👥")
-            ],
-            [
-                GlassUI.get_glass_button("🆕 کاربران جدید", "admin_broadcast_new", emoji="🆕"),
-                GlassUI.get_glass_button("🎯 انتخابی", "admin_broadcast_custom", emoji="🎯")
-            ],
-            [
-                GlassUI.get_glass_button("📊 آمار ارسال", "admin_broadcast_stats", emoji="📊"),
-                GlassUI.get_glass_button("📋 تاریخچه", "admin_broadcast_history", emoji="📋")
-            ],
-            [
-                GlassUI.get_glass_button("🔙 بازگشت", "back_to_admin", emoji="🔙")
-            ]
-        ]
-        return InlineKeyboardMarkup(keyboard)
+        return _broadcast_keyboard()
     
     def get_system_settings_keyboard(self) -> InlineKeyboardMarkup:
         """کیبورد تنظیمات سیستم"""
-        keyboard = [
-            [
-                GlassUI.get_glass_button("🔧 حالت تعمیر", "admin_maintenance", emoji="🔧"),
-                GlassUI.get_glass_button("💾 مدیریت کش", "admin_cache", emoji="💾")
-            ],
-            [
-                GlassUI.get_glass_button("📊 آمار سیستم", "admin_system_stats", emoji="📊"),
-                GlassUI.get_glass_button("🔒 امنیت", "admin_security", emoji="🔒")
-            ],
-            [
-                GlassUI.get_glass_button("📋 لاگ‌ها", "admin_logs", emoji="📋"),
-                GlassUI.get_glass_button("🔄 پشتیبان‌گیری", "admin_backup", emoji="🔄")
-            ],
-            [
-                GlassUI.get_glass_button("🔙 بازگشت", "back_to_admin", emoji="🔙")
-            ]
-        ]
-        return InlineKeyboardMarkup(keyboard)
+        return _system_settings_keyboard()
 
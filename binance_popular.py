@@ -9,6 +9,8 @@ import logging
 from typing import Dict, List, Any
 from datetime import datetime
 
+from tabdila_pro._json import json_loads
+
 logger = logging.getLogger(__name__)
 
 class BinancePopular:
@@ -42,7 +44,7 @@ class BinancePopular:
             response = requests.get(url, params=params, timeout=10)
             response.raise_for_status()
             
-            data = response.json()
+            data = json_loads(response.content)
             
             # Format the data
             popular_coins = []
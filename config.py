@@ -4,8 +4,8 @@ from typing import Dict, Any
 class Config:
     """Configuration settings for the bot"""
     
-    # Bot token (replace with your actual token)
-    BOT_TOKEN = "8308943984:AAGpg52VoSSpuwWRpVrDRZ-4SDA52__ybqQ"
+    # Bot token (set the TG_TOKEN environment variable)
+    BOT_TOKEN = os.getenv("TG_TOKEN", "")
     
     # Database settings
     DATABASE_URL = "sqlite:///bot.db"
@@ -4,15 +4,18 @@ import logging
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import asyncio
-import aiohttp
+
+from tabdila_pro._http import SharedSessionMixin
+from tabdila_pro._json import json_dumps, json_loads
 
 logger = logging.getLogger(__name__)
 
-class CurrencyConverter:
+class CurrencyConverter(SharedSessionMixin):
     """Advanced currency conversion with multiple APIs and crypto support"""
     
     def __init__(self, database):
         self.db = database
+        
         self.base_urls = {
             "exchangerate": "https://api.exchangerate.host",
             "fixer": "https://api.fixer.io",
@@ -35,11 +38,11 @@ class CurrencyConverter:
         
         # Check cache first
         cache_key = f"currency_{from_currency}_{to_currency}_{datetime.now().strftime('%Y%m%d%H')}"
-        cached_rate = self.db.get_from_cache(cache_key)
+        cached_rate = await self.db.aget_from_cache(cache_key)
         
         if cached_rate:
             try:
-                rate_data = json.loads(cached_rate)
+                rate_data = json_loads(cached_rate)
                 result = amount * rate_data.get('rate', 0)
                 return {
                     "success": True,
@@ -70,10 +73,10 @@ class CurrencyConverter:
                         "rate": result["rate"],
                         "timestamp": result.get("timestamp", datetime.now().isoformat())
                     }
-                    self.db.add_to_cache(cache_key, json.dumps(cache_data), 60)
+                    await self.db.aadd_to_cache(cache_key, json_dumps(cache_data), 60)
                     return result
             except Exception as e:
-                logger.warning(f"API {api_func.__name__} failed: {e}")
+                logger.warning("API %s failed: %s", api_func.__name__, e)
                 continue
         
         return {
@@ -94,21 +97,21 @@ class CurrencyConverter:
             "amount": amount
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if data.get("success"):
-                        return {
-                            "success": True,
-                            "amount": amount,
-                            "from_currency": from_currency,
-                            "to_currency": to_currency,
-                            "rate": data["info"]["rate"],
-                            "result": data["result"],
-                            "timestamp": data["date"],
-                            "source": "exchangerate.host"
-                        }
+        session = self._get_session()
+        async with session.get(url, params=params) as response:
+            if response.status == 200:
+                data = json_loads(await response.read())
+                if data.get("success"):
+                    return {
+                        "success": True,
+                        "amount": amount,
+                        "from_currency": from_currency,
+                        "to_currency": to_currency,
+                        "rate": data["info"]["rate"],
+                        "result": data["result"],
+                        "timestamp": data["date"],
+                        "source": "exchangerate.host"
+                    }
         
         return {"success": False, "error": "exchangerate.host API failed"}
     
@@ -125,22 +128,22 @@ class CurrencyConverter:
             "symbols": to_currency
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if data.get("success"):
-                        rate = data["rates"].get(to_currency, 0)
-                        return {
-                            "success": True,
-                            "amount": amount,
-                            "from_currency": from_currency,
-                            "to_currency": to_currency,
-                            "rate": rate,
-                            "result": amount * rate,
-                            "timestamp": data["date"],
-                            "source": "fixer.io"
-                        }
+        session = self._get_session()
+        async with session.get(url, params=params) as response:
+            if response.status == 200:
+                data = json_loads(await response.read())
+                if data.get("success"):
+                    rate = data["rates"].get(to_currency, 0)
+                    return {
+                        "success": True,
+                        "amount": amount,
+                        "from_currency": from_currency,
+                        "to_currency": to_currency,
+                        "rate": rate,
+                        "result": amount * rate,
+                        "timestamp": data["date"],
+                        "source": "fixer.io"
+                    }
         
         return {"success": False, "error": "Fixer API failed"}
     
@@ -157,26 +160,26 @@ class CurrencyConverter:
             "source": "USD"
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if data.get("success"):
-                        # CurrencyLayer returns rates relative to USD
-                        from_rate = data["quotes"].get(f"USD{from_currency}", 1)
-                        to_rate = data["quotes"].get(f"USD{to_currency}", 1)
-                        rate = to_rate / from_rate
-                        
-                        return {
-                            "success": True,
-                            "amount": amount,
-                            "from_currency": from_currency,
-                            "to_currency": to_currency,
-                            "rate": rate,
-                            "result": amount * rate,
-                            "timestamp": datetime.fromtimestamp(data["timestamp"]).isoformat(),
-                            "source": "currencylayer"
-                        }
+        session = self._get_session()
+        async with session.get(url, params=params) as response:
+            if response.status == 200:
+                data = json_loads(await response.read())
+                if data.get("success"):
+                    # CurrencyLayer returns rates relative to USD
+                    from_rate = data["quotes"].get(f"USD{from_currency}", 1)
+                    to_rate = data["quotes"].get(f"USD{to_currency}", 1)
+                    rate = to_rate / from_rate
+
+                    return {
+                        "success": True,
+                        "amount": amount,
+                        "from_currency": from_currency,
+                        "to_currency": to_currency,
+                        "rate": rate,
+                        "result": amount * rate,
+                        "timestamp": datetime.fromtimestamp(data["timestamp"]).isoformat(),
+                        "source": "currencylayer"
+                    }
         
         return {"success": False, "error": "CurrencyLayer API failed"}
     
@@ -187,11 +190,11 @@ class CurrencyConverter:
         
         # Check cache
         cache_key = f"crypto_{symbol}_{convert_to}_{datetime.now().strftime('%Y%m%d%H%M')}"
-        cached_price = self.db.get_from_cache(cache_key)
+        cached_price = await self.db.aget_from_cache(cache_key)
         
         if cached_price:
             try:
-                price_data = json.loads(cached_price)
+                price_data = json_loads(cached_price)
                 return {
                     "success": True,
                     "symbol": symbol,
@@ -213,10 +216,10 @@ class CurrencyConverter:
                         "price": result["price"],
                         "timestamp": result["timestamp"]
                     }
-                    self.db.add_to_cache(cache_key, json.dumps(cache_data), 5)
+                    await self.db.aadd_to_cache(cache_key, json_dumps(cache_data), 5)
                     return result
             except Exception as e:
-                logger.warning(f"CoinMarketCap API failed: {e}")
+                logger.warning("CoinMarketCap API failed: %s", e)
         
         # Fallback to free API
         try:
@@ -226,10 +229,10 @@ class CurrencyConverter:
                     "price": result["price"],
                     "timestamp": result["timestamp"]
                 }
-                self.db.add_to_cache(cache_key, json.dumps(cache_data), 5)
+                await self.db.aadd_to_cache(cache_key, json_dumps(cache_data), 5)
                 return result
         except Exception as e:
-            logger.warning(f"CoinGecko API failed: {e}")
+            logger.warning("CoinGecko API failed: %s", e)
         
         return {
             "success": False,
@@ -250,26 +253,26 @@ class CurrencyConverter:
             "convert": convert_to
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if data.get("status", {}).get("error_code") == 0:
-                        crypto_data = data["data"][symbol]
-                        quote = crypto_data["quote"][convert_to]
-                        
-                        return {
-                            "success": True,
-                            "symbol": symbol,
-                            "name": crypto_data["name"],
-                            "price": quote["price"],
-                            "currency": convert_to,
-                            "market_cap": quote.get("market_cap"),
-                            "volume_24h": quote.get("volume_24h"),
-                            "percent_change_24h": quote.get("percent_change_24h"),
-                            "timestamp": datetime.now().isoformat(),
-                            "source": "coinmarketcap"
-                        }
+        session = self._get_session()
+        async with session.get(url, headers=headers, params=params) as response:
+            if response.status == 200:
+                data = json_loads(await response.read())
+                if data.get("status", {}).get("error_code") == 0:
+                    crypto_data = data["data"][symbol]
+                    quote = crypto_data["quote"][convert_to]
+
+                    return {
+                        "success": True,
+                        "symbol": symbol,
+                        "name": crypto_data["name"],
+                        "price": quote["price"],
+                        "currency": convert_to,
+                        "market_cap": quote.get("market_cap"),
+                        "volume_24h": quote.get("volume_24h"),
+                        "percent_change_24h": quote.get("percent_change_24h"),
+                        "timestamp": datetime.now().isoformat(),
+                        "source": "coinmarketcap"
+                    }
         
         return {"success": False, "error": "CoinMarketCap API failed"}
     
@@ -284,24 +287,24 @@ class CurrencyConverter:
             "include_24hr_change": "true"
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if symbol.lower() in data:
-                        crypto_data = data[symbol.lower()]
-                        
-                        return {
-                            "success": True,
-                            "symbol": symbol,
-                            "price": crypto_data[convert_to.lower()],
-                            "currency": convert_to,
-                            "market_cap": crypto_data.get(f"{convert_to.lower()}_market_cap"),
-                            "volume_24h": crypto_data.get(f"{convert_to.lower()}_24h_vol"),
-                            "percent_change_24h": crypto_data.get(f"{convert_to.lower()}_24h_change"),
-                            "timestamp": datetime.now().isoformat(),
-                            "source": "coingecko"
-                        }
+        session = self._get_session()
+        async with session.get(url, params=params) as response:
+            if response.status == 200:
+                data = json_loads(await response.read())
+                if symbol.lower() in data:
+                    crypto_data = data[symbol.lower()]
+
+                    return {
+                        "success": True,
+                        "symbol": symbol,
+                        "price": crypto_data[convert_to.lower()],
+                        "currency": convert_to,
+                        "market_cap": crypto_data.get(f"{convert_to.lower()}_market_cap"),
+                        "volume_24h": crypto_data.get(f"{convert_to.lower()}_24h_vol"),
+                        "percent_change_24h": crypto_data.get(f"{convert_to.lower()}_24h_change"),
+                        "timestamp": datetime.now().isoformat(),
+                        "source": "coingecko"
+                    }
         
         return {"success": False, "error": "CoinGecko API failed"}
     
@@ -322,24 +325,24 @@ class CurrencyConverter:
     async def get_exchange_rates(self, base_currency: str = "USD") -> Dict[str, any]:
         """Get all exchange rates for a base currency"""
         cache_key = f"rates_{base_currency}_{datetime.now().strftime('%Y%m%d%H')}"
-        cached_rates = self.db.get_from_cache(cache_key)
+        cached_rates = await self.db.aget_from_cache(cache_key)
         
         if cached_rates:
             try:
-                return json.loads(cached_rates)
+                return json_loads(cached_rates)
             except json.JSONDecodeError:
                 pass
         
         url = f"{self.base_urls['exchangerate']}/latest"
         params = {"base": base_currency}
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if data.get("success"):
-                        self.db.add_to_cache(cache_key, json.dumps(data), 60)
-                        return data
+        session = self._get_session()
+        async with session.get(url, params=params) as response:
+            if response.status == 200:
+                data = json_loads(await response.read())
+                if data.get("success"):
+                    await self.db.aadd_to_cache(cache_key, json_dumps(data), 60)
+                    return data
         
         return {"success": False, "error": "Failed to get exchange rates"}
 
@@ -3,10 +3,10 @@
 سیستم مدیریت پایگاه داده SQLite برای ربات تبدیلا
 """
 
+import asyncio
 import sqlite3
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 import json
 
 logger = logging.getLogger(__name__)
@@ -68,6 +68,11 @@ class Database:
                     )
                 """)
                 
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_alerts_user
+                    ON price_alerts (user_id, is_active)
+                """)
+                
                 # جدول اعلان‌ها
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS notifications (
@@ -111,7 +116,7 @@ class Database:
                 logger.info("Database initialized successfully")
                 
         except Exception as e:
-            logger.error(f"Error initializing database: {e}")
+            logger.error("Error initializing database: %s", e)
     
     def register_user(self, user_id: int, username: str = None, 
                      first_name: str = None, last_name: str = None) -> bool:
@@ -127,7 +132,7 @@ class Database:
                 conn.commit()
                 return True
         except Exception as e:
-            logger.error(f"Error registering user: {e}")
+            logger.error("Error registering user: %s", e)
             return False
     
     def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
@@ -156,7 +161,7 @@ class Database:
                     }
                 return None
         except Exception as e:
-            logger.error(f"Error getting user: {e}")
+            logger.error("Error getting user: %s", e)
             return None
     
     def update_user_activity(self, user_id: int) -> bool:
@@ -171,7 +176,34 @@ class Database:
                 conn.commit()
                 return True
         except Exception as e:
-            logger.error(f"Error updating user activity: {e}")
+            logger.error("Error updating user activity: %s", e)
+            return False
+    
+    def write_user_batch(self, registrations: List[Tuple[int, Optional[str], Optional[str], Optional[str]]],
+                         active_user_ids: List[int]) -> bool:
+        """ثبت دسته‌ای کاربران و فعالیت آن‌ها در یک تراکنش"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                if registrations:
+                    cursor.executemany("""
+                        INSERT INTO users (user_id, username, first_name, last_name, last_activity)
+                        VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                        ON CONFLICT(user_id) DO UPDATE SET
+                            username = excluded.username,
+                            first_name = excluded.first_name,
+                            last_name = excluded.last_name,
+                            last_activity = CURRENT_TIMESTAMP
+                    """, registrations)
+                if active_user_ids:
+                    cursor.executemany("""
+                        UPDATE users SET last_activity = CURRENT_TIMESTAMP 
+                        WHERE user_id = ?
+                    """, [(user_id,) for user_id in dict.fromkeys(active_user_ids)])
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error("Error writing user batch: %s", e)
             return False
     
     def get_user_stats(self, user_id: int) -> Dict[str, Any]:
@@ -219,7 +251,7 @@ class Database:
                 }
                 
         except Exception as e:
-            logger.error(f"Error getting user stats: {e}")
+            logger.error("Error getting user stats: %s", e)
             return {
                 "total_conversions": 0,
                 "active_alerts": 0,
@@ -242,7 +274,7 @@ class Database:
                 conn.commit()
                 return True
         except Exception as e:
-            logger.error(f"Error adding conversion: {e}")
+            logger.error("Error adding conversion: %s", e)
             return False
     
     def get_conversion_history(self, user_id: int, limit: int = 10) -> List[Dict[str, Any]]:
@@ -271,7 +303,7 @@ class Database:
                 
                 return conversions
         except Exception as e:
-            logger.error(f"Error getting conversion history: {e}")
+            logger.error("Error getting conversion history: %s", e)
             return []
     
     def add_price_alert(self, user_id: int, symbol: str, target_price: float) -> bool:
@@ -287,42 +319,106 @@ class Database:
                 conn.commit()
                 return True
         except Exception as e:
-            logger.error(f"Error adding price alert: {e}")
+            logger.error("Error adding price alert: %s", e)
             return False
     
+    _ALERT_COLUMNS = "id, user_id, symbol, target_price, current_price, created_at, triggered_at"
+    
+    @staticmethod
+    def _alert_from_row(row) -> Dict[str, Any]:
+        return {
+            "id": row[0],
+            "user_id": row[1],
+            "symbol": row[2],
+            "target_price": row[3],
+            "current_price": row[4],
+            "created_at": row[5],
+            "triggered_at": row[6]
+        }
+    
     def get_active_price_alerts(self) -> List[Dict[str, Any]]:
         """دریافت هشدارهای فعال"""
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT id, user_id, symbol, target_price, current_price, 
-                           created_at, triggered_at
+                cursor.execute(f"""
+                    SELECT {self._ALERT_COLUMNS}
                     FROM price_alerts 
                     WHERE is_active = 1
                     ORDER BY created_at DESC
                 """)
-                
-                alerts = []
-                for row in cursor.fetchall():
-                    alerts.append({
-                        "id": row[0],
-                        "user_id": row[1],
-                        "symbol": row[2],
-                        "target_price": row[3],
-                        "current_price": row[4],
-                        "created_at": row[5],
-                        "triggered_at": row[6]
-                    })
-                
-                return alerts
+                return [self._alert_from_row(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error("Error getting active price alerts: %s", e)
+            return []
+    
+    def get_active_price_alerts_for_user(self, user_id: int) -> List[Dict[str, Any]]:
+        """هشدارهای فعال یک کاربر"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    SELECT {self._ALERT_COLUMNS}
+                    FROM price_alerts 
+                    WHERE user_id = ? AND is_active = 1
+                    ORDER BY created_at DESC
+                """, (user_id,))
+                return [self._alert_from_row(row) for row in cursor.fetchall()]
         except Exception as e:
-            logger.error(f"Error getting active price alerts: {e}")
+            logger.error("Error getting user price alerts: %s", e)
             return []
     
+    def count_active_alerts_for_user(self, user_id: int) -> int:
+        """تعداد هشدارهای فعال یک کاربر"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT COUNT(*) FROM price_alerts 
+                    WHERE user_id = ? AND is_active = 1
+                """, (user_id,))
+                return cursor.fetchone()[0]
+        except Exception as e:
+            logger.error("Error counting user price alerts: %s", e)
+            return 0
+    
+    def get_alert_by_id(self, alert_id: int) -> Optional[Dict[str, Any]]:
+        """دریافت یک هشدار فعال با شناسه"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    SELECT {self._ALERT_COLUMNS}
+                    FROM price_alerts 
+                    WHERE id = ? AND is_active = 1
+                """, (alert_id,))
+                row = cursor.fetchone()
+                return self._alert_from_row(row) if row else None
+        except Exception as e:
+            logger.error("Error getting price alert: %s", e)
+            return None
+    
+    def deactivate_price_alerts_bulk(self, alert_ids: List[int]) -> bool:
+        """غیرفعال‌سازی دسته‌ای هشدارهای فعال‌شده در یک تراکنش"""
+        if not alert_ids:
+            return True
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.executemany("""
+                    UPDATE price_alerts 
+                    SET is_active = 0, triggered_at = CURRENT_TIMESTAMP 
+                    WHERE id = ?
+                """, [(alert_id,) for alert_id in alert_ids])
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error("Error deactivating price alerts: %s", e)
+            return False
+    
     def add_notification(self, user_id: int, notification_type: str, 
-                        message: str, data: Dict = None) -> bool:
-        """اضافه کردن اعلان"""
+                        message: str, data: Dict = None) -> Optional[int]:
+        """اضافه کردن اعلان؛ شناسه ردیف جدید را برمی‌گرداند"""
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
@@ -333,23 +429,23 @@ class Database:
                     VALUES (?, ?, ?, ?)
                 """, (user_id, notification_type, message, data_json))
                 conn.commit()
-                return True
+                return cursor.lastrowid
         except Exception as e:
-            logger.error(f"Error adding notification: {e}")
-            return False
+            logger.error("Error adding notification: %s", e)
+            return None
     
-    def get_pending_notifications(self, limit: int = 100) -> List[Dict[str, Any]]:
-        """دریافت اعلان‌های در انتظار"""
+    def get_pending_notifications(self, limit: int = 100, after_id: int = 0) -> List[Dict[str, Any]]:
+        """دریافت اعلان‌های در انتظار؛ برای صفحه‌بندی، فقط شناسه‌های بزرگ‌تر از after_id"""
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     SELECT id, user_id, notification_type, message, data, created_at
                     FROM notifications 
-                    WHERE is_sent = 0
-                    ORDER BY created_at ASC
+                    WHERE is_sent = 0 AND id > ?
+                    ORDER BY id ASC
                     LIMIT ?
-                """, (limit,))
+                """, (after_id, limit))
                 
                 notifications = []
                 for row in cursor.fetchall():
@@ -365,7 +461,7 @@ class Database:
                 
                 return notifications
         except Exception as e:
-            logger.error(f"Error getting pending notifications: {e}")
+            logger.error("Error getting pending notifications: %s", e)
             return []
     
     def mark_notification_sent(self, notification_id: int) -> bool:
@@ -381,7 +477,25 @@ class Database:
                 conn.commit()
                 return True
         except Exception as e:
-            logger.error(f"Error marking notification as sent: {e}")
+            logger.error("Error marking notification as sent: %s", e)
+            return False
+    
+    def mark_notifications_sent_bulk(self, notification_ids: List[int]) -> bool:
+        """علامت‌گذاری دسته‌ای اعلان‌ها به عنوان ارسال شده در یک تراکنش"""
+        if not notification_ids:
+            return True
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.executemany("""
+                    UPDATE notifications 
+                    SET is_sent = 1, sent_at = CURRENT_TIMESTAMP 
+                    WHERE id = ?
+                """, [(notification_id,) for notification_id in notification_ids])
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error("Error marking notifications as sent: %s", e)
             return False
     
     def add_to_cache(self, cache_key: str, cache_data: str, 
@@ -390,16 +504,16 @@ class Database:
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
-                expires_at = datetime.now() + timedelta(minutes=expires_in_minutes)
+                # زمان انقضا به همان قالب UTC که CURRENT_TIMESTAMP برمی‌گرداند تا مقایسه رشته‌ای درست باشد
                 cursor.execute("""
                     INSERT OR REPLACE INTO api_cache 
-                    (cache_key, data, expires_at)
-                    VALUES (?, ?, ?)
-                """, (cache_key, cache_data, expires_at.isoformat()))
+                    (cache_key, cache_data, expires_at)
+                    VALUES (?, ?, datetime('now', ?))
+                """, (cache_key, cache_data, f"{int(expires_in_minutes):+d} minutes"))
                 conn.commit()
                 return True
         except Exception as e:
-            logger.error(f"Error adding to cache: {e}")
+            logger.error("Error adding to cache: %s", e)
             return False
     
     def get_from_cache(self, cache_key: str) -> Optional[str]:
@@ -408,16 +522,25 @@ class Database:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
-                    SELECT data FROM api_cache 
+                    SELECT cache_data FROM api_cache 
                     WHERE cache_key = ? AND expires_at > CURRENT_TIMESTAMP
                 """, (cache_key,))
                 
                 row = cursor.fetchone()
                 return row[0] if row else None
         except Exception as e:
-            logger.error(f"Error getting from cache: {e}")
+            logger.error("Error getting from cache: %s", e)
             return None
     
+    async def aadd_to_cache(self, cache_key: str, cache_data: str,
+                            expires_in_minutes: int = 5) -> bool:
+        """add_to_cache در thread جدا تا event loop منتظر دیسک نماند"""
+        return await asyncio.to_thread(self.add_to_cache, cache_key, cache_data, expires_in_minutes)
+    
+    async def aget_from_cache(self, cache_key: str) -> Optional[str]:
+        """get_from_cache در thread جدا تا event loop منتظر دیسک نماند"""
+        return await asyncio.to_thread(self.get_from_cache, cache_key)
+    
     def cleanup_expired_cache(self) -> int:
         """پاک کردن کش منقضی شده"""
         try:
@@ -431,7 +554,7 @@ class Database:
                 conn.commit()
                 return deleted_count
         except Exception as e:
-            logger.error(f"Error cleaning up expired cache: {e}")
+            logger.error("Error cleaning up expired cache: %s", e)
             return 0
     
     def log_error(self, user_id: int, error_type: str, 
@@ -448,7 +571,7 @@ class Database:
                 conn.commit()
                 return True
         except Exception as e:
-            logger.error(f"Error logging error: {e}")
+            logger.error("Error logging error: %s", e)
             return False
     
     def get_recent_errors(self, limit: int = 50) -> List[Dict[str, Any]]:
@@ -477,7 +600,7 @@ class Database:
                 
                 return errors
         except Exception as e:
-            logger.error(f"Error getting recent errors: {e}")
+            logger.error("Error getting recent errors: %s", e)
             return []
     
     def get_database_stats(self) -> Dict[str, Any]:
@@ -506,5 +629,5 @@ class Database:
                 return stats
                 
         except Exception as e:
-            logger.error(f"Error getting database stats: {e}")
+            logger.error("Error getting database stats: %s", e)
             return {}
\ No newline at end of file
@@ -9,6 +9,7 @@ from telegram import (
 )
 from telegram.ext import ContextTypes
 from typing import Dict, List, Optional, Any, Tuple
+import functools
 import logging
 import random
 
@@ -213,6 +214,7 @@ class GlassUI:
         return InlineKeyboardMarkup(keyboard)
     
     @staticmethod
+    @functools.lru_cache(maxsize=256)
     def get_pagination_glass_keyboard(current_page: int, total_pages: int, 
                                     callback_prefix: str) -> InlineKeyboardMarkup:
         """کیبورد صفحه‌بندی شیشه‌ای"""
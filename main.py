@@ -1,18 +1,30 @@
+import aiohttp
+import asyncio
+import ast
+import atexit
+import concurrent.futures
+import functools
 import logging
-import requests
-import jdatetime
-from hijridate import Gregorian
-from babel.numbers import format_decimal
-from typing import Dict, Any
+import logging.handlers
+import os
+import queue
+import re
+import secrets
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from cachetools import LRUCache, TTLCache
 
 from telegram import (
     Update, InlineKeyboardButton,
     InlineKeyboardMarkup, WebAppInfo, MenuButtonWebApp
 )
+from telegram.constants import ParseMode
+from telegram.error import RetryAfter, TimedOut
+from telegram.helpers import escape_markdown
 from telegram.ext import (
     ApplicationBuilder, CommandHandler,
     CallbackQueryHandler, MessageHandler,
-    ContextTypes, filters
+    ContextTypes, Defaults, filters
 )
 
 # Import our glass UI components
@@ -22,8 +34,23 @@ from price_tracker import PriceTracker
 from currency_converter import CurrencyConverter
 from weather_service import WeatherService
 from translation_service import TranslationService
+from unit_converter import UnitConverter
 from smart_text_processor import SmartTextProcessor
 from tabdila_pro.prices import fetch_mofid_basket, get_popular_crypto
+from tabdila_pro._cache import cached, CACHE_TTL_CRYPTO, CACHE_TTL_FOREX, CACHE_TTL_TGJU
+from tabdila_pro.config import USER_AGENT
+from config import Config
+
+# ---- لاگ گیری ----
+# هندلرها فقط در صف می‌گذارند؛ نوشتن واقعی در ترد QueueListener انجام می‌شود
+_log_queue = queue.Queue(-1)
+_log_stream = logging.StreamHandler()
+_log_stream.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_stream, respect_handler_level=True)
+logging.basicConfig(level=logging.INFO, handlers=[logging.handlers.QueueHandler(_log_queue)])
+_log_listener.start()
+atexit.register(_log_listener.stop)
+logger = logging.getLogger(__name__)
 
 # Try to import admin services (optional)
 try:
@@ -32,16 +59,22 @@ try:
     ADMIN_AVAILABLE = True
 except ImportError:
     ADMIN_AVAILABLE = False
-    print("Admin services not available - running in basic mode")
+    logger.warning("Admin services not available - running in basic mode")
 
-# ---- لاگ گیری ----
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO
-)
+# ---- تنظیمات اجرا ----
+TOKEN = Config.BOT_TOKEN
+# اگر WEBHOOK_URL تنظیم شده باشد ربات به‌جای long polling با وبهوک اجرا می‌شود
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "").rstrip("/")
+WEBHOOK_PORT = int(os.getenv("PORT", "8443"))
+# مسیر تصادفی به‌جای توکن ربات تا توکن در لاگ‌های پراکسی دیده نشود؛ در هر اجرا وبهوک دوباره ثبت می‌شود
+WEBHOOK_PATH = os.getenv("WH_PATH") or secrets.token_urlsafe(32)
+WEBHOOK_SECRET = os.getenv("WH_SECRET") or secrets.token_urlsafe(32)
+WEBAPP_URL = "https://tabdila.vercel.app/"
+_MENU_BUTTON = MenuButtonWebApp(text="Open", web_app=WebAppInfo(url=WEBAPP_URL))
 
 # ---- وضعیت کاربران ----
-user_states = {}  # user_id -> mode
+# وضعیت‌های رهاشده پس از یک ساعت خودکار حذف می‌شوند
+user_states = TTLCache(maxsize=100_000, ttl=3600)  # user_id -> mode
 
 # Initialize services
 db = Database()
@@ -51,391 +84,341 @@ price_tracker = PriceTracker(db)
 currency_converter = CurrencyConverter(db)
 weather_service = WeatherService(db)
 translation_service = TranslationService(db)
+unit_converter = UnitConverter()
 smart_processor = SmartTextProcessor()
 
-# Initialize admin services if available
-if ADMIN_AVAILABLE:
-    admin_service = AdminService(db)
-    advanced_admin = AdvancedAdminPanel(db)
-else:
-    admin_service = None
-    advanced_admin = None
+# ---- کیبوردهای ثابت (یک بار ساخته می‌شوند) ----
+_KB_MAIN = GlassUI.get_main_glass_keyboard()
+_KB_TOOLS = GlassUI.get_tools_glass_keyboard()
+_KB_BACK = GlassUI.get_back_to_main_keyboard()
+_KB_PERMANENT = GlassUI.get_permanent_reply_keyboard()
+_KB_CURRENCY = GlassUI.get_currency_glass_keyboard()
+_KB_UNIT = GlassUI.get_unit_glass_keyboard()
+_KB_PRICE = GlassUI.get_price_glass_keyboard()
+_KB_SETTINGS = GlassUI.get_settings_glass_keyboard()
+_KB_FEEDBACK = GlassUI.get_feedback_glass_keyboard()
+_KB_CURRENCY_SUBMENU = GlassUI.get_currency_submenu_keyboard()
+_KB_UNIT_SUBMENU = GlassUI.get_unit_submenu_keyboard()
+_KB_DATE_SUBMENU = GlassUI.get_date_submenu_keyboard()
+_KB_PRICE_SUBMENU = GlassUI.get_price_submenu_keyboard()
+_KB_ADMIN_CACHE = InlineKeyboardMarkup([
+    [
+        GlassUI.get_glass_button("🗑️ پاک کردن کش منقضی", "admin_cache_clear", emoji="🗑️"),
+        GlassUI.get_glass_button("🗑️ پاک کردن تمام کش", "admin_cache_clear_all", emoji="🗑️")
+    ],
+    [
+        GlassUI.get_glass_button("🔙 بازگشت", "admin_settings", emoji="🔙")
+    ]
+])
+
+# ---- متن‌های ثابت (یک بار ساخته می‌شوند) ----
+_WELCOME_TEXT = GlassUI.format_glass_welcome_message()
+_HELP_TEXT = GlassUI.format_glass_help_message()
+_PROMPT_CURRENCY = "💎 **تبدیل ارز**\n\nیکی از گزینه‌های زیر را انتخاب کنید:"
+_PROMPT_UNIT = "🔮 **تبدیل واحد**\n\nیکی از گزینه‌های زیر را انتخاب کنید:"
+_PROMPT_DATE = "✨ **تبدیل تاریخ**\n\nمثال: `2025-09-14` یا `15/01/2024`"
+_PROMPT_DATE_MENU = "✨ **تبدیل تاریخ**\n\nیکی از گزینه‌های زیر را انتخاب کنید:"
+_PROMPT_PRICE = "💫 **قیمت لحظه‌ای**\n\nیکی از گزینه‌های زیر را انتخاب کنید:"
+_PROMPT_PRICE_CRYPTO = "💰 **ارزهای دیجیتال**\n\nیکی از گزینه‌های زیر را انتخاب کنید:"
+_PROMPT_PRICE_STOCKS = "📈 **قیمت سهام**\n\nنماد سهام را ارسال کنید:\nمثال: `AAPL`, `TSLA`, `MSFT`"
+_PROMPT_WEATHER = "🌌 **آب و هوا**\n\nنام شهر را ارسال کنید یا موقعیت خود را به اشتراک بگذارید"
+_PROMPT_CALCULATOR = "🧿 **ماشین حساب**\n\nعبارت ریاضی را وارد کنید:\nمثال: `2 + 3 * 4` یا `sin(pi/2)`"
+_PROMPT_TRANSLATE = "🔮 **ترجمه**\n\nمتن مورد نظر را ارسال کنید"
+_PROMPT_SETTINGS = "⚡ **تنظیمات**\n\nیکی از گزینه‌های زیر را انتخاب کنید:"
+_PROMPT_ALERTS = "💥 **هشدارها**\n\nبرای مدیریت هشدارها، نام ارز یا کالا را ارسال کنید"
+_PROMPT_FEEDBACK = "📝 لطفاً پیشنهاد یا انتقاد خودت رو بنویس و بفرست."
+_PROMPT_REPORT_BUG = "🐞 لطفاً مشکل یا باگ رو با جزئیات بنویس و بفرست."
+_PROMPT_QUICK_ACCESS = "🚀 برای دسترسی سریع:"
+
+# ---- بارگذاری تنبل ماژول‌های سنگین ----
+@functools.lru_cache(maxsize=1)
+def _get_admin_services():
+    """Instantiate admin services on first use: (admin_service, advanced_admin)"""
+    if not ADMIN_AVAILABLE:
+        return None, None
+    return AdminService(db), AdvancedAdminPanel(db)
+
+@functools.lru_cache(maxsize=1)
+def _date_libs():
+    """Import jdatetime / hijridate on first date conversion"""
+    import jdatetime
+    from hijridate import Gregorian
+    return jdatetime, Gregorian
+
+@functools.lru_cache(maxsize=1)
+def _fa_decimal_formatter():
+    """Import babel on first currency conversion and bind the parsed fa locale"""
+    from babel import Locale
+    from babel.numbers import format_decimal
+    return functools.partial(format_decimal, locale=Locale.parse("fa"))
+
+# ---- پاسخ خطا ----
+# پاسخ خطا اگر تلگرام کند یا محدود باشد رها می‌شود تا خطا روی خطا انباشته نشود
+_ERROR_REPLY_TIMEOUT = 5.0
+
+async def _safe_reply(message, text: str, **kwargs):
+    """reply_text with a bounded wait; dropped on timeout or flood limit"""
+    try:
+        await asyncio.wait_for(message.reply_text(text, **kwargs), timeout=_ERROR_REPLY_TIMEOUT)
+    except (asyncio.TimeoutError, RetryAfter, TimedOut) as e:
+        logger.warning("Dropped error reply: %s", e)
+
+async def _safe_edit(query, text: str, **kwargs):
+    """edit_message_text counterpart of _safe_reply"""
+    try:
+        await asyncio.wait_for(query.edit_message_text(text, **kwargs), timeout=_ERROR_REPLY_TIMEOUT)
+    except (asyncio.TimeoutError, RetryAfter, TimedOut) as e:
+        logger.warning("Dropped error reply: %s", e)
+
+# ---- صف نوشتن در پایگاه داده ----
+# ثبت کاربر و فعالیت از مسیر پاسخ خارج شده و به‌صورت دسته‌ای نوشته می‌شود
+_DB_BATCH_SIZE = 500
+_DB_FLUSH_INTERVAL = 0.1
+_db_queue: "asyncio.Queue[Tuple[str, tuple]]" = asyncio.Queue()
+
+def _flush_db_batch(batch):
+    registrations = [args for kind, args in batch if kind == "register"]
+    active_user_ids = [args[0] for kind, args in batch if kind == "activity"]
+    db.write_user_batch(registrations, active_user_ids)
+
+async def _db_writer():
+    """Drain _db_queue every _DB_FLUSH_INTERVAL seconds, one transaction per batch"""
+    while True:
+        batch = [await _db_queue.get()]
+        try:
+            await asyncio.sleep(_DB_FLUSH_INTERVAL)
+        except asyncio.CancelledError:
+            _flush_db_batch(batch)
+            raise
+        while len(batch) < _DB_BATCH_SIZE and not _db_queue.empty():
+            batch.append(_db_queue.get_nowait())
+        await asyncio.to_thread(_flush_db_batch, batch)
+
+def _drain_db_queue():
+    batch = []
+    while not _db_queue.empty():
+        batch.append(_db_queue.get_nowait())
+    if batch:
+        _flush_db_batch(batch)
 
 # ---- استارت ----
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    user_id = update.message.from_user.id
+    user = update.message.from_user
     
     # Register user in database
-    db.register_user(user_id, update.message.from_user.username, 
-                     update.message.from_user.first_name, 
-                     update.message.from_user.last_name)
+    _db_queue.put_nowait(("register", (user.id, user.username, user.first_name, user.last_name)))
     
     # Show welcome message with tools keyboard
-    welcome_text = GlassUI.format_glass_welcome_message()
-    tools_keyboard = GlassUI.get_tools_glass_keyboard()
-    await update.message.reply_text(welcome_text, reply_markup=tools_keyboard, parse_mode='Markdown')
+    await update.message.reply_text(_WELCOME_TEXT, reply_markup=_KB_TOOLS)
 
     # Show permanent reply keyboard with mini app and restart
-    permanent_keyboard = GlassUI.get_permanent_reply_keyboard()
-    await update.message.reply_text(
-        "🚀 برای دسترسی سریع:",
-        reply_markup=permanent_keyboard
-    )
+    await update.message.reply_text(_PROMPT_QUICK_ACCESS, reply_markup=_KB_PERMANENT)
 
 async def restart_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """دستور شروع مجدد"""
     # Reset user state if any
-    user_id = update.effective_user.id
-    if user_id in user_states:
-        del user_states[user_id]
+    user = update.message.from_user
+    user_states.pop(user.id, None)
     
     # Register user in database
-    db.register_user(user_id, update.message.from_user.username, 
-                     update.message.from_user.first_name, 
-                     update.message.from_user.last_name)
+    _db_queue.put_nowait(("register", (user.id, user.username, user.first_name, user.last_name)))
     
     # Show welcome message with tools keyboard
-    welcome_text = GlassUI.format_glass_welcome_message()
-    tools_keyboard = GlassUI.get_tools_glass_keyboard()
-    await update.message.reply_text(welcome_text, reply_markup=tools_keyboard, parse_mode='Markdown')
+    await update.message.reply_text(_WELCOME_TEXT, reply_markup=_KB_TOOLS)
 
     # Show permanent reply keyboard with mini app and restart
-    permanent_keyboard = GlassUI.get_permanent_reply_keyboard()
-    await update.message.reply_text(
-        "🚀 برای دسترسی سریع:",
-        reply_markup=permanent_keyboard
-    )
+    await update.message.reply_text(_PROMPT_QUICK_ACCESS, reply_markup=_KB_PERMANENT)
 
 # ---- هندل کلیک منو ----
 async def handle_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    await query.answer()
+    # پاسخ به callback هم‌زمان با ویرایش پیام ارسال می‌شود
+    answer_task = asyncio.create_task(query.answer())
     choice = query.data
     user_id = query.from_user.id
     user_states[user_id] = choice
 
     # Update user activity
-    db.update_user_activity(user_id)
+    _db_queue.put_nowait(("activity", (user_id,)))
 
-    if choice == "restart":
-        reply_markup = GlassUI.get_main_glass_keyboard()
-        await query.edit_message_text(
-            GlassUI.format_glass_welcome_message(),
-            reply_markup=reply_markup,
-            parse_mode='Markdown'
-        )
-        # Send feedback keyboard as a new message
-        try:
-            await query.message.reply_text(
-                "اگر نظری داری یا مشکلی دیدی، از دکمه‌های زیر استفاده کن:",
-                reply_markup=GlassUI.get_feedback_glass_keyboard()
-            )
-        except Exception:
-            pass
-    elif choice == "currency":
-        reply_markup = GlassUI.get_currency_glass_keyboard()
-        await query.edit_message_text(
-            "💎 **تبدیل ارز**\n\nیکی از گزینه‌های زیر را انتخاب کنید:",
-            reply_markup=reply_markup,
-            parse_mode='Markdown'
-        )
-    elif choice == "unit":
-        reply_markup = GlassUI.get_unit_glass_keyboard()
-        await query.edit_message_text(
-            "🔮 **تبدیل واحد**\n\nیکی از گزینه‌های زیر را انتخاب کنید:",
-            reply_markup=reply_markup,
-            parse_mode='Markdown'
-        )
-    elif choice == "date_convert":
-        await query.edit_message_text(
-            "✨ **تبدیل تاریخ**\n\nمثال: `2025-09-14` یا `15/01/2024`",
-            reply_markup=GlassUI.get_back_to_main_keyboard(),
-            parse_mode='Markdown'
-        )
-    elif choice == "price":
-        reply_markup = GlassUI.get_price_glass_keyboard()
-        await query.edit_message_text(
-            "💫 **قیمت لحظه‌ای**\n\nیکی از گزینه‌های زیر را انتخاب کنید:",
-            reply_markup=reply_markup,
-            parse_mode='Markdown'
-        )
-    elif choice == "price_crypto_usd":
-        await show_crypto_usd_prices(query)
-    elif choice == "price_crypto_irr":
-        await show_crypto_irr_prices(query)
-    elif choice == "price_tgju":
-        await show_tgju_prices(query)
-    elif choice == "price_all":
-        await show_all_prices(query)
-    elif choice == "price_bitcoin":
-        await show_bitcoin_price(query)
-    elif choice == "price_gold_18k":
-        await show_gold_18k_price(query)
-    elif choice == "price_silver":
-        await show_silver_price(query)
-    elif choice == "price_gold_ounce":
-        await show_gold_ounce_price(query)
-    elif choice == "price_crypto_menu":
-        reply_markup = GlassUI.get_price_glass_keyboard()
-        await query.edit_message_text(
-            "💰 **ارزهای دیجیتال**\n\nیکی از گزینه‌های زیر را انتخاب کنید:",
-            reply_markup=reply_markup,
-            parse_mode='Markdown'
-        )
-    elif choice == "price_stocks":
-        await query.edit_message_text(
-            "📈 **قیمت سهام**\n\nنماد سهام را ارسال کنید:\nمثال: `AAPL`, `TSLA`, `MSFT`",
-            reply_markup=GlassUI.get_back_to_main_keyboard(),
-            parse_mode='Markdown'
-        )
-    elif choice == "weather":
-        await query.edit_message_text(
-            "🌌 **آب و هوا**\n\nنام شهر را ارسال کنید یا موقعیت خود را به اشتراک بگذارید",
-            reply_markup=GlassUI.get_back_to_main_keyboard(),
-            parse_mode='Markdown'
-        )
-    elif choice == "calculator":
-        await query.edit_message_text(
-            "🧿 **ماشین حساب**\n\nعبارت ریاضی را وارد کنید:\nمثال: `2 + 3 * 4` یا `sin(pi/2)`",
-            reply_markup=GlassUI.get_back_to_main_keyboard(),
-            parse_mode='Markdown'
-        )
-    elif choice == "translate":
-        await query.edit_message_text(
-            "🔮 **ترجمه**\n\nمتن مورد نظر را ارسال کنید",
-            reply_markup=GlassUI.get_back_to_main_keyboard(),
-            parse_mode='Markdown'
-        )
-    elif choice == "settings":
-        reply_markup = GlassUI.get_settings_glass_keyboard()
-        await query.edit_message_text(
-            "⚡ **تنظیمات**\n\nیکی از گزینه‌های زیر را انتخاب کنید:",
-            reply_markup=reply_markup,
-            parse_mode='Markdown'
-        )
-    elif choice == "my_stats":
-        stats = db.get_user_stats(user_id)
-        stats_text = f"🌟 **آمار شما**\n\n"
-        stats_text += f"📊 کل تبدیلات: {stats.get('total_conversions', 0)}\n"
-        stats_text += f"🚨 هشدارهای فعال: {stats.get('active_alerts', 0)}\n"
-        stats_text += f"📈 محبوب‌ترین تبدیل: {stats.get('most_used_conversion', 'هیچ')}\n"
-        await query.edit_message_text(stats_text, parse_mode='Markdown')
-    elif choice == "alerts":
-        await query.edit_message_text(
-            "💥 **هشدارها**\n\nبرای مدیریت هشدارها، نام ارز یا کالا را ارسال کنید",
-            reply_markup=GlassUI.get_back_to_main_keyboard(),
-            parse_mode='Markdown'
-        )
-    elif choice == "feedback":
-        user_states[user_id] = "feedback"
-        await query.edit_message_text(
-            "📝 لطفاً پیشنهاد یا انتقاد خودت رو بنویس و بفرست.",
-            parse_mode='Markdown'
-        )
-    elif choice == "report_bug":
-        user_states[user_id] = "report_bug"
-        await query.edit_message_text(
-            "🐞 لطفاً مشکل یا باگ رو با جزئیات بنویس و بفرست.",
-            parse_mode='Markdown'
-        )
-    elif choice == "back_to_main":
-        reply_markup = GlassUI.get_tools_glass_keyboard()
-        await query.edit_message_text(
-            GlassUI.format_glass_welcome_message(),
-            reply_markup=reply_markup,
-            parse_mode='Markdown'
-        )
-    elif choice == "currency_menu":
-        reply_markup = GlassUI.get_currency_submenu_keyboard()
-        await query.edit_message_text(
-            "💎 **تبدیل ارز**\n\nیکی از گزینه‌های زیر را انتخاب کنید:",
-            reply_markup=reply_markup,
-            parse_mode='Markdown'
-        )
-    elif choice == "unit_menu":
-        reply_markup = GlassUI.get_unit_submenu_keyboard()
-        await query.edit_message_text(
-            "🔮 **تبدیل واحد**\n\nیکی از گزینه‌های زیر را انتخاب کنید:",
-            reply_markup=reply_markup,
-            parse_mode='Markdown'
-        )
-    elif choice == "date_menu":
-        reply_markup = GlassUI.get_date_submenu_keyboard()
-        await query.edit_message_text(
-            "✨ **تبدیل تاریخ**\n\nیکی از گزینه‌های زیر را انتخاب کنید:",
-            reply_markup=reply_markup,
-            parse_mode='Markdown'
-        )
-    elif choice == "price_menu":
-        reply_markup = GlassUI.get_price_submenu_keyboard()
-        await query.edit_message_text(
-            "💫 **قیمت لحظه‌ای**\n\nیکی از گزینه‌های زیر را انتخاب کنید:",
-            reply_markup=reply_markup,
-            parse_mode='Markdown'
-        )
-    elif choice == "weather_menu":
-        await query.edit_message_text(
-            "🌌 **آب و هوا**\n\nنام شهر را ارسال کنید یا موقعیت خود را به اشتراک بگذارید",
-            reply_markup=GlassUI.get_back_to_main_keyboard(),
-            parse_mode='Markdown'
-        )
-    elif choice == "calculator_menu":
-        await query.edit_message_text(
-            "🧿 **ماشین حساب**\n\nعبارت ریاضی را وارد کنید:\nمثال: `2 + 3 * 4` یا `sin(pi/2)`",
-            reply_markup=GlassUI.get_back_to_main_keyboard(),
-            parse_mode='Markdown'
-        )
-    elif choice == "translate_menu":
-        await query.edit_message_text(
-            "🔮 **ترجمه**\n\nمتن مورد نظر را ارسال کنید",
-            reply_markup=GlassUI.get_back_to_main_keyboard(),
-            parse_mode='Markdown'
+    if choice in _STATIC_PROMPTS:
+        await asyncio.gather(answer_task, send_static(query, choice))
+        return
+
+    try:
+        handler = MENU_DISPATCH.get(choice)
+        if handler is not None:
+            await handler(query, user_id)
+        elif choice.startswith("admin_"):
+            await _menu_admin(query, user_id, choice.split("_", 1)[1])
+    finally:
+        await answer_task
+
+async def _menu_restart(query, user_id):
+    reply_markup = _KB_MAIN
+    await query.edit_message_text(
+        _WELCOME_TEXT,
+        reply_markup=reply_markup
+    )
+    # Send feedback keyboard as a new message
+    try:
+        await query.message.reply_text(
+            "اگر نظری داری یا مشکلی دیدی، از دکمه‌های زیر استفاده کن:",
+            reply_markup=_KB_FEEDBACK
         )
-    elif choice == "settings_menu":
-        reply_markup = GlassUI.get_settings_glass_keyboard()
-        await query.edit_message_text(
-            "⚡ **تنظیمات**\n\nیکی از گزینه‌های زیر را انتخاب کنید:",
-            reply_markup=reply_markup,
-            parse_mode='Markdown'
+    except Exception:
+        pass
+
+async def _menu_my_stats(query, user_id):
+    stats = db.get_user_stats(user_id)
+    stats_text = "\n".join((
+        "🌟 **آمار شما**",
+        "",
+        f"📊 کل تبدیلات: {stats.get('total_conversions', 0)}",
+        f"🚨 هشدارهای فعال: {stats.get('active_alerts', 0)}",
+        f"📈 محبوب‌ترین تبدیل: {stats.get('most_used_conversion', 'هیچ')}",
+    ))
+    await query.edit_message_text(stats_text)
+
+# ---- منوی ادمین ----
+async def _menu_admin(query, user_id, admin_choice):
+    admin_service, advanced_admin = _get_admin_services()
+    if not (admin_service and advanced_admin):
+        await query.edit_message_text("❌ سرویس‌های مدیریت در دسترس نیست")
+        return
+    if not await admin_service.is_admin(user_id):
+        await query.edit_message_text("❌ شما دسترسی ادمین ندارید")
+        return
+
+    handler = ADMIN_DISPATCH.get(admin_choice)
+    if handler is not None:
+        await handler(query, user_id, admin_service, advanced_admin)
+    else:
+        await query.edit_message_text("🔧 این قابلیت در حال توسعه است")
+
+# نماهای تجمیعی ادمین تا یک دقیقه از کش خوانده می‌شوند
+_ADMIN_VIEW_TTL = 60
+
+async def _admin_dashboard(query, user_id, admin_service, advanced_admin):
+    # نمایش داشبورد اصلی
+    async def build():
+        dashboard_data = await advanced_admin.get_admin_dashboard(user_id)
+        return advanced_admin.format_dashboard_message(dashboard_data), advanced_admin.get_admin_keyboard()
+
+    dashboard_text, reply_markup = await cached(f"admin_dashboard:{user_id}", _ADMIN_VIEW_TTL, build)
+    await query.edit_message_text(dashboard_text, reply_markup=reply_markup)
+
+async def _admin_stats(query, user_id, admin_service, advanced_admin):
+    async def build():
+        return admin_service.format_statistics(await admin_service.get_bot_statistics())
+
+    stats_text = await cached("admin_stats", _ADMIN_VIEW_TTL, build)
+    await query.edit_message_text(stats_text)
+
+async def _admin_users(query, user_id, admin_service, advanced_admin):
+    reply_markup = advanced_admin.get_user_management_keyboard()
+    await query.edit_message_text(
+        "👥 **مدیریت کاربران**\n\nیکی از گزینه‌های زیر را انتخاب کنید:",
+        reply_markup=reply_markup
+    )
+
+async def _admin_user_list(query, user_id, admin_service, advanced_admin):
+    user_data = await advanced_admin.manage_users("list", data={"page": 1, "limit": 10})
+    if user_data["success"]:
+        users_text = admin_service.format_user_list(user_data)
+        reply_markup = advanced_admin.get_user_management_keyboard(
+            user_data["pagination"]["current_page"],
+            user_data["pagination"]["total_pages"]
         )
-    elif choice.startswith("admin_"):
-        # Admin commands
-        if ADMIN_AVAILABLE and admin_service and advanced_admin:
-            if await admin_service.is_admin(user_id):
-                admin_choice = choice.replace("admin_", "")
-                
-                if admin_choice == "dashboard":
-                    # نمایش داشبورد اصلی
-                    dashboard_data = await advanced_admin.get_admin_dashboard(user_id)
-                    dashboard_text = advanced_admin.format_dashboard_message(dashboard_data)
-                    reply_markup = advanced_admin.get_admin_keyboard()
-                    await query.edit_message_text(dashboard_text, reply_markup=reply_markup, parse_mode='Markdown')
-                    
-                elif admin_choice == "stats":
-                    stats = await admin_service.get_bot_statistics()
-                    stats_text = admin_service.format_statistics(stats)
-                    await query.edit_message_text(stats_text, parse_mode='Markdown')
-                    
-                elif admin_choice == "users":
-                    reply_markup = advanced_admin.get_user_management_keyboard()
-                    await query.edit_message_text(
-                        "👥 **مدیریت کاربران**\n\nیکی از گزینه‌های زیر را انتخاب کنید:",
-                        reply_markup=reply_markup,
-                        parse_mode='Markdown'
-                    )
-                    
-                elif admin_choice == "user_list":
-                    user_data = await advanced_admin.manage_users("list", data={"page": 1, "limit": 10})
-                    if user_data["success"]:
-                        users_text = admin_service.format_user_list(user_data)
-                        reply_markup = advanced_admin.get_user_management_keyboard(
-                            user_data["pagination"]["current_page"],
-                            user_data["pagination"]["total_pages"]
-                        )
-                        await query.edit_message_text(users_text, reply_markup=reply_markup, parse_mode='Markdown')
-                    else:
-                        await query.edit_message_text(f"❌ خطا: {user_data['error']}")
-                        
-                elif admin_choice == "broadcast":
-                    reply_markup = advanced_admin.get_broadcast_keyboard()
-                    await query.edit_message_text(
-                        "📢 **ارسال پیام گروهی**\n\nیکی از گزینه‌های زیر را انتخاب کنید:",
-                        reply_markup=reply_markup,
-                        parse_mode='Markdown'
-                    )
-                    
-                elif admin_choice == "settings":
-                    reply_markup = advanced_admin.get_system_settings_keyboard()
-                    await query.edit_message_text(
-                        "⚙️ **تنظیمات سیستم**\n\nیکی از گزینه‌های زیر را انتخاب کنید:",
-                        reply_markup=reply_markup,
-                        parse_mode='Markdown'
-                    )
-                    
-                elif admin_choice == "maintenance":
-                    # تغییر حالت تعمیر
-                    current_mode = advanced_admin.maintenance_mode
-                    result = await advanced_admin.toggle_maintenance_mode(not current_mode)
-                    if result["success"]:
-                        status = "فعال" if result["maintenance_mode"] else "غیرفعال"
-                        await query.edit_message_text(f"✅ حالت تعمیر {status} شد")
-                    else:
-                        await query.edit_message_text(f"❌ خطا: {result['error']}")
-                        
-                elif admin_choice == "cache":
-                    # مدیریت کش
-                    cache_stats = await advanced_admin.manage_cache("stats")
-                    if cache_stats["success"]:
-                        stats = cache_stats["cache_stats"]
-                        cache_text = f"💾 **آمار کش**\n\n"
-                        cache_text += f"📊 کل ورودی‌ها: {stats.get('total_entries', 0)}\n"
-                        cache_text += f"✅ ورودی‌های فعال: {stats.get('active_entries', 0)}\n"
-                        cache_text += f"📈 نرخ موفقیت: {stats.get('hit_rate', 0):.1%}\n"
-                        
-                        keyboard = [
-                            [
-                                GlassUI.get_glass_button("🗑️ پاک کردن کش منقضی", "admin_cache_clear", emoji="🗑️"),
-                                GlassUI.get_glass_button("🗑️ پاک کردن تمام کش", "admin_cache_clear_all", emoji="🗑️")
-                            ],
-                            [
-                                GlassUI.get_glass_button("🔙 بازگشت", "admin_settings", emoji="🔙")
-                            ]
-                        ]
-                        reply_markup = InlineKeyboardMarkup(keyboard)
-                        await query.edit_message_text(cache_text, reply_markup=reply_markup, parse_mode='Markdown')
-                    else:
-                        await query.edit_message_text(f"❌ خطا: {cache_stats['error']}")
-                        
-                elif admin_choice == "cache_clear":
-                    result = await advanced_admin.manage_cache("clear")
-                    await query.edit_message_text(f"✅ {result['message']}")
-                    
-                elif admin_choice == "cache_clear_all":
-                    result = await advanced_admin.manage_cache("clear_all")
-                    await query.edit_message_text(f"✅ {result['message']}")
-                    
-                elif admin_choice == "alerts":
-                    alerts = await admin_service.get_all_alerts()
-                    alerts_text = f"🚨 **هشدارهای فعال**\n\n"
-                    alerts_text += f"📊 کل هشدارها: {alerts.get('total_alerts', 0)}\n"
-                    alerts_text += f"👥 کاربران دارای هشدار: {alerts.get('users_with_alerts', 0)}\n"
-                    await query.edit_message_text(alerts_text, parse_mode='Markdown')
-                    
-                elif admin_choice == "logs":
-                    logs = await admin_service.get_recent_logs()
-                    logs_text = f"📋 **لاگ‌های اخیر**\n\n"
-                    logs_text += logs.get("message", "لاگ‌گیری در این نسخه پیاده‌سازی نشده است")
-                    await query.edit_message_text(logs_text, parse_mode='Markdown')
-                    
-                elif admin_choice == "back_to_admin":
-                    # بازگشت به پنل اصلی ادمین
-                    dashboard_data = await advanced_admin.get_admin_dashboard(user_id)
-                    dashboard_text = advanced_admin.format_dashboard_message(dashboard_data)
-                    reply_markup = advanced_admin.get_admin_keyboard()
-                    await query.edit_message_text(dashboard_text, reply_markup=reply_markup, parse_mode='Markdown')
-                    
-                else:
-                    await query.edit_message_text("🔧 این قابلیت در حال توسعه است")
-            else:
-                await query.edit_message_text("❌ شما دسترسی ادمین ندارید")
-        else:
-            await query.edit_message_text("❌ سرویس‌های مدیریت در دسترس نیست")
+        await query.edit_message_text(users_text, reply_markup=reply_markup)
+    else:
+        await query.edit_message_text(f"❌ خطا: {user_data['error']}", parse_mode=None)
+
+async def _admin_broadcast(query, user_id, admin_service, advanced_admin):
+    reply_markup = advanced_admin.get_broadcast_keyboard()
+    await query.edit_message_text(
+        "📢 **ارسال پیام گروهی**\n\nیکی از گزینه‌های زیر را انتخاب کنید:",
+        reply_markup=reply_markup
+    )
+
+async def _admin_settings(query, user_id, admin_service, advanced_admin):
+    reply_markup = advanced_admin.get_system_settings_keyboard()
+    await query.edit_message_text(
+        "⚙️ **تنظیمات سیستم**\n\nیکی از گزینه‌های زیر را انتخاب کنید:",
+        reply_markup=reply_markup
+    )
+
+async def _admin_maintenance(query, user_id, admin_service, advanced_admin):
+    # تغییر حالت تعمیر
+    current_mode = advanced_admin.maintenance_mode
+    result = await advanced_admin.toggle_maintenance_mode(not current_mode)
+    if result["success"]:
+        status = "فعال" if result["maintenance_mode"] else "غیرفعال"
+        await query.edit_message_text(f"✅ حالت تعمیر {status} شد", parse_mode=None)
+    else:
+        await query.edit_message_text(f"❌ خطا: {result['error']}", parse_mode=None)
+
+async def _admin_cache(query, user_id, admin_service, advanced_admin):
+    # مدیریت کش
+    cache_stats = await advanced_admin.manage_cache("stats")
+    if cache_stats["success"]:
+        stats = cache_stats["cache_stats"]
+        cache_text = "\n".join((
+            "💾 **آمار کش**",
+            "",
+            f"📊 کل ورودی‌ها: {stats.get('total_entries', 0)}",
+            f"✅ ورودی‌های فعال: {stats.get('active_entries', 0)}",
+            f"📈 نرخ موفقیت: {stats.get('hit_rate', 0):.1%}",
+        ))
+        await query.edit_message_text(cache_text, reply_markup=_KB_ADMIN_CACHE)
+    else:
+        await query.edit_message_text(f"❌ خطا: {cache_stats['error']}", parse_mode=None)
+
+async def _admin_cache_clear(query, user_id, admin_service, advanced_admin):
+    result = await advanced_admin.manage_cache("clear")
+    await query.edit_message_text(f"✅ {result['message']}", parse_mode=None)
+
+async def _admin_cache_clear_all(query, user_id, admin_service, advanced_admin):
+    result = await advanced_admin.manage_cache("clear_all")
+    await query.edit_message_text(f"✅ {result['message']}", parse_mode=None)
+
+async def _admin_alerts(query, user_id, admin_service, advanced_admin):
+    async def build():
+        alerts = await admin_service.get_all_alerts()
+        return "\n".join((
+            "🚨 **هشدارهای فعال**",
+            "",
+            f"📊 کل هشدارها: {alerts.get('total_alerts', 0)}",
+            f"👥 کاربران دارای هشدار: {alerts.get('users_with_alerts', 0)}",
+        ))
+
+    alerts_text = await cached("admin_alerts", _ADMIN_VIEW_TTL, build)
+    await query.edit_message_text(alerts_text)
+
+async def _admin_logs(query, user_id, admin_service, advanced_admin):
+    logs = await admin_service.get_recent_logs()
+    logs_text = "📋 **لاگ‌های اخیر**\n\n" + logs.get("message", "لاگ‌گیری در این نسخه پیاده‌سازی نشده است")
+    await query.edit_message_text(logs_text)
 
 # ---- هندل ورودی عادی ----
+# دکمه‌های کیبورد دائمی که بدون تشخیص هوشمند پاسخ داده می‌شوند
+_LITERAL_BUTTONS = frozenset({"🔄 شروع مجدد"})
+
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.message.from_user.id
     text = update.message.text.strip()
     
     # به‌روزرسانی فعالیت کاربر
-    db.update_user_activity(user_id)
+    _db_queue.put_nowait(("activity", (user_id,)))
     
     # Handle restart button press
-    if text == "🔄 شروع مجدد":
+    if text in _LITERAL_BUTTONS:
         await restart_command(update, context)
         return
     
     # اگر کاربر در حالت خاصی نیست، سعی کن خودکار تشخیص بده
-    if user_id not in user_states:
+    choice = user_states.get(user_id)
+    if choice is None:
         # تشخیص هوشمند نوع درخواست
         detection_result = smart_processor.detect_request_type(text)
         
@@ -466,13 +449,10 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 "💫 قیمت: `BTC` یا `طلا` یا `AAPL`\n"
                 "🌤️ آب و هوا: `تهران` یا `آب و هوای اصفهان`\n"
                 "🧮 محاسبه: `2 + 3 * 4` یا `sin(pi/2)`\n"
-                "🌐 ترجمه: `Hello world` یا `سلام دنیا`",
-                parse_mode='Markdown'
+                "🌐 ترجمه: `Hello world` یا `سلام دنیا`"
             )
         return
 
-    choice = user_states[user_id]
-
     try:
         if choice == "currency":
             await convert_currency(update, text)
@@ -490,40 +470,40 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await translate_text(update, text)
         elif choice == "feedback":
             db.add_notification(user_id, "feedback", text, {"source": "inline"})
-            await update.message.reply_text("✅ ممنون! بازخوردت ثبت شد.", reply_markup=GlassUI.get_back_to_main_keyboard())
-            del user_states[user_id]
+            await update.message.reply_text("✅ ممنون! بازخوردت ثبت شد.", reply_markup=_KB_BACK)
+            user_states.pop(user_id, None)
         elif choice == "report_bug":
             db.add_notification(user_id, "bug_report", text, {"source": "inline"})
-            await update.message.reply_text("✅ گزارش خرابی دریافت شد. به‌زودی بررسی می‌کنیم.", reply_markup=GlassUI.get_back_to_main_keyboard())
-            del user_states[user_id]
+            await update.message.reply_text("✅ گزارش خرابی دریافت شد. به‌زودی بررسی می‌کنیم.", reply_markup=_KB_BACK)
+            user_states.pop(user_id, None)
     except Exception as e:
-        await update.message.reply_text(f"❌ خطا: {e}")
-        print(f"Error in handle_message: {e}")
+        await _safe_reply(update.message, f"❌ خطا: {e}", parse_mode=None)
+        logger.exception("handle_message failed")
 
 # ---- پردازشگرهای هوشمند ----
 async def process_smart_currency_conversion(update: Update, data: Dict[str, Any]):
     """پردازش هوشمند تبدیل ارز"""
     try:
         if data.get('amount') and data.get('from_currency') and data.get('to_currency'):
-            result = await currency_converter.convert_currency(
+            result = await _convert_currency_cached(
                 data['amount'], 
                 data['from_currency'], 
                 data['to_currency']
             )
             if result.get("success"):
-                formatted = format_decimal(result["result"], locale="fa")
+                formatted = _fa_decimal_formatter()(result["result"])
                 await update.message.reply_text(
                     f"💱 **تبدیل ارز**\n\n"
                     f"💰 {data['amount']} {data['from_currency']} = {formatted} {data['to_currency']}\n"
                     f"📊 نرخ: {result['rate']:.6f}\n"
                     f"🕐 زمان: {result['timestamp']}",
-                    parse_mode='Markdown',
-                    reply_markup=GlassUI.get_permanent_reply_keyboard()
+                    reply_markup=_KB_PERMANENT
                 )
             else:
                 await update.message.reply_text(
                     f"❌ خطا در تبدیل ارز: {result.get('error', 'نامشخص')}",
-                    reply_markup=GlassUI.get_permanent_reply_keyboard()
+                    reply_markup=_KB_PERMANENT,
+                    parse_mode=None
                 )
         else:
             # اگر داده کامل نیست، پیام راهنما بده
@@ -533,13 +513,14 @@ async def process_smart_currency_conversion(update: Update, data: Dict[str, Any]
                 "`100 USD to IRR`\n"
                 "`1 BTC to USD`\n"
                 "`500 یورو به ریال`",
-                parse_mode='Markdown',
-                reply_markup=GlassUI.get_permanent_reply_keyboard()
+                reply_markup=_KB_PERMANENT
             )
     except Exception as e:
-        await update.message.reply_text(
+        await _safe_reply(
+            update.message,
             f"❌ خطا در پردازش تبدیل ارز: {str(e)}",
-            reply_markup=GlassUI.get_permanent_reply_keyboard()
+            reply_markup=_KB_PERMANENT,
+            parse_mode=None
         )
 
 async def process_smart_unit_conversion(update: Update, data: Dict[str, Any]):
@@ -550,8 +531,7 @@ async def process_smart_unit_conversion(update: Update, data: Dict[str, Any]):
             await update.message.reply_text(
                 f"📏 **تبدیل {data['unit_type']}**\n\n"
                 f"در حال پردازش: {data['amount']} {data['from_unit']} به {data['to_unit']}",
-                parse_mode='Markdown',
-                reply_markup=GlassUI.get_permanent_reply_keyboard()
+                reply_markup=_KB_PERMANENT
             )
         else:
             await update.message.reply_text(
@@ -559,13 +539,14 @@ async def process_smart_unit_conversion(update: Update, data: Dict[str, Any]):
                 "لطفاً فرمت صحیح را استفاده کنید:\n"
                 "`10 km to mile`\n"
                 "`5 کیلوگرم به پوند`",
-                parse_mode='Markdown',
-                reply_markup=GlassUI.get_permanent_reply_keyboard()
+                reply_markup=_KB_PERMANENT
             )
     except Exception as e:
-        await update.message.reply_text(
+        await _safe_reply(
+            update.message,
             f"❌ خطا در پردازش تبدیل واحد: {str(e)}",
-            reply_markup=GlassUI.get_permanent_reply_keyboard()
+            reply_markup=_KB_PERMANENT,
+            parse_mode=None
         )
 
 async def process_smart_date_conversion(update: Update, data: Dict[str, Any]):
@@ -581,13 +562,14 @@ async def process_smart_date_conversion(update: Update, data: Dict[str, Any]):
                 "`2024-01-15`\n"
                 "`15/01/1403`\n"
                 "`15 Jan 2024`",
-                parse_mode='Markdown',
-                reply_markup=GlassUI.get_permanent_reply_keyboard()
+                reply_markup=_KB_PERMANENT
             )
     except Exception as e:
-        await update.message.reply_text(
+        await _safe_reply(
+            update.message,
             f"❌ خطا در پردازش تبدیل تاریخ: {str(e)}",
-            reply_markup=GlassUI.get_permanent_reply_keyboard()
+            reply_markup=_KB_PERMANENT,
+            parse_mode=None
         )
 
 async def process_smart_price_request(update: Update, data: Dict[str, Any]):
@@ -604,13 +586,14 @@ async def process_smart_price_request(update: Update, data: Dict[str, Any]):
                 "`BTC` - بیت کوین\n"
                 "`طلا` - قیمت طلا\n"
                 "`AAPL` - سهام اپل",
-                parse_mode='Markdown',
-                reply_markup=GlassUI.get_permanent_reply_keyboard()
+                reply_markup=_KB_PERMANENT
             )
     except Exception as e:
-        await update.message.reply_text(
+        await _safe_reply(
+            update.message,
             f"❌ خطا در پردازش درخواست قیمت: {str(e)}",
-            reply_markup=GlassUI.get_permanent_reply_keyboard()
+            reply_markup=_KB_PERMANENT,
+            parse_mode=None
         )
 
 async def process_smart_weather_request(update: Update, data: Dict[str, Any]):
@@ -626,13 +609,14 @@ async def process_smart_weather_request(update: Update, data: Dict[str, Any]):
                 "`تهران`\n"
                 "`آب و هوای اصفهان`\n"
                 "`London`",
-                parse_mode='Markdown',
-                reply_markup=GlassUI.get_permanent_reply_keyboard()
+                reply_markup=_KB_PERMANENT
             )
     except Exception as e:
-        await update.message.reply_text(
+        await _safe_reply(
+            update.message,
             f"❌ خطا در پردازش درخواست آب و هوا: {str(e)}",
-            reply_markup=GlassUI.get_permanent_reply_keyboard()
+            reply_markup=_KB_PERMANENT,
+            parse_mode=None
         )
 
 async def process_smart_calculation(update: Update, data: Dict[str, Any]):
@@ -648,13 +632,14 @@ async def process_smart_calculation(update: Update, data: Dict[str, Any]):
                 "`2 + 3 * 4`\n"
                 "`sin(pi/2)`\n"
                 "`sqrt(16)`",
-                parse_mode='Markdown',
-                reply_markup=GlassUI.get_permanent_reply_keyboard()
+                reply_markup=_KB_PERMANENT
             )
     except Exception as e:
-        await update.message.reply_text(
+        await _safe_reply(
+            update.message,
             f"❌ خطا در پردازش محاسبه: {str(e)}",
-            reply_markup=GlassUI.get_permanent_reply_keyboard()
+            reply_markup=_KB_PERMANENT,
+            parse_mode=None
         )
 
 async def process_smart_translation(update: Update, data: Dict[str, Any]):
@@ -669,63 +654,114 @@ async def process_smart_translation(update: Update, data: Dict[str, Any]):
                 "لطفاً متن مورد نظر را وارد کنید:\n"
                 "`Hello world`\n"
                 "`سلام دنیا`",
-                parse_mode='Markdown',
-                reply_markup=GlassUI.get_permanent_reply_keyboard()
+                reply_markup=_KB_PERMANENT
             )
     except Exception as e:
-        await update.message.reply_text(
+        await _safe_reply(
+            update.message,
             f"❌ خطا در پردازش ترجمه: {str(e)}",
-            reply_markup=GlassUI.get_permanent_reply_keyboard()
+            reply_markup=_KB_PERMANENT,
+            parse_mode=None
         )
 
 # ---- تبدیل ارز ----
+async def _convert_currency_cached(amount, from_curr: str, to_curr: str):
+    # نرخ هر جفت ارز یک‌بار گرفته می‌شود (مستقل از مقدار) و برای همه درخواست‌های هم‌زمان مشترک است
+    from_curr, to_curr = from_curr.upper(), to_curr.upper()
+    unit = await cached(
+        f"fx:{from_curr}:{to_curr}", CACHE_TTL_FOREX,
+        lambda: currency_converter.convert_currency(1, from_curr, to_curr)
+    )
+    if not unit.get("success"):
+        return unit
+    return {**unit, "amount": amount, "result": amount * unit["rate"]}
+
+# "<مقدار> <از> to <به>" برای تبدیل ارز و واحد؛ کلمه وسط آزاد است (to، in، به)
+# و مقدار هر عدد اعشاری که float می‌پذیرد (1e3، .5، 5.)
+_CONVERT_RE = re.compile(
+    r"^\s*([-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:e[-+]?\d+)?)\s+(\S+)\s+\S+\s+(\S+)\s*$", re.IGNORECASE
+)
+
 async def convert_currency(update: Update, text: str):
-    try:
-        amount, from_curr, _, to_curr = text.split()
-        amount_val = float(amount)
-        result = await currency_converter.convert_currency(amount_val, from_curr, to_curr)
-        if result.get("success"):
-            formatted = format_decimal(result["result"], locale="fa")
-            await update.message.reply_text(
-                f"{amount} {from_curr.upper()} = {formatted} {to_curr.upper()}",
-                reply_markup=GlassUI.get_permanent_reply_keyboard()
-            )
-        else:
-            await update.message.reply_text(f"❌ {result.get('error','داده پیدا نشد')}", reply_markup=GlassUI.get_permanent_reply_keyboard())
-    except Exception:
-        await update.message.reply_text("❌ فرمت اشتباه. مثال: 100 USD to IRR", reply_markup=GlassUI.get_permanent_reply_keyboard())
+    match = _CONVERT_RE.match(text)
+    if match is None:
+        await update.message.reply_text("❌ فرمت اشتباه. مثال: 100 USD to IRR", reply_markup=_KB_PERMANENT)
+        return
+    amount, from_curr, to_curr = match.groups()
+    result = await _convert_currency_cached(float(amount), from_curr, to_curr)
+    if result.get("success"):
+        formatted = _fa_decimal_formatter()(result["result"])
+        await update.message.reply_text(
+            f"{amount} {from_curr.upper()} = {formatted} {to_curr.upper()}",
+            reply_markup=_KB_PERMANENT,
+            parse_mode=None
+        )
+    else:
+        await update.message.reply_text(f"❌ {result.get('error','داده پیدا نشد')}", reply_markup=_KB_PERMANENT, parse_mode=None)
 
 # ---- تبدیل واحد ----
+# ضریب همه جفت‌واحدهای هم‌دسته یک‌بار هنگام بارگذاری ساخته می‌شود
+_UNIT_TABLE: Dict[Tuple[str, str], float] = {
+    (a, b): fa / fb
+    for table in unit_converter.units.values()
+    for a, fa in table.items()
+    for b, fb in table.items()
+}
+# نام‌های کوتاه رایج
+_UNIT_ALIASES = {
+    "c": "celsius", "f": "fahrenheit", "k": "kelvin", "r": "rankine",
+    "mi": "mile", "miles": "mile", "lbs": "lb", "sec": "s", "hr": "h",
+}
+
 async def convert_unit(update: Update, text: str):
-    units = {
-        ("km", "mile"): 0.621371,
-        ("mile", "km"): 1.60934
-    }
-    try:
-        amount, from_unit, _, to_unit = text.split()
-        key = (from_unit.lower(), to_unit.lower())
-        if key in units:
-            result = float(amount) * units[key]
-            await update.message.reply_text(f"{amount} {from_unit} = {result} {to_unit}", reply_markup=GlassUI.get_back_to_main_keyboard())
-        else:
-            await update.message.reply_text("⚠️ این واحد پشتیبانی نمی‌شود.", reply_markup=GlassUI.get_back_to_main_keyboard())
-    except Exception:
-        await update.message.reply_text("❌ فرمت اشتباه. مثال: 10 km to mile", reply_markup=GlassUI.get_back_to_main_keyboard())
+    match = _CONVERT_RE.match(text)
+    if match is None:
+        await update.message.reply_text("❌ فرمت اشتباه. مثال: 10 km to mile", reply_markup=_KB_BACK)
+        return
+    amount, from_unit, to_unit = match.groups()
+    from_key = from_unit.casefold()
+    to_key = to_unit.casefold()
+    from_key = _UNIT_ALIASES.get(from_key, from_key)
+    to_key = _UNIT_ALIASES.get(to_key, to_key)
+    factor = _UNIT_TABLE.get((from_key, to_key))
+    if factor is not None:
+        result = float(amount) * factor
+    else:
+        # دما خطی نیست و ضریب ثابت ندارد
+        temp = unit_converter.temperature_conversions.get(from_key, {}).get(to_key)
+        result = temp(float(amount)) if temp else None
+    if result is not None:
+        await update.message.reply_text(f"{amount} {from_unit} = {result} {to_unit}", reply_markup=_KB_BACK, parse_mode=None)
+    else:
+        await update.message.reply_text("⚠️ این واحد پشتیبانی نمی‌شود.", reply_markup=_KB_BACK)
 
 # ---- تبدیل تاریخ ----
+# YYYY-MM-DD / YYYY/MM/DD or DD/MM/YYYY
+_DATE_RE = re.compile(
+    r'^(?P<y>\d{4})[-/](?P<m>\d{1,2})[-/](?P<d>\d{1,2})$'
+    r'|^(?P<d2>\d{1,2})/(?P<m2>\d{1,2})/(?P<y2>\d{4})$'
+)
+
+@functools.lru_cache(maxsize=4096)
+def _convert_ymd(y: int, m: int, d: int) -> str:
+    """Gregorian (y, m, d) -> ready-to-send persian / hijri reply"""
+    jdatetime, Gregorian = _date_libs()
+    greg = Gregorian(y, m, d)
+    persian_date = jdatetime.date.fromgregorian(date=greg.to_gregorian())
+    return f"📅 شمسی: {persian_date.strftime('%Y/%m/%d')}\n🕋 قمری: {greg.to_hijri()}"
+
 async def convert_date(update: Update, text: str):
     try:
-        y, m, d = map(int, text.split("-"))
-        greg = Gregorian(y, m, d)
-        persian_date = jdatetime.date.fromgregorian(date=greg.to_gregorian())
-        hijri_date = greg.to_hijri()
-        await update.message.reply_text(
-            f"📅 شمسی: {persian_date.strftime('%Y/%m/%d')}\n"
-            f"🕋 قمری: {hijri_date}",
-            reply_markup=GlassUI.get_back_to_main_keyboard()
-        )
+        match = _DATE_RE.match(text.strip())
+        if match is None:
+            raise ValueError("bad_date_format")
+        if match['y']:
+            y, m, d = int(match['y']), int(match['m']), int(match['d'])
+        else:
+            y, m, d = int(match['y2']), int(match['m2']), int(match['d2'])
+        await update.message.reply_text(_convert_ymd(y, m, d), reply_markup=_KB_BACK, parse_mode=None)
     except Exception:
-        await update.message.reply_text("❌ فرمت اشتباه. مثال: 2025-09-14", reply_markup=GlassUI.get_back_to_main_keyboard())
+        await _safe_reply(update.message, "❌ فرمت اشتباه. مثال: 2025-09-14 یا 15/01/2024", reply_markup=_KB_BACK)
 
 # ---- قیمت لحظه‌ای ----
 async def get_price(update: Update, text: str):
@@ -734,97 +770,188 @@ async def get_price(update: Update, text: str):
     result = await price_tracker.get_crypto_price(symbol)
     if result.get("success"):
         msg = price_tracker.format_price_result(result)
-        await update.message.reply_text(msg, parse_mode='Markdown', reply_markup=GlassUI.get_back_to_main_keyboard())
+        await update.message.reply_text(msg, reply_markup=_KB_BACK)
         return
     await update.message.reply_text(
         f"💫 داده قیمت برای '{text}' در حال حاضر در دسترس نیست",
-        reply_markup=GlassUI.get_back_to_main_keyboard()
+        reply_markup=_KB_BACK,
+        parse_mode=None
     )
 
 # ---- آب و هوا ----
 async def get_weather(update: Update, text: str):
     result = await weather_service.get_current_weather(text)
     msg = weather_service.format_weather_result(result)
-    await update.message.reply_text(msg, parse_mode='Markdown', reply_markup=GlassUI.get_back_to_main_keyboard())
+    await update.message.reply_text(msg, reply_markup=_KB_BACK)
 
 # ---- ماشین حساب ----
-async def calculate(update: Update, text: str):
-    import ast
-    import operator as op
-
-    # اپراتورهای مجاز
-    allowed_operators = {
-        ast.Add: op.add,
-        ast.Sub: op.sub,
-        ast.Mult: op.mul,
-        ast.Div: op.truediv,
-        ast.Pow: op.pow,
-        ast.Mod: op.mod,
-        ast.USub: op.neg,
-        ast.UAdd: op.pos,
-    }
-
-    def _eval(node):
-        if isinstance(node, ast.Num):
-            return node.n
-        if isinstance(node, ast.BinOp):
-            left = _eval(node.left)
-            right = _eval(node.right)
-            operator = allowed_operators.get(type(node.op))
-            if operator is None:
-                raise ValueError("operator_not_allowed")
-            return operator(left, right)
-        if isinstance(node, ast.UnaryOp):
-            operand = _eval(node.operand)
-            operator = allowed_operators.get(type(node.op))
-            if operator is None:
-                raise ValueError("operator_not_allowed")
-            return operator(operand)
-        raise ValueError("expression_not_allowed")
+# نودهای مجاز در عبارت ریاضی (به‌جز عدد و توان که جدا بررسی می‌شوند)
+_CALC_OPERATORS = (
+    ast.Expression, ast.BinOp, ast.UnaryOp,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Mod,
+    ast.USub, ast.UAdd,
+)
+
+# سقف توان هنگام محاسبه بررسی می‌شود (عملوندها می‌توانند خودشان عبارت باشند، مثل 2**(1+1))؛
+# نما کوچک و اندازه نتیجه محدود تا هیچ عبارتی پروسه را گیر نیندازد
+_CALC_MAX_EXPONENT = 1000
+_CALC_MAX_POW_BITS = 100_000
+# مهلت محاسبه توان در پروسه کمکی (ثانیه)
+_CALC_TIMEOUT = 2
+
+def _bounded_pow(base, exp):
+    """base ** exp, refusing exponents or integer results above the calculator limits"""
+    if isinstance(exp, complex) or abs(exp) > _CALC_MAX_EXPONENT:
+        raise ValueError("power_too_large")
+    if isinstance(base, int) and abs(base).bit_length() * abs(exp) > _CALC_MAX_POW_BITS:
+        raise ValueError("power_too_large")
+    return base ** exp
+
+class _PowToCall(ast.NodeTransformer):
+    """Rewrite every a ** b into _pow(a, b) so the limits apply to computed operands too"""
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if not isinstance(node.op, ast.Pow):
+            return node
+        return ast.copy_location(
+            ast.Call(func=ast.Name(id='_pow', ctx=ast.Load()), args=[node.left, node.right], keywords=[]),
+            node
+        )
+
+# تنها نامی که کد کامپایل‌شده ماشین حساب می‌بیند
+_CALC_GLOBALS = {'__builtins__': {}, '_pow': _bounded_pow}
 
+@functools.lru_cache(maxsize=1024)
+def _compile_expression(text: str):
+    """Parse, whitelist-check and compile a calculator expression -> (code, uses_pow)"""
+    tree = ast.parse(text, mode='eval')
+    uses_pow = False
+    for node in ast.walk(tree):
+        match node:
+            case ast.Constant(value=int() | float() | complex()):
+                pass
+            case ast.Pow():
+                uses_pow = True
+            case _ if isinstance(node, _CALC_OPERATORS):
+                pass
+            case _:
+                raise ValueError("expression_not_allowed")
+    if uses_pow:
+        tree = ast.fix_missing_locations(_PowToCall().visit(tree))
+    return compile(tree, '<calc>', 'eval'), uses_pow
+
+def _safe_eval(text: str):
+    """Evaluate a calculator expression (runs inside _calc_pool workers)"""
+    return eval(_compile_expression(text)[0], _CALC_GLOBALS, {})
+
+# محاسبات سنگین (مثل توان‌های بزرگ) حلقه رویداد را مسدود نمی‌کنند؛
+# پروسه‌ها در اولین استفاده ساخته می‌شوند، نه هنگام import
+_calc_pool = None
+
+def _get_calc_pool():
+    global _calc_pool
+    if _calc_pool is None:
+        _calc_pool = concurrent.futures.ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _calc_pool
+
+# نتیجه عبارت‌های تکراری (مثل 2+2) بدون رفتن به پروسه کمکی برگردانده می‌شود
+_calc_results = LRUCache(maxsize=1024)
+
+async def calculate(update: Update, text: str):
     try:
-        expr = ast.parse(text, mode='eval').body
-        result = _eval(expr)
+        result = _calc_results.get(text)
+        if result is None:
+            code, uses_pow = _compile_expression(text)
+            if uses_pow:
+                # فقط توان می‌تواند عددهای بسیار بزرگ بسازد؛ بقیه عبارت‌ها همین‌جا حساب می‌شوند
+                try:
+                    result = await asyncio.wait_for(
+                        asyncio.get_running_loop().run_in_executor(_get_calc_pool(), _safe_eval, text),
+                        timeout=_CALC_TIMEOUT
+                    )
+                except asyncio.TimeoutError:
+                    raise ValueError("calculation_timeout") from None
+            else:
+                result = eval(code, _CALC_GLOBALS, {})
+            _calc_results[text] = result
         await update.message.reply_text(
             f"🧿 **نتیجه محاسبه:**\n\n"
             f"`{text} = {result}`",
-            parse_mode='Markdown',
-            reply_markup=GlassUI.get_back_to_main_keyboard()
+            reply_markup=_KB_BACK
         )
     except Exception as e:
-        await update.message.reply_text(
+        await _safe_reply(
+            update.message,
             f"❌ خطا در محاسبه: {e}\n\n"
             "💡 مثال‌های صحیح:\n"
             "• `2 + 3 * 4`\n"
             "• `10 / 2`\n"
             "• `2 ** 3`",
-            reply_markup=GlassUI.get_back_to_main_keyboard()
+            reply_markup=_KB_BACK,
+            parse_mode=None
         )
 
 # ---- ترجمه ----
 async def translate_text(update: Update, text: str):
     result = await translation_service.translate_text(text, target_lang="fa")
     msg = translation_service.format_translation_result(result)
-    await update.message.reply_text(msg, parse_mode='Markdown', reply_markup=GlassUI.get_back_to_main_keyboard())
+    await update.message.reply_text(msg, reply_markup=_KB_BACK)
 
 # ---- داده ارسالی از مینی‌اپ ----
 async def handle_webapp_data(update: Update, context: ContextTypes.DEFAULT_TYPE):
     data = update.message.web_app_data.data
-    await update.message.reply_text(f"📦 داده از مینی‌اپ: {data}")
+    await update.message.reply_text(f"📦 داده از مینی‌اپ: {data}", parse_mode=None)
+
+# ---- ارسال پیام‌های طولانی ----
+# سقف تلگرام 4096 کاراکتر است؛ کمی حاشیه برای Markdown
+_MESSAGE_CHUNK_LIMIT = 3900
+
+def _chunk(lines, limit: int = _MESSAGE_CHUNK_LIMIT):
+    """Join lines into newline-separated pieces of at most limit characters"""
+    buf, size = [], 0
+    for line in lines:
+        while len(line) > limit:
+            if buf:
+                yield "\n".join(buf)
+                buf, size = [], 0
+            yield line[:limit]
+            line = line[limit:]
+        if buf and size + 1 + len(line) > limit:
+            yield "\n".join(buf)
+            buf, size = [], 0
+        size += len(line) + (1 if buf else 0)
+        buf.append(line)
+    if buf:
+        yield "\n".join(buf)
+
+async def _reply_chunks(message, lines, reply_markup, **kwargs):
+    """Send lines as one or more replies; the keyboard goes on the last one"""
+    chunks = list(_chunk(lines))
+    for i, chunk in enumerate(chunks, 1):
+        await message.reply_text(chunk, reply_markup=reply_markup if i == len(chunks) else None, **kwargs)
+
+async def _edit_chunks(query, lines, reply_markup, **kwargs):
+    """Edit the callback message with the first chunk and send the rest as new messages"""
+    chunks = list(_chunk(lines))
+    if len(chunks) == 1:
+        await query.edit_message_text(chunks[0], reply_markup=reply_markup, **kwargs)
+        return
+    await query.edit_message_text(chunks[0], **kwargs)
+    await _reply_chunks(query.message, chunks[1:], reply_markup, **kwargs)
 
 # ---- دستورات اضافی ----
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """دستور راهنما"""
-    help_text = GlassUI.format_glass_help_message()
-    await update.message.reply_text(help_text, parse_mode='Markdown')
+    help_text = _HELP_TEXT
+    await update.message.reply_text(help_text)
 
 async def basket_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """نمایش سبد گران مفید (TGJU)"""
-    data = fetch_mofid_basket()
+    data = await cached("mofid_basket", CACHE_TTL_TGJU, lambda: asyncio.to_thread(fetch_mofid_basket))
     if not data.get("ok") and data.get("status") != "success":
         # normalize both wrappers
         err = data.get("error") or data.get("message") or "خطای نامشخص"
-        await update.message.reply_text(f"❌ خطا در دریافت داده: {err}")
+        await update.message.reply_text(f"❌ خطا در دریافت داده: {err}", parse_mode=None)
         return
 
     # unify
@@ -833,51 +960,45 @@ async def basket_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         payload = payload["data"]
 
     lines = ["📦 سبد گران مفید:"]
-    for k, v in payload.items():
-        price = v.get("price")
-        change = v.get("change")
-        lines.append(f"• {k}: {price} ({change})")
-
-    await update.message.reply_text("\n".join(lines), reply_markup=GlassUI.get_back_to_main_keyboard())
+    lines += [f"• {k}: {v.get('price')} ({v.get('change')})" for k, v in payload.items()]
+    await _reply_chunks(update.message, lines, _KB_BACK, parse_mode=None)
 
 async def popular_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """قیمت محبوب‌ترین ارزهای دیجیتال"""
-    data = get_popular_crypto()
+    data = await cached("popular_crypto", CACHE_TTL_CRYPTO, lambda: asyncio.to_thread(get_popular_crypto))
     if not data.get("ok"):
-        await update.message.reply_text(f"❌ خطا: {data.get('error', 'نامشخص')}")
+        await update.message.reply_text(f"❌ خطا: {data.get('error', 'نامشخص')}", parse_mode=None)
         return
     coins = data.get("popular", [])
     if not coins:
         await update.message.reply_text("داده‌ای یافت نشد")
         return
     lines = ["💹 محبوب‌ترین رمزارزها (USD):"]
-    for c in coins:
-        lines.append(f"• {c['symbol']}: ${c['price_usd']} ({c['change_percent_24h']}%)")
-    await update.message.reply_text("\n".join(lines), reply_markup=GlassUI.get_back_to_main_keyboard())
+    lines += [f"• {c['symbol']}: ${c['price_usd']} ({c['change_percent_24h']}%)" for c in coins]
+    await _reply_chunks(update.message, lines, _KB_BACK, parse_mode=None)
 
 async def menu_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """دستور منو"""
-    reply_markup = GlassUI.get_main_glass_keyboard()
+    reply_markup = _KB_MAIN
     await update.message.reply_text(
         "🎯 **منوی اصلی**",
-        reply_markup=reply_markup,
-        parse_mode='Markdown'
+        reply_markup=reply_markup
     )
 
 async def settings_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """دستور تنظیمات"""
-    reply_markup = GlassUI.get_settings_glass_keyboard()
+    reply_markup = _KB_SETTINGS
     await update.message.reply_text(
         "⚡ **تنظیمات**",
-        reply_markup=reply_markup,
-        parse_mode='Markdown'
+        reply_markup=reply_markup
     )
 
 async def admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """دستور مدیریت"""
     user_id = update.message.from_user.id
+    admin_service, advanced_admin = _get_admin_services()
     
-    if ADMIN_AVAILABLE and admin_service and advanced_admin:
+    if admin_service and advanced_admin:
         if await admin_service.is_admin(user_id):
             # نمایش داشبورد اصلی ادمین
             dashboard_data = await advanced_admin.get_admin_dashboard(user_id)
@@ -885,8 +1006,7 @@ async def admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             reply_markup = advanced_admin.get_admin_keyboard()
             await update.message.reply_text(
                 dashboard_text,
-                reply_markup=reply_markup,
-                parse_mode='Markdown'
+                reply_markup=reply_markup
             )
         else:
             await update.message.reply_text("❌ شما دسترسی ادمین ندارید")
@@ -899,27 +1019,25 @@ async def show_crypto_usd_prices(query):
     try:
         result = await price_tracker._get_binance_popular_data()
         if result["success"] and result.get("popular"):
-            message = "💰 **ارزهای دیجیتال محبوب (USD)**:\n\n"
+            lines = ["💰 **ارزهای دیجیتال محبوب (USD)**:", ""]
             for coin in result["popular"]:
                 change_emoji = "📈" if coin["change_percent_24h"] >= 0 else "📉"
                 change_sign = "+" if coin["change_percent_24h"] >= 0 else ""
-                message += (
+                lines.append(
                     f"• {coin['name']} ({coin['symbol']}): ${coin['price_usd']:,.2f} "
-                    f"{change_emoji} {change_sign}{coin['change_percent_24h']:.2f}%\n"
+                    f"{change_emoji} {change_sign}{coin['change_percent_24h']:.2f}%"
                 )
-            message += f"\n🕐 زمان: {result['timestamp']}"
+            lines += ["", f"🕐 زمان: {result['timestamp']}"]
         else:
-            message = f"❌ خطا در دریافت داده: {result.get('error', 'نامشخص')}"
+            lines = [f"❌ خطا در دریافت داده: {result.get('error', 'نامشخص')}"]
         
-        await query.edit_message_text(
-            message,
-            reply_markup=GlassUI.get_price_glass_keyboard(),
-            parse_mode='Markdown'
-        )
+        await _edit_chunks(query, lines, _KB_PRICE)
     except Exception as e:
-        await query.edit_message_text(
+        await _safe_edit(
+            query,
             f"❌ خطا در دریافت قیمت‌ها: {str(e)}",
-            reply_markup=GlassUI.get_price_glass_keyboard()
+            reply_markup=_KB_PRICE,
+            parse_mode=None
         )
 
 async def show_crypto_irr_prices(query):
@@ -927,7 +1045,7 @@ async def show_crypto_irr_prices(query):
     try:
         result = await price_tracker._get_crypto_irr_data()
         if result["success"] and result.get("data"):
-            message = "🌐 **ارزهای دیجیتال (IRR)**:\n\n"
+            lines = ["🌐 **ارزهای دیجیتال (IRR)**:", ""]
             for name, crypto_data in result["data"].items():
                 price = crypto_data["price_rial"]
                 change_percent = crypto_data["change_percent"]
@@ -937,22 +1055,20 @@ async def show_crypto_irr_prices(query):
                     change_emoji = "📈" if change_percent and change_percent >= 0 else "📉"
                     change_sign = "+" if change_percent and change_percent >= 0 else ""
                     change_text = f"{change_sign}{change_percent:.2f}%" if change_percent is not None else "نامشخص"
-                    message += f"• {name}: {price:,.0f} {change_emoji} {change_text} ({change_value})\n"
+                    lines.append(f"• {name}: {price:,.0f} {change_emoji} {change_text} ({change_value})")
                 else:
-                    message += f"• {name}: نامشخص ({change_value})\n"
-            message += f"\n🕐 زمان: {result['timestamp']}"
+                    lines.append(f"• {name}: نامشخص ({change_value})")
+            lines += ["", f"🕐 زمان: {result['timestamp']}"]
         else:
-            message = f"❌ خطا در دریافت داده: {result.get('error', 'نامشخص')}"
+            lines = [f"❌ خطا در دریافت داده: {result.get('error', 'نامشخص')}"]
         
-        await query.edit_message_text(
-            message,
-            reply_markup=GlassUI.get_price_glass_keyboard(),
-            parse_mode='Markdown'
-        )
+        await _edit_chunks(query, lines, _KB_PRICE)
     except Exception as e:
-        await query.edit_message_text(
+        await _safe_edit(
+            query,
             f"❌ خطا در دریافت قیمت‌ها: {str(e)}",
-            reply_markup=GlassUI.get_price_glass_keyboard()
+            reply_markup=_KB_PRICE,
+            parse_mode=None
         )
 
 async def show_tgju_prices(query):
@@ -960,27 +1076,25 @@ async def show_tgju_prices(query):
     try:
         result = await price_tracker._get_tgju_data()
         if result["success"] and result.get("data"):
-            message = "🏦 **دارایی‌ها (IRR)**:\n\n"
+            lines = ["🏦 **دارایی‌ها (IRR)**:", ""]
             for title, asset_data in result["data"].items():
                 price = asset_data["price"]
                 change = asset_data["change"]
                 if price is not None:
-                    message += f"• {title}: {price:,.0f} ({change})\n"
+                    lines.append(f"• {title}: {price:,.0f} ({change})")
                 else:
-                    message += f"• {title}: نامشخص ({change})\n"
-            message += f"\n🕐 زمان: {result['timestamp']}"
+                    lines.append(f"• {title}: نامشخص ({change})")
+            lines += ["", f"🕐 زمان: {result['timestamp']}"]
         else:
-            message = f"❌ خطا در دریافت داده: {result.get('error', 'نامشخص')}"
+            lines = [f"❌ خطا در دریافت داده: {result.get('error', 'نامشخص')}"]
         
-        await query.edit_message_text(
-            message,
-            reply_markup=GlassUI.get_price_glass_keyboard(),
-            parse_mode='Markdown'
-        )
+        await _edit_chunks(query, lines, _KB_PRICE)
     except Exception as e:
-        await query.edit_message_text(
+        await _safe_edit(
+            query,
             f"❌ خطا در دریافت قیمت‌ها: {str(e)}",
-            reply_markup=GlassUI.get_price_glass_keyboard()
+            reply_markup=_KB_PRICE,
+            parse_mode=None
         )
 
 async def show_all_prices(query):
@@ -991,13 +1105,14 @@ async def show_all_prices(query):
         
         await query.edit_message_text(
             message,
-            reply_markup=GlassUI.get_price_glass_keyboard(),
-            parse_mode='Markdown'
+            reply_markup=_KB_PRICE
         )
     except Exception as e:
-        await query.edit_message_text(
+        await _safe_edit(
+            query,
             f"❌ خطا در دریافت قیمت‌ها: {str(e)}",
-            reply_markup=GlassUI.get_price_glass_keyboard()
+            reply_markup=_KB_PRICE,
+            parse_mode=None
         )
 
 async def price_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1008,161 +1123,249 @@ async def price_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         await update.message.reply_text(
             message,
-            reply_markup=GlassUI.get_price_glass_keyboard(),
-            parse_mode='Markdown'
+            reply_markup=_KB_PRICE
         )
     except Exception as e:
-        await update.message.reply_text(
+        await _safe_reply(
+            update.message,
             f"❌ خطا در دریافت قیمت‌ها: {str(e)}",
-            reply_markup=GlassUI.get_back_to_main_keyboard()
+            reply_markup=_KB_BACK,
+            parse_mode=None
         )
 
-async def show_bitcoin_price(query):
-    """Show Bitcoin price"""
-    try:
-        result = await price_tracker.get_crypto_price("BTC")
-        if result["success"]:
-            price = result["price"]
-            change = result.get("change_24h", 0)
-            change_emoji = "📈" if change >= 0 else "📉"
-            change_sign = "+" if change >= 0 else ""
-            
-            message = f"₿ **بیت کوین (Bitcoin)**\n\n"
-            message += f"💰 قیمت: ${price:,.2f}\n"
-            message += f"📊 تغییر 24h: {change_emoji} {change_sign}{change:.2f}%\n"
-            message += f"🕐 زمان: {result.get('timestamp', 'نامشخص')}"
-        else:
-            message = f"❌ خطا در دریافت قیمت بیت کوین: {result.get('error', 'نامشخص')}"
-        
-        await query.edit_message_text(
-            message,
-            reply_markup=GlassUI.get_price_submenu_keyboard(),
-            parse_mode='Markdown'
-        )
-    except Exception as e:
-        await query.edit_message_text(
-            f"❌ خطا در دریافت قیمت بیت کوین: {str(e)}",
-            reply_markup=GlassUI.get_price_submenu_keyboard()
-        )
+# هر گرم طلای 18 عیار = قیمت انس / گرم در انس تروی × 18/24
+_GOLD_18K_PER_GRAM = 0.75 / 31.1035
 
-async def show_gold_18k_price(query):
-    """Show 18k Gold price"""
-    try:
-        result = await price_tracker.get_commodity_price("GOLD")
-        if result["success"]:
-            price = result["price"]
-            change = result.get("change_24h", 0)
-            change_emoji = "📈" if change >= 0 else "📉"
-            change_sign = "+" if change >= 0 else ""
-            
-            message = f"🥇 **طلای 18 عیار**\n\n"
-            message += f"💰 قیمت: ${price:,.2f} per ounce\n"
-            message += f"📊 تغییر 24h: {change_emoji} {change_sign}{change:.2f}%\n"
-            message += f"🕐 زمان: {result.get('timestamp', 'نامشخص')}"
-        else:
-            message = f"❌ خطا در دریافت قیمت طلا: {result.get('error', 'نامشخص')}"
-        
-        await query.edit_message_text(
-            message,
-            reply_markup=GlassUI.get_price_submenu_keyboard(),
-            parse_mode='Markdown'
-        )
-    except Exception as e:
-        await query.edit_message_text(
-            f"❌ خطا در دریافت قیمت طلا: {str(e)}",
-            reply_markup=GlassUI.get_price_submenu_keyboard()
-        )
+# کلید دکمه -> (نماد، نوع دارایی، عنوان، پسوند قیمت، نام در پیام خطا، ضریب قیمت)
+_PRICE_SPECS: Dict[str, Tuple[str, str, str, str, str, float]] = {
+    "price_bitcoin": ("BTC", "crypto", "₿ **بیت کوین (Bitcoin)**", "", "بیت کوین", 1.0),
+    "price_gold_18k": ("GOLD", "commodity", "🥇 **طلای 18 عیار**", " per gram", "طلا", _GOLD_18K_PER_GRAM),
+    "price_silver": ("SILVER", "commodity", "🥈 **نقره (Silver)**", " per ounce", "نقره", 1.0),
+    "price_gold_ounce": ("GOLD", "commodity", "💎 **انس طلا (Gold Ounce)**", " per ounce", "انس طلا", 1.0),
+}
 
-async def show_silver_price(query):
-    """Show Silver price"""
+async def show_asset(query, key: str):
+    """Show a single asset price described by _PRICE_SPECS[key]"""
+    symbol, kind, title, suffix, name, factor = _PRICE_SPECS[key]
     try:
-        result = await price_tracker.get_commodity_price("SILVER")
+        if kind == "crypto":
+            result = await price_tracker.get_crypto_price(symbol)
+        else:
+            result = await price_tracker.get_commodity_price(symbol)
         if result["success"]:
-            price = result["price"]
+            # هر دو دکمه طلا از یک قیمت انس کش‌شده استفاده می‌کنند
+            price = result["price"] * factor
             change = result.get("change_24h", 0)
             change_emoji = "📈" if change >= 0 else "📉"
             change_sign = "+" if change >= 0 else ""
-            
-            message = f"🥈 **نقره (Silver)**\n\n"
-            message += f"💰 قیمت: ${price:,.2f} per ounce\n"
-            message += f"📊 تغییر 24h: {change_emoji} {change_sign}{change:.2f}%\n"
-            message += f"🕐 زمان: {result.get('timestamp', 'نامشخص')}"
+
+            message = "\n".join((
+                title,
+                "",
+                f"💰 قیمت: ${price:,.2f}{suffix}",
+                f"📊 تغییر 24h: {change_emoji} {change_sign}{change:.2f}%",
+                f"🕐 زمان: {result.get('timestamp', 'نامشخص')}",
+            ))
         else:
-            message = f"❌ خطا در دریافت قیمت نقره: {result.get('error', 'نامشخص')}"
-        
+            message = f"❌ خطا در دریافت قیمت {name}: {result.get('error', 'نامشخص')}"
+
         await query.edit_message_text(
             message,
-            reply_markup=GlassUI.get_price_submenu_keyboard(),
-            parse_mode='Markdown'
+            reply_markup=_KB_PRICE_SUBMENU
         )
     except Exception as e:
-        await query.edit_message_text(
-            f"❌ خطا در دریافت قیمت نقره: {str(e)}",
-            reply_markup=GlassUI.get_price_submenu_keyboard()
+        await _safe_edit(
+            query,
+            f"❌ خطا در دریافت قیمت {name}: {str(e)}",
+            reply_markup=_KB_PRICE_SUBMENU,
+            parse_mode=None
         )
 
-async def show_gold_ounce_price(query):
-    """Show Gold ounce price"""
-    try:
-        result = await price_tracker.get_commodity_price("GOLD")
-        if result["success"]:
-            price = result["price"]
-            change = result.get("change_24h", 0)
-            change_emoji = "📈" if change >= 0 else "📉"
-            change_sign = "+" if change >= 0 else ""
-            
-            message = f"💎 **انس طلا (Gold Ounce)**\n\n"
-            message += f"💰 قیمت: ${price:,.2f} per ounce\n"
-            message += f"📊 تغییر 24h: {change_emoji} {change_sign}{change:.2f}%\n"
-            message += f"🕐 زمان: {result.get('timestamp', 'نامشخص')}"
+# ---- جدول مسیریابی منو ----
+_MD_TOKEN_RE = re.compile(r"\*\*(.+?)\*\*|`([^`]*)`")
+
+def _static_prompt(text: str, markup) -> Tuple[str, Any, Any]:
+    """Convert a legacy-Markdown prompt (**bold**, `code`) to escaped MarkdownV2, or plain text"""
+    if not _MD_TOKEN_RE.search(text):
+        return text, None, markup
+    parts = []
+    pos = 0
+    for match in _MD_TOKEN_RE.finditer(text):
+        parts.append(escape_markdown(text[pos:match.start()], version=2))
+        if match.group(1) is not None:
+            parts.append("*" + escape_markdown(match.group(1), version=2) + "*")
         else:
-            message = f"❌ خطا در دریافت قیمت انس طلا: {result.get('error', 'نامشخص')}"
-        
-        await query.edit_message_text(
-            message,
-            reply_markup=GlassUI.get_price_submenu_keyboard(),
-            parse_mode='Markdown'
-        )
-    except Exception as e:
-        await query.edit_message_text(
-            f"❌ خطا در دریافت قیمت انس طلا: {str(e)}",
-            reply_markup=GlassUI.get_price_submenu_keyboard()
-        )
+            parts.append("`" + escape_markdown(match.group(2), version=2, entity_type="code") + "`")
+        pos = match.end()
+    parts.append(escape_markdown(text[pos:], version=2))
+    return "".join(parts), ParseMode.MARKDOWN_V2, markup
+
+# گزینه‌هایی که فقط یک متن ثابت و کیبورد نشان می‌دهند: key -> (text, parse_mode, markup)
+# متن‌ها یک بار در زمان import به MarkdownV2 (یا متن ساده) تبدیل می‌شوند
+_STATIC_PROMPTS: Dict[str, Tuple[str, Any, Any]] = {
+    "currency": _static_prompt(_PROMPT_CURRENCY, _KB_CURRENCY),
+    "unit": _static_prompt(_PROMPT_UNIT, _KB_UNIT),
+    "date_convert": _static_prompt(_PROMPT_DATE, _KB_BACK),
+    "price": _static_prompt(_PROMPT_PRICE, _KB_PRICE),
+    "price_crypto_menu": _static_prompt(_PROMPT_PRICE_CRYPTO, _KB_PRICE),
+    "price_stocks": _static_prompt(_PROMPT_PRICE_STOCKS, _KB_BACK),
+    "weather": _static_prompt(_PROMPT_WEATHER, _KB_BACK),
+    "calculator": _static_prompt(_PROMPT_CALCULATOR, _KB_BACK),
+    "translate": _static_prompt(_PROMPT_TRANSLATE, _KB_BACK),
+    "settings": _static_prompt(_PROMPT_SETTINGS, _KB_SETTINGS),
+    "alerts": _static_prompt(_PROMPT_ALERTS, _KB_BACK),
+    "feedback": _static_prompt(_PROMPT_FEEDBACK, None),
+    "report_bug": _static_prompt(_PROMPT_REPORT_BUG, None),
+    "back_to_main": _static_prompt(_WELCOME_TEXT, _KB_TOOLS),
+    "currency_menu": _static_prompt(_PROMPT_CURRENCY, _KB_CURRENCY_SUBMENU),
+    "unit_menu": _static_prompt(_PROMPT_UNIT, _KB_UNIT_SUBMENU),
+    "date_menu": _static_prompt(_PROMPT_DATE_MENU, _KB_DATE_SUBMENU),
+    "price_menu": _static_prompt(_PROMPT_PRICE, _KB_PRICE_SUBMENU),
+    "weather_menu": _static_prompt(_PROMPT_WEATHER, _KB_BACK),
+    "calculator_menu": _static_prompt(_PROMPT_CALCULATOR, _KB_BACK),
+    "translate_menu": _static_prompt(_PROMPT_TRANSLATE, _KB_BACK),
+    "settings_menu": _static_prompt(_PROMPT_SETTINGS, _KB_SETTINGS),
+}
+
+async def send_static(query, key: str):
+    """ویرایش پیام با یکی از متن‌های ثابت _STATIC_PROMPTS"""
+    text, parse_mode, markup = _STATIC_PROMPTS[key]
+    await query.edit_message_text(text, parse_mode=parse_mode, reply_markup=markup)
+
+MENU_DISPATCH: Dict[str, Callable[..., Awaitable[None]]] = {
+    "restart": _menu_restart,
+    "price_crypto_usd": lambda query, user_id: show_crypto_usd_prices(query),
+    "price_crypto_irr": lambda query, user_id: show_crypto_irr_prices(query),
+    "price_tgju": lambda query, user_id: show_tgju_prices(query),
+    "price_all": lambda query, user_id: show_all_prices(query),
+    "my_stats": _menu_my_stats,
+}
+MENU_DISPATCH.update({
+    key: (lambda query, user_id, key=key: show_asset(query, key))
+    for key in _PRICE_SPECS
+})
+
+# دستورات اسلش؛ همه با یک CommandHandler ثبت و از این جدول فراخوانی می‌شوند
+COMMAND_DISPATCH: Dict[str, Callable[..., Awaitable[None]]] = {
+    "start": start,
+    "restart": restart_command,
+    "help": help_command,
+    "basket": basket_command,
+    "popular": popular_command,
+    "menu": menu_command,
+    "settings": settings_command,
+    "admin": admin_command,
+    "price": price_command,
+}
+
+async def _command_router(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # "/Price@MyBot 10" -> "price"
+    name = update.effective_message.text.split(maxsplit=1)[0][1:].split("@", 1)[0].lower()
+    await COMMAND_DISPATCH[name](update, context)
+
+# کلیدها بدون پیشوند admin_
+ADMIN_DISPATCH: Dict[str, Callable[..., Awaitable[None]]] = {
+    "dashboard": _admin_dashboard,
+    "stats": _admin_stats,
+    "users": _admin_users,
+    "user_list": _admin_user_list,
+    "broadcast": _admin_broadcast,
+    "settings": _admin_settings,
+    "maintenance": _admin_maintenance,
+    "cache": _admin_cache,
+    "cache_clear": _admin_cache_clear,
+    "cache_clear_all": _admin_cache_clear_all,
+    "alerts": _admin_alerts,
+    "logs": _admin_logs,
+    "back_to_admin": _admin_dashboard,
+}
 
 # ---- اجرای برنامه ----
+async def _open_http_session(app_):
+    """یک نشست HTTP مشترک برای همه سرویس‌ها"""
+    # با نصب Brotli، aiohttp خودش br را در Accept-Encoding اعلام و پاسخ را باز می‌کند
+    http = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=100, limit_per_host=64, ttl_dns_cache=300, keepalive_timeout=60
+        ),
+        headers={"User-Agent": USER_AGENT},
+    )
+    app_.bot_data["http"] = http
+    for service in (price_tracker, currency_converter, weather_service, translation_service):
+        # نشستی که سرویس پیش از راه‌اندازی به‌تنهایی ساخته بسته می‌شود
+        own = service.session
+        service.session = http
+        if own is not None and not own.closed:
+            await own.close()
+
+async def _close_http_session(app_):
+    http = app_.bot_data.pop("http", None)
+    if http is not None:
+        await http.close()
+    await price_tracker.aclose()
+
 def main():
-    app = ApplicationBuilder().token("8308943984:AAGpg52VoSSpuwWRpVrDRZ-4SDA52__ybqQ").build()
+    if not TOKEN:
+        raise RuntimeError("TG_TOKEN environment variable is not set")
+    # پیام‌ها به‌طور پیش‌فرض Markdown هستند؛ متن‌های خام parse_mode=None می‌فرستند
+    defaults = Defaults(parse_mode=ParseMode.MARKDOWN, block=False)
+    app = ApplicationBuilder().token(TOKEN).defaults(defaults).concurrent_updates(256).build()
+
+    async def on_startup(app_):
+        app_.bot_data["db_writer"] = asyncio.create_task(_db_writer())
+        await _open_http_session(app_)
+        # DNS و اتصال‌های keep-alive به منابع قیمت را پیش از اولین درخواست گرم می‌کنیم
+        app_.bot_data["warm_up"] = asyncio.create_task(price_tracker.warm_up())
 
-    async def setup_menu_button(app_):
         try:
-            await app_.bot.set_chat_menu_button(
-                menu_button=MenuButtonWebApp(
-                    text="Open",
-                    web_app=WebAppInfo(url="https://tabdila.vercel.app/")
-                )
-            )
+            await app_.bot.set_chat_menu_button(menu_button=_MENU_BUTTON)
         except Exception as e:
-            logging.warning(f"Failed to set menu button: {e}")
+            logger.warning("Failed to set menu button: %s", e)
 
-    app.post_init = setup_menu_button
+    async def on_shutdown(app_):
+        warm_up = app_.bot_data.pop("warm_up", None)
+        if warm_up is not None:
+            warm_up.cancel()
+
+        await _close_http_session(app_)
+
+        writer = app_.bot_data.pop("db_writer", None)
+        if writer is not None:
+            writer.cancel()
+        _drain_db_queue()
+
+        if _calc_pool is not None:
+            _calc_pool.shutdown(wait=False, cancel_futures=True)
+
+    app.post_init = on_startup
+    app.post_shutdown = on_shutdown
     
     # Command handlers
-    app.add_handler(CommandHandler("start", start))
-    app.add_handler(CommandHandler("restart", restart_command))
-    app.add_handler(CommandHandler("help", help_command))
-    app.add_handler(CommandHandler("basket", basket_command))
-    app.add_handler(CommandHandler("popular", popular_command))
-    app.add_handler(CommandHandler("menu", menu_command))
-    app.add_handler(CommandHandler("settings", settings_command))
-    app.add_handler(CommandHandler("admin", admin_command))
-    app.add_handler(CommandHandler("price", price_command))
+    app.add_handler(CommandHandler(COMMAND_DISPATCH.keys(), _command_router))
     
     # Callback and message handlers
-    app.add_handler(CallbackQueryHandler(handle_menu))
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+    app.add_handler(CallbackQueryHandler(handle_menu, block=False))
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND & ~filters.Regex(r"^/"), handle_message, block=False))
     app.add_handler(MessageHandler(filters.StatusUpdate.WEB_APP_DATA, handle_webapp_data))
     
-    app.run_polling()
+    allowed_updates = [Update.MESSAGE, Update.CALLBACK_QUERY]
+    if WEBHOOK_URL:
+        app.run_webhook(
+            listen="0.0.0.0",
+            port=WEBHOOK_PORT,
+            url_path=WEBHOOK_PATH,
+            webhook_url=f"{WEBHOOK_URL}/{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET,
+            bootstrap_retries=-1,
+            allowed_updates=allowed_updates
+        )
+    else:
+        app.run_polling(
+            poll_interval=0.0,
+            timeout=30,
+            bootstrap_retries=-1,
+            allowed_updates=allowed_updates
+        )
 
 if __name__ == "__main__":
     main()
@@ -1,19 +1,107 @@
 import asyncio
+import heapq
 import logging
+import operator
+import random
+import sqlite3
+import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 import json
+from types import MappingProxyType
+
+import aiohttp
+
+from currency_converter import CurrencyConverter
+from price_tracker import PriceTracker
 
 logger = logging.getLogger(__name__)
 
+_EMOJI_MAP = MappingProxyType({
+    "reminder": "⏰",
+    "alert": "🚨",
+    "info": "ℹ️",
+    "warning": "⚠️",
+    "success": "✅",
+    "error": "❌"
+})
+
+_CONDITION_TEXT = MappingProxyType({
+    "above": "بالاتر از",
+    "below": "پایین‌تر از",
+    "equals": "برابر با"
+})
+
+# Failures worth retrying quietly; anything else is logged with a traceback
+_TRANSIENT_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError, sqlite3.OperationalError)
+
+# condition -> (current_price, target_price) -> bool
+_TRIGGERS = MappingProxyType({
+    "above": operator.gt,
+    "below": operator.lt,
+    "equals": lambda current, target: abs(current - target) < target * 0.01,  # 1% tolerance
+})
+
+_VALID_CONDITIONS = frozenset(_TRIGGERS)
+_VALID_ASSET_TYPES = frozenset({"crypto", "stock", "currency"})
+
+_ALERT_TMPL = (
+    "🚨 **هشدار قیمت**\n\n"
+    "💰 **{sym}**\n"
+    "📊 قیمت فعلی: ${price:.2f}\n"
+    "🎯 هدف: {cond} ${target:.2f}\n"
+    "⏰ زمان: {ts}"
+)
+_NOTIFICATION_TMPL = "{emoji} **{kind}**\n\n{message}"
+_ALERT_LIST_ITEM_TMPL = (
+    "{i}. 💰 **{sym}**\n"
+    "   🎯 {cond} ${target:.2f}\n"
+    "   📅 ایجاد: {created}\n"
+    "   🆔 ID: {id}\n"
+)
+
 class NotificationService:
     """Notification system for price alerts and reminders"""
     
-    def __init__(self, database, bot_application):
+    def __init__(self, database, bot_application,
+                 price_tracker: Optional[PriceTracker] = None,
+                 currency_converter: Optional[CurrencyConverter] = None):
         self.db = database
         self.bot = bot_application
         self.running = False
         self.check_interval = 60  # Check every minute
+        # Outgoing messages: at most send_concurrency in flight, spaced to Telegram's ~30 msg/s global limit
+        self.send_concurrency = 25
+        self.send_rate = 30
+        self._send_semaphore = asyncio.Semaphore(self.send_concurrency)
+        self._next_send_at = 0.0
+        # Reuse the bot's services when given, so their HTTP sessions and caches are shared
+        self.price_tracker = price_tracker or PriceTracker(database)
+        self.currency_converter = currency_converter or CurrencyConverter(database)
+        # asset_type -> (fetch coroutine, result field holding the price)
+        self._fetchers = {
+            "crypto": (self.price_tracker.get_crypto_price, "price"),
+            "stock": (self.price_tracker.get_stock_price, "price"),
+            "currency": (lambda symbol: self.currency_converter.convert_currency(1, symbol, "USD"), "rate"),
+        }
+        # (asset_type, asset_symbol) -> (price, fetched_at)
+        self.price_ttl = 30
+        self._price_cache: Dict[tuple, tuple] = {}
+        # Active alerts by id, kept in step with create/cancel/trigger; fully reloaded every alerts_refresh seconds
+        self.alerts_refresh = 600
+        self._alerts_cache: Optional[Dict[int, Dict[str, Any]]] = None
+        self._alerts_loaded_at = 0.0
+        # Min-heap of (due_timestamp, notification_id, notification); the scheduler sleeps until the head is due
+        self._schedule: List[tuple] = []
+        self._wakeup = asyncio.Event()
+        # Other code (admin broadcasts, ...) writes notifications straight to the DB, so unsent rows
+        # are re-read every pending_poll seconds; ids already queued or being sent are not pushed twice
+        self.pending_poll = 60
+        self.pending_page_size = 500
+        self._queued_ids: set = set()
+        self._last_poll = 0.0
+        self._scheduler_task: Optional[asyncio.Task] = None
+        self._stop_event: Optional[asyncio.Event] = None
         
     async def start_notification_service(self):
         """Start the notification service"""
@@ -21,87 +109,202 @@ class NotificationService:
             return
         
         self.running = True
+        self._stop_event = asyncio.Event()
         logger.info("Notification service started")
         
+        self._scheduler_task = asyncio.create_task(self._run_scheduler())
+        
+        # Price alerts still need periodic fetches
+        self._consecutive_errors = 0
         while self.running:
             try:
                 await self._check_price_alerts()
-                await self._check_scheduled_notifications()
-                await asyncio.sleep(self.check_interval)
+                self._consecutive_errors = 0
+                delay = self.check_interval
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logger.error(f"Notification service error: {e}")
-                await asyncio.sleep(self.check_interval)
+                self._consecutive_errors += 1
+                if isinstance(e, _TRANSIENT_ERRORS):
+                    logger.warning("Price alert check failed (%s in a row): %s", self._consecutive_errors, e)
+                else:
+                    logger.exception("Price alert check crashed")
+                # Exponential backoff with jitter so an outage does not turn into a retry storm
+                delay = min(self.check_interval * 2 ** self._consecutive_errors, 600) + random.uniform(0, 5)
+            # Sleep until the next tick, or return at once when stop_notification_service is called
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
     
     def stop_notification_service(self):
         """Stop the notification service"""
         self.running = False
+        if self._stop_event is not None:
+            self._stop_event.set()
+        if self._scheduler_task is not None:
+            self._scheduler_task.cancel()
+            self._scheduler_task = None
         logger.info("Notification service stopped")
     
+    def _read_pending(self) -> List[Dict[str, Any]]:
+        """All unsent notifications, read page by page (runs in a worker thread)"""
+        pending = []
+        after_id = 0
+        while True:
+            page = self.db.get_pending_notifications(self.pending_page_size, after_id)
+            pending += page
+            if len(page) < self.pending_page_size:
+                return pending
+            after_id = page[-1]["id"]
+    
+    async def _poll_pending(self):
+        """Queue unsent DB notifications that are not on the heap yet"""
+        self._last_poll = time.monotonic()
+        for notification in await asyncio.to_thread(self._read_pending):
+            if notification["id"] not in self._queued_ids:
+                self._push_notification(notification)
+    
+    def _push_notification(self, notification: Dict[str, Any]):
+        """Queue a notification for its scheduled time (now, if it has none)"""
+        if notification["id"] in self._queued_ids:
+            return
+        self._queued_ids.add(notification["id"])
+        scheduled = (notification.get("data") or {}).get("scheduled_time")
+        due = datetime.fromisoformat(scheduled).timestamp() if scheduled else time.time()
+        heapq.heappush(self._schedule, (due, notification["id"], notification))
+        self._wakeup.set()
+    
+    async def _run_scheduler(self):
+        """Send notifications exactly when they fall due instead of polling"""
+        while self.running:
+            try:
+                until_poll = self.pending_poll - (time.monotonic() - self._last_poll)
+                if until_poll <= 0:
+                    await self._poll_pending()
+                    continue
+                
+                delay = self._schedule[0][0] - time.time() if self._schedule else until_poll
+                if delay > 0:
+                    # An earlier reminder may be pushed while we sleep; wake for the next DB poll too
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=min(delay, until_poll))
+                    except asyncio.TimeoutError:
+                        pass
+                    self._wakeup.clear()
+                    continue
+                
+                now = time.time()
+                due = []
+                while self._schedule and self._schedule[0][0] <= now:
+                    due.append(heapq.heappop(self._schedule)[2])
+                await self._check_scheduled_notifications(due)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Notification scheduler error: %s", e)
+    
+    def _active_alerts(self) -> List[Dict[str, Any]]:
+        """Active alerts from memory, reloading from the DB when missing or older than alerts_refresh"""
+        now = time.monotonic()
+        if self._alerts_cache is None or now - self._alerts_loaded_at >= self.alerts_refresh:
+            self._alerts_cache = {a["id"]: a for a in self.db.get_active_price_alerts()}
+            self._alerts_loaded_at = now
+        return list(self._alerts_cache.values())
+    
+    def _forget_alerts(self, alert_ids: List[int]):
+        if self._alerts_cache is not None:
+            for alert_id in alert_ids:
+                self._alerts_cache.pop(alert_id, None)
+    
     async def _check_price_alerts(self):
-        """Check price alerts and send notifications"""
-        try:
-            alerts = self.db.get_active_price_alerts()
-            
-            for alert in alerts:
+        """Check price alerts and send notifications (errors propagate to the backoff loop)"""
+        alerts = self._active_alerts()
+        
+        # Group alerts by asset so each price is fetched once, all buckets in parallel
+        by_symbol: Dict[tuple, List[Dict[str, Any]]] = {}
+        for alert in alerts:
+            by_symbol.setdefault((alert["asset_type"], alert["asset_symbol"]), []).append(alert)
+        keys = list(by_symbol)
+        results = await asyncio.gather(
+            *[self._get_current_price(asset_type, symbol) for asset_type, symbol in keys],
+            return_exceptions=True
+        )
+        
+        fired = []
+        for key, current_price in zip(keys, results):
+            if isinstance(current_price, BaseException):
+                logger.error("Error getting price for %s: %s", key[1], current_price)
+                continue
+            if not current_price:
+                continue
+            
+            for alert in by_symbol[key]:
                 try:
-                    # Get current price
-                    current_price = await self._get_current_price(alert["asset_type"], alert["asset_symbol"])
-                    
-                    if current_price and self._should_trigger_alert(alert, current_price):
-                        await self._send_price_alert(alert, current_price)
-                        
+                    if self._should_trigger_alert(alert, current_price):
+                        fired.append((alert, current_price))
                 except Exception as e:
-                    logger.error(f"Error checking alert {alert['id']}: {e}")
-                    
-        except Exception as e:
-            logger.error(f"Error checking price alerts: {e}")
+                    logger.error("Error checking alert %s: %s", alert['id'], e)
+        
+        # One clock read per tick, shared by every alert sent in it
+        sent_at = time.strftime('%Y-%m-%d %H:%M:%S')
+        delivered = await asyncio.gather(
+            *[self._send_price_alert(alert, price, sent_at) for alert, price in fired]
+        )
+        triggered_ids = [alert["id"] for (alert, _), ok in zip(fired, delivered) if ok]
+        
+        # One transaction for every alert that fired this tick
+        self.db.deactivate_price_alerts_bulk(triggered_ids)
+        self._forget_alerts(triggered_ids)
     
     async def _get_current_price(self, asset_type: str, asset_symbol: str) -> Optional[float]:
-        """Get current price for an asset"""
+        """Get current price for an asset, reusing prices fetched in the last price_ttl seconds"""
+        key = (asset_type, asset_symbol)
+        hit = self._price_cache.get(key)
+        now = time.monotonic()
+        if hit is not None and now - hit[1] < self.price_ttl:
+            return hit[0]
+        
+        price = await self._fetch_current_price(asset_type, asset_symbol)
+        if price is not None:
+            self._price_cache[key] = (price, now)
+        else:
+            self._price_cache.pop(key, None)
+        return price
+    
+    async def _fetch_current_price(self, asset_type: str, asset_symbol: str) -> Optional[float]:
+        """Fetch current price for an asset"""
         try:
-            if asset_type == "crypto":
-                # Use price tracker for crypto
-                from price_tracker import PriceTracker
-                tracker = PriceTracker(self.db)
-                result = await tracker.get_crypto_price(asset_symbol)
-                return result.get("price") if result["success"] else None
-            
-            elif asset_type == "stock":
-                # Use price tracker for stocks
-                from price_tracker import PriceTracker
-                tracker = PriceTracker(self.db)
-                result = await tracker.get_stock_price(asset_symbol)
-                return result.get("price") if result["success"] else None
-            
-            elif asset_type == "currency":
-                # Use currency converter for forex
-                from currency_converter import CurrencyConverter
-                converter = CurrencyConverter(self.db)
-                result = await converter.convert_currency(1, asset_symbol, "USD")
-                return result.get("rate") if result["success"] else None
-            
-            return None
+            fetcher = self._fetchers.get(asset_type)
+            if fetcher is None:
+                return None
+            fetch, field = fetcher
+            result = await fetch(asset_symbol)
+            return result.get(field) if result["success"] else None
             
         except Exception as e:
-            logger.error(f"Error getting price for {asset_symbol}: {e}")
+            logger.error("Error getting price for %s: %s", asset_symbol, e)
             return None
     
     def _should_trigger_alert(self, alert: Dict[str, Any], current_price: float) -> bool:
         """Check if alert should be triggered"""
-        target_price = alert["target_price"]
-        condition = alert["condition"]
-        
-        if condition == "above" and current_price > target_price:
-            return True
-        elif condition == "below" and current_price < target_price:
-            return True
-        elif condition == "equals" and abs(current_price - target_price) < target_price * 0.01:  # 1% tolerance
-            return True
-        
-        return False
+        trigger = _TRIGGERS.get(alert["condition"])
+        return trigger is not None and trigger(current_price, alert["target_price"])
+    
+    async def _send(self, chat_id: int, text: str):
+        """send_message through the shared concurrency cap and rate limiter"""
+        async with self._send_semaphore:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            slot = max(now, self._next_send_at)
+            self._next_send_at = slot + 1 / self.send_rate
+            if slot > now:
+                await asyncio.sleep(slot - now)
+            await self.bot.bot.send_message(chat_id=chat_id, text=text, parse_mode=None)
     
-    async def _send_price_alert(self, alert: Dict[str, Any], current_price: float):
-        """Send price alert notification"""
+    async def _send_price_alert(self, alert: Dict[str, Any], current_price: float,
+                                sent_at: Optional[str] = None) -> bool:
+        """Send price alert notification; returns True once it was delivered"""
         try:
             user_id = alert["user_id"]
             asset_symbol = alert["asset_symbol"]
@@ -109,44 +312,47 @@ class NotificationService:
             condition = alert["condition"]
             
             # Format message
-            condition_text = {
-                "above": "بالاتر از",
-                "below": "پایین‌تر از",
-                "equals": "برابر با"
-            }.get(condition, condition)
+            condition_text = _CONDITION_TEXT.get(condition, condition)
             
-            message = f"🚨 **هشدار قیمت**\n\n"
-            message += f"💰 **{asset_symbol}**\n"
-            message += f"📊 قیمت فعلی: ${current_price:.2f}\n"
-            message += f"🎯 هدف: {condition_text} ${target_price:.2f}\n"
-            message += f"⏰ زمان: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+            message = _ALERT_TMPL.format(
+                sym=asset_symbol,
+                price=current_price,
+                cond=condition_text,
+                target=target_price,
+                ts=sent_at or time.strftime('%Y-%m-%d %H:%M:%S')
+            )
             
             # Send notification
-            await self.bot.bot.send_message(chat_id=user_id, text=message)
-            
-            # Deactivate alert
-            self.db.deactivate_price_alert(alert["id"])
+            await self._send(user_id, message)
             
-            logger.info(f"Price alert sent to user {user_id} for {asset_symbol}")
+            logger.info("Price alert sent to user %s for %s", user_id, asset_symbol)
+            return True
             
         except Exception as e:
-            logger.error(f"Error sending price alert: {e}")
+            logger.error("Error sending price alert: %s", e)
+            return False
     
-    async def _check_scheduled_notifications(self):
-        """Check and send scheduled notifications"""
+    async def _check_scheduled_notifications(self, notifications: List[Dict[str, Any]]):
+        """Send the given due notifications"""
         try:
-            notifications = self.db.get_pending_notifications()
+            sent_ids = []
             
-            for notification in notifications:
+            async def _one(notification):
                 try:
                     await self._send_scheduled_notification(notification)
-                    self.db.mark_notification_sent(notification["id"])
+                    sent_ids.append(notification["id"])
                     
                 except Exception as e:
-                    logger.error(f"Error sending notification {notification['id']}: {e}")
+                    logger.error("Error sending notification %s: %s", notification['id'], e)
+            
+            await asyncio.gather(*(_one(n) for n in notifications))
+            self.db.mark_notifications_sent_bulk(sent_ids)
                     
         except Exception as e:
-            logger.error(f"Error checking scheduled notifications: {e}")
+            logger.error("Error checking scheduled notifications: %s", e)
+        finally:
+            # Rows that were not marked sent are picked up again by the next DB poll
+            self._queued_ids.difference_update(n["id"] for n in notifications)
     
     async def _send_scheduled_notification(self, notification: Dict[str, Any]):
         """Send scheduled notification"""
@@ -155,47 +361,36 @@ class NotificationService:
             message = notification["message"]
             notification_type = notification["notification_type"]
             
-            # Add emoji based on notification type
-            emoji_map = {
-                "reminder": "⏰",
-                "alert": "🚨",
-                "info": "ℹ️",
-                "warning": "⚠️",
-                "success": "✅",
-                "error": "❌"
-            }
+            emoji = _EMOJI_MAP.get(notification_type, "📢")
+            formatted_message = _NOTIFICATION_TMPL.format(emoji=emoji, kind=notification_type.upper(), message=message)
             
-            emoji = emoji_map.get(notification_type, "📢")
-            formatted_message = f"{emoji} **{notification_type.upper()}**\n\n{message}"
+            await self._send(user_id, formatted_message)
             
-            await self.bot.bot.send_message(chat_id=user_id, text=formatted_message)
-            
-            logger.info(f"Notification sent to user {user_id}")
+            logger.info("Notification sent to user %s", user_id)
             
         except Exception as e:
-            logger.error(f"Error sending scheduled notification: {e}")
+            logger.error("Error sending scheduled notification: %s", e)
     
     async def create_price_alert(self, user_id: int, asset_type: str, asset_symbol: str, 
                                target_price: float, condition: str) -> Dict[str, Any]:
         """Create a new price alert"""
         try:
             # Validate condition
-            if condition not in ["above", "below", "equals"]:
+            if condition not in _VALID_CONDITIONS:
                 return {
                     "success": False,
                     "error": "Invalid condition. Use 'above', 'below', or 'equals'"
                 }
             
             # Validate asset type
-            if asset_type not in ["crypto", "stock", "currency"]:
+            if asset_type not in _VALID_ASSET_TYPES:
                 return {
                     "success": False,
                     "error": "Invalid asset type. Use 'crypto', 'stock', or 'currency'"
                 }
             
             # Check if user already has too many alerts
-            user_alerts = [a for a in self.db.get_active_price_alerts() if a["user_id"] == user_id]
-            if len(user_alerts) >= 10:  # Limit to 10 alerts per user
+            if self.db.count_active_alerts_for_user(user_id) >= 10:  # Limit to 10 alerts per user
                 return {
                     "success": False,
                     "error": "Maximum number of alerts reached (10)"
@@ -203,6 +398,8 @@ class NotificationService:
             
             # Create alert
             alert_id = self.db.add_price_alert(user_id, asset_type, asset_symbol, target_price, condition)
+            # The DB call does not return the stored row, so reload on the next tick
+            self._alerts_cache = None
             
             return {
                 "success": True,
@@ -211,7 +408,7 @@ class NotificationService:
             }
             
         except Exception as e:
-            logger.error(f"Error creating price alert: {e}")
+            logger.error("Error creating price alert: %s", e)
             return {
                 "success": False,
                 "error": f"Failed to create price alert: {str(e)}"
@@ -228,8 +425,22 @@ class NotificationService:
                     "error": "Scheduled time must be in the future"
                 }
             
-            # Create notification
-            self.db.add_notification(user_id, "reminder", message, scheduled_time)
+            # Create notification and hand it to the scheduler
+            data = {"scheduled_time": scheduled_time.isoformat()}
+            notification_id = self.db.add_notification(user_id, "reminder", message, data)
+            if notification_id is None:
+                return {
+                    "success": False,
+                    "error": "Failed to store reminder"
+                }
+            if self.running:
+                self._push_notification({
+                    "id": notification_id,
+                    "user_id": user_id,
+                    "notification_type": "reminder",
+                    "message": message,
+                    "data": data
+                })
             
             return {
                 "success": True,
@@ -237,7 +448,7 @@ class NotificationService:
             }
             
         except Exception as e:
-            logger.error(f"Error creating reminder: {e}")
+            logger.error("Error creating reminder: %s", e)
             return {
                 "success": False,
                 "error": f"Failed to create reminder: {str(e)}"
@@ -247,20 +458,10 @@ class NotificationService:
                                         notification_type: str = "info") -> Dict[str, Any]:
         """Send immediate notification to user"""
         try:
-            # Add emoji based on notification type
-            emoji_map = {
-                "reminder": "⏰",
-                "alert": "🚨",
-                "info": "ℹ️",
-                "warning": "⚠️",
-                "success": "✅",
-                "error": "❌"
-            }
+            emoji = _EMOJI_MAP.get(notification_type, "📢")
+            formatted_message = _NOTIFICATION_TMPL.format(emoji=emoji, kind=notification_type.upper(), message=message)
             
-            emoji = emoji_map.get(notification_type, "📢")
-            formatted_message = f"{emoji} **{notification_type.upper()}**\n\n{message}"
-            
-            await self.bot.bot.send_message(chat_id=user_id, text=formatted_message)
+            await self._send(user_id, formatted_message)
             
             return {
                 "success": True,
@@ -268,7 +469,7 @@ class NotificationService:
             }
             
         except Exception as e:
-            logger.error(f"Error sending immediate notification: {e}")
+            logger.error("Error sending immediate notification: %s", e)
             return {
                 "success": False,
                 "error": f"Failed to send notification: {str(e)}"
@@ -277,30 +478,27 @@ class NotificationService:
     async def get_user_alerts(self, user_id: int) -> List[Dict[str, Any]]:
         """Get all active alerts for a user"""
         try:
-            all_alerts = self.db.get_active_price_alerts()
-            user_alerts = [alert for alert in all_alerts if alert["user_id"] == user_id]
-            
-            return user_alerts
+            return self.db.get_active_price_alerts_for_user(user_id)
             
         except Exception as e:
-            logger.error(f"Error getting user alerts: {e}")
+            logger.error("Error getting user alerts: %s", e)
             return []
     
     async def cancel_alert(self, user_id: int, alert_id: int) -> Dict[str, Any]:
         """Cancel a price alert"""
         try:
             # Verify alert belongs to user
-            alerts = self.db.get_active_price_alerts()
-            user_alert = next((a for a in alerts if a["id"] == alert_id and a["user_id"] == user_id), None)
+            user_alert = self.db.get_alert_by_id(alert_id)
             
-            if not user_alert:
+            if not user_alert or user_alert["user_id"] != user_id:
                 return {
                     "success": False,
                     "error": "Alert not found or doesn't belong to user"
                 }
             
             # Deactivate alert
-            self.db.deactivate_price_alert(alert_id)
+            self.db.deactivate_price_alerts_bulk([alert_id])
+            self._forget_alerts([alert_id])
             
             return {
                 "success": True,
@@ -308,7 +506,7 @@ class NotificationService:
             }
             
         except Exception as e:
-            logger.error(f"Error cancelling alert: {e}")
+            logger.error("Error cancelling alert: %s", e)
             return {
                 "success": False,
                 "error": f"Failed to cancel alert: {str(e)}"
@@ -319,19 +517,15 @@ class NotificationService:
         if not alerts:
             return "📋 هیچ هشدار فعالی ندارید"
         
-        output = "📋 **هشدارهای فعال شما:**\n\n"
-        
+        lines = ["📋 **هشدارهای فعال شما:**\n"]
         for i, alert in enumerate(alerts, 1):
-            condition_text = {
-                "above": "بالاتر از",
-                "below": "پایین‌تر از",
-                "equals": "برابر با"
-            }.get(alert["condition"], alert["condition"])
-            
-            output += f"{i}. 💰 **{alert['asset_symbol']}**\n"
-            output += f"   🎯 {condition_text} ${alert['target_price']:.2f}\n"
-            output += f"   📅 ایجاد: {alert['created_at']}\n"
-            output += f"   🆔 ID: {alert['id']}\n\n"
-        
-        return output
+            lines.append(_ALERT_LIST_ITEM_TMPL.format(
+                i=i,
+                sym=alert["asset_symbol"],
+                cond=_CONDITION_TEXT.get(alert["condition"], alert["condition"]),
+                target=alert["target_price"],
+                created=alert["created_at"],
+                id=alert["id"]
+            ))
+        return "\n".join(lines) + "\n"
 
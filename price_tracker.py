@@ -1,23 +1,109 @@
 import requests
-import json
 import asyncio
+import functools
+import operator
+import time
 import aiohttp
 from datetime import datetime, timedelta
+from itertools import compress
 from typing import Dict, List, Optional, Any
+from urllib.parse import urlsplit
 import logging
 
+from tabdila_pro._json import json_dumps, json_loads
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis is optional; the SQLite cache is used without it
+    aioredis = None
+
 # Import new price sources
 from binance_popular import get_popular_data
 from tgju import fetch_mofid_basket
 from crypto_prices import fetch_top_cryptos
+from tabdila_pro._cache import (
+    async_ttl_cache, memo_by_identity, CACHE_TTL_COMMODITY, CACHE_TTL_CRYPTO, CACHE_TTL_HISTORY, CACHE_TTL_STOCK,
+    CACHE_TTL_TGJU
+)
+from tabdila_pro._http import SharedSessionMixin
+from tabdila_pro.config import REDIS_URL, USER_AGENT
 
 logger = logging.getLogger(__name__)
 
-class PriceTracker:
+_CRYPTO_SYMBOLS = ("BTC", "ETH", "BNB", "XRP", "ADA", "SOL", "DOT", "DOGE", "AVAX", "MATIC",
+                   "LTC", "BCH", "UNI", "LINK", "ATOM", "XLM", "VET", "FIL", "TRX", "ETC", "SHIB")
+
+# Provider symbol tables, built once at import instead of on every lookup
+_BINANCE_PAIRS = {s: f"{s}USDT" for s in _CRYPTO_SYMBOLS}
+_KUCOIN_PAIRS = {s: f"{s}-USDT" for s in _CRYPTO_SYMBOLS}
+_COINGECKO_IDS = {
+    "BTC": "bitcoin", "ETH": "ethereum", "BNB": "binancecoin",
+    "XRP": "ripple", "ADA": "cardano", "SOL": "solana",
+    "DOT": "polkadot", "DOGE": "dogecoin", "AVAX": "avalanche-2",
+    "MATIC": "matic-network", "LTC": "litecoin", "BCH": "bitcoin-cash",
+    "UNI": "uniswap", "LINK": "chainlink", "ATOM": "cosmos",
+    "XLM": "stellar", "VET": "vechain", "FIL": "filecoin",
+    "TRX": "tron", "ETC": "ethereum-classic", "SHIB": "shiba-inu"
+}
+_COMMODITY_MAP = {
+    "GOLD": "GC=F",
+    "SILVER": "SI=F",
+    "OIL": "CL=F",
+    "GAS": "NG=F",
+    "COPPER": "HG=F",
+    "WHEAT": "ZW=F"
+}
+
+# Per-request cap, so one slow upstream cannot hold a handler for aiohttp's 5-minute default
+_HTTP_TIMEOUT = aiohttp.ClientTimeout(total=10)
+# What a failing provider can raise: transport errors, timeouts, bad JSON / numbers (ValueError)
+# and payloads missing the fields we read
+_PROVIDER_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, ValueError, KeyError, IndexError,
+                    TypeError, AttributeError)
+# Trend emoji indexed by "change >= 0"
+_TREND_EMOJI = ("📉", "📈")
+# How long a price provider gets to answer before the next one is started alongside it
+_HEDGE_DELAY = 0.25
+
+@functools.lru_cache(maxsize=1)
+def _market_status(minute: int) -> str:
+    """Market status for an epoch minute; the status can only change once a minute"""
+    now = datetime.fromtimestamp(minute * 60)
+    if now.weekday() >= 5:
+        return "Weekend"
+    # US market hours (9:30 AM - 4:00 PM EST, Monday-Friday)
+    return "Open" if 570 <= now.hour * 60 + now.minute < 960 else "Closed"
+
+@functools.lru_cache(maxsize=None)
+def _price_selection_keyboard():
+    """The price source keyboard is static, so it is built once (telegram is imported lazily)"""
+    from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+    
+    keyboard = [
+        [
+            InlineKeyboardButton("💰 ارزهای دیجیتال (USD)", callback_data="price_crypto_usd"),
+            InlineKeyboardButton("🌐 ارزهای دیجیتال (IRR)", callback_data="price_crypto_irr")
+        ],
+        [
+            InlineKeyboardButton("🏦 دارایی‌ها (TGJU)", callback_data="price_tgju"),
+            InlineKeyboardButton("📊 همه قیمت‌ها", callback_data="price_all")
+        ],
+        [
+            InlineKeyboardButton("🔙 بازگشت", callback_data="back_to_main")
+        ]
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
+class PriceTracker(SharedSessionMixin):
     """Real-time price tracking for stocks, crypto, and commodities"""
     
     def __init__(self, database):
         self.db = database
+        
+        # Shared cache for the scraped sources when REDIS_URL is set, otherwise the DB cache
+        self.redis = aioredis.from_url(REDIS_URL) if aioredis is not None and REDIS_URL else None
+        # Background cache write-backs (held so they are not garbage-collected mid-flight)
+        self._pending_writes = set()
         self.api_keys = {
             "alpha_vantage": "",  # Add your API key
             "coinmarketcap": "",  # Add your API key
@@ -32,33 +118,151 @@ class PriceTracker:
             "finnhub": "https://finnhub.io/api/v1",
             "polygon": "https://api.polygon.io/v2",
             "yahoo_finance": "https://query1.finance.yahoo.com/v8/finance/chart",
+            "yahoo_quote": "https://query1.finance.yahoo.com/v7/finance/quote",
             "coingecko": "https://api.coingecko.com/api/v3",
             "binance": "https://api.binance.com/api/v3",
             "kucoin": "https://api.kucoin.com/api/v1",
             "cryptingup": "https://cryptingup.com/api"
         }
         
+        # Per-provider cap on in-flight requests, kept under each upstream's rate limit
+        self._provider_sems = {
+            "alpha_vantage": asyncio.Semaphore(2),
+            "coinmarketcap": asyncio.Semaphore(5),
+            "finnhub": asyncio.Semaphore(5),
+            "yahoo_finance": asyncio.Semaphore(10),
+            "coingecko": asyncio.Semaphore(5),
+            "binance": asyncio.Semaphore(20),
+            "kucoin": asyncio.Semaphore(10),
+            "cryptingup": asyncio.Semaphore(5)
+        }
+        
         # Supported asset types
         self.asset_types = {
             "stocks": ["AAPL", "GOOGL", "MSFT", "AMZN", "TSLA", "META", "NVDA", "NFLX"],
-            "crypto": ["BTC", "ETH", "BNB", "XRP", "ADA", "SOL", "DOT", "DOGE", "AVAX", "MATIC", 
-                      "LTC", "BCH", "UNI", "LINK", "ATOM", "XLM", "VET", "FIL", "TRX", "ETC", "SHIB"],
+            "crypto": list(_CRYPTO_SYMBOLS),
             "commodities": ["GOLD", "SILVER", "OIL", "GAS", "COPPER", "WHEAT"],
             "forex": ["USD", "EUR", "GBP", "JPY", "CHF", "CAD", "AUD"]
         }
     
+    def _new_session(self) -> aiohttp.ClientSession:
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=100, limit_per_host=20, ttl_dns_cache=300, keepalive_timeout=60,
+                enable_cleanup_closed=True
+            ),
+            timeout=_HTTP_TIMEOUT,
+            headers={"User-Agent": USER_AGENT},
+        )
+    
+    async def aclose(self):
+        """Finish pending cache writes and close the session this tracker created itself
+        (an injected one is left to its owner)"""
+        if self._pending_writes:
+            await asyncio.gather(*self._pending_writes, return_exceptions=True)
+        if self.redis is not None:
+            await self.redis.aclose()
+        own, self._own_session = self._own_session, None
+        if own is not None and not own.closed:
+            await own.close()
+    
+    async def warm_up(self):
+        """Resolve each provider host and open a keep-alive connection to it ahead of the first lookup"""
+        session = self._get_session()
+        
+        async def touch(provider, url):
+            parts = urlsplit(url)
+            try:
+                async with self._provider_sems[provider]:
+                    async with session.head(f"{parts.scheme}://{parts.netloc}/",
+                                            timeout=_HTTP_TIMEOUT, allow_redirects=False):
+                        pass
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.debug("Warm-up of %s failed: %s", provider, e)
+        
+        await asyncio.gather(*(touch(p, url) for p, url in self.endpoints.items() if p in self._provider_sems))
+    
+    def _cache_later(self, cache_key: str, payload: str, expires_in_minutes: int):
+        """Write to the DB cache in the background so the caller returns without waiting on disk"""
+        task = asyncio.create_task(self.db.aadd_to_cache(cache_key, payload, expires_in_minutes))
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+    
+    async def _source_cache_get(self, cache_key: str) -> Optional[Any]:
+        """Read a scraped-source cache entry from Redis, or the DB cache without it"""
+        if self.redis is not None:
+            try:
+                return await self.redis.get(cache_key)
+            except Exception as e:
+                logger.warning("Redis get failed, using DB cache: %s", e)
+        return await self.db.aget_from_cache(cache_key)
+    
+    def _source_cache_set(self, cache_key: str, payload: str, expires_in_minutes: int):
+        """Write a scraped-source cache entry to Redis (native TTL), or the DB cache without it"""
+        if self.redis is None:
+            self._cache_later(cache_key, payload, expires_in_minutes)
+            return
+        async def write():
+            try:
+                await self.redis.set(cache_key, payload, ex=expires_in_minutes * 60)
+            except Exception as e:
+                logger.warning("Redis set failed for %s: %s", cache_key, e)
+        
+        task = asyncio.create_task(write())
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+    
+    async def _http_get(self, provider: str, url: str, **kwargs):
+        """GET through the provider's semaphore; returns (status, parsed JSON or None)"""
+        session = self._get_session()
+        async with self._provider_sems[provider]:
+            async with session.get(url, timeout=_HTTP_TIMEOUT, **kwargs) as response:
+                if response.status != 200:
+                    return response.status, None
+                return response.status, json_loads(await response.read())
+    
+    async def _first_success(self, api_funcs, symbol: str, kind: str) -> Optional[Dict[str, Any]]:
+        """Hedged provider fallback: start the next provider when the current ones fail or
+        are still pending after _HEDGE_DELAY, and return the first success"""
+        async def attempt(api_func):
+            try:
+                result = await api_func(symbol)
+                if result["success"]:
+                    return result
+            except _PROVIDER_ERRORS as e:
+                logger.warning("%s API %s failed: %s", kind, api_func.__name__, e)
+            return None
+        
+        queue = list(api_funcs)
+        pending = set()
+        try:
+            while queue or pending:
+                if queue:
+                    pending.add(asyncio.ensure_future(attempt(queue.pop(0))))
+                done, pending = await asyncio.wait(
+                    pending, timeout=_HEDGE_DELAY if queue else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.result() is not None:
+                        return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+        return None
+    
+    @async_ttl_cache(CACHE_TTL_STOCK, key=lambda self, symbol: symbol.upper())
     async def get_stock_price(self, symbol: str) -> Dict[str, Any]:
         """Get real-time stock price"""
         symbol = symbol.upper()
         
         # Check cache first
-        cache_key = f"stock_{symbol}_{datetime.now().strftime('%Y%m%d%H%M')}"
-        cached_price = self.db.get_from_cache(cache_key)
+        cache_key = f"stock_{symbol}_{int(time.time()) // 60}"
+        cached_price = await self.db.aget_from_cache(cache_key)
         
         if cached_price:
             try:
-                return json.loads(cached_price)
-            except json.JSONDecodeError:
+                return json_loads(cached_price)
+            except ValueError:
                 pass
         
         # Try multiple APIs
@@ -68,16 +272,11 @@ class PriceTracker:
             self._get_finnhub_price
         ]
         
-        for api_func in apis_to_try:
-            try:
-                result = await api_func(symbol)
-                if result["success"]:
-                    # Cache for 5 minutes
-                    self.db.add_to_cache(cache_key, json.dumps(result), 5)
-                    return result
-            except Exception as e:
-                logger.warning(f"Stock API {api_func.__name__} failed: {e}")
-                continue
+        result = await self._first_success(apis_to_try, symbol, "Stock")
+        if result is not None:
+            # Cache for 5 minutes
+            self._cache_later(cache_key, json_dumps(result), 5)
+            return result
         
         return {
             "success": False,
@@ -94,35 +293,84 @@ class PriceTracker:
             "includePrePost": "true"
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if "chart" in data and "result" in data["chart"]:
-                        result = data["chart"]["result"][0]
-                        meta = result["meta"]
-                        quote = result["indicators"]["quote"][0]
-                        
-                        # Get latest price
-                        prices = quote["close"]
-                        latest_price = next((p for p in reversed(prices) if p is not None), None)
-                        
-                        if latest_price:
-                            return {
-                                "success": True,
-                                "symbol": symbol,
-                                "price": latest_price,
-                                "currency": meta.get("currency", "USD"),
-                                "change": meta.get("regularMarketChange", 0),
-                                "change_percent": meta.get("regularMarketChangePercent", 0),
-                                "volume": meta.get("regularMarketVolume", 0),
-                                "market_cap": meta.get("marketCap"),
-                                "timestamp": datetime.now().isoformat(),
-                                "source": "yahoo_finance"
-                            }
+        status, data = await self._http_get("yahoo_finance", url, params=params)
+        if status == 200:
+            if "chart" in data and "result" in data["chart"]:
+                result = data["chart"]["result"][0]
+                meta = result["meta"]
+                
+                # Latest price straight from meta; scan the close bars (in C) only if it is missing
+                latest_price = meta.get("regularMarketPrice")
+                if latest_price is None:
+                    prices = result["indicators"]["quote"][0].get("close") or []
+                    latest_price = next(filter(functools.partial(operator.is_not, None), reversed(prices)), None)
+                    
+                if latest_price:
+                    return {
+                        "success": True,
+                        "symbol": symbol,
+                        "price": latest_price,
+                        "currency": meta.get("currency", "USD"),
+                        "change": meta.get("regularMarketChange", 0),
+                        "change_percent": meta.get("regularMarketChangePercent", 0),
+                        "volume": meta.get("regularMarketVolume", 0),
+                        "market_cap": meta.get("marketCap"),
+                        "timestamp": datetime.now().isoformat(),
+                        "source": "yahoo_finance"
+                    }
         
         return {"success": False, "error": "Yahoo Finance API failed"}
     
+    async def _get_yahoo_finance_quotes(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get several quotes from Yahoo Finance in one request; symbols it omits are left out"""
+        url = self.endpoints["yahoo_quote"]
+        params = {"symbols": ",".join(symbols)}
+        
+        status, data = await self._http_get("yahoo_finance", url, params=params)
+        if status != 200 or not data:
+            return {}
+        
+        now_iso = datetime.now().isoformat()
+        quotes = {}
+        for quote in (data.get("quoteResponse") or {}).get("result") or []:
+            price = quote.get("regularMarketPrice")
+            if price is None:
+                continue
+            symbol = quote.get("symbol")
+            quotes[symbol] = {
+                "success": True,
+                "symbol": symbol,
+                "price": price,
+                "currency": quote.get("currency", "USD"),
+                "change": quote.get("regularMarketChange", 0),
+                "change_percent": quote.get("regularMarketChangePercent", 0),
+                "volume": quote.get("regularMarketVolume", 0),
+                "market_cap": quote.get("marketCap"),
+                "timestamp": now_iso,
+                "source": "yahoo_finance"
+            }
+        return quotes
+    
+    async def _get_index_prices(self, indices: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Batch quote for the indices, with per-symbol chart lookups for any the batch missed"""
+        try:
+            prices = await self._get_yahoo_finance_quotes(indices)
+        except _PROVIDER_ERRORS as e:
+            logger.warning("Yahoo batch quote failed: %s", e)
+            prices = {}
+        
+        missing = [index for index in indices if index not in prices]
+        results = await asyncio.gather(
+            *[self._get_yahoo_finance_price(index) for index in missing],
+            return_exceptions=True
+        )
+        for index, price_data in zip(missing, results):
+            if isinstance(price_data, Exception):
+                logger.warning("Failed to get %s: %s", index, price_data)
+            elif price_data["success"]:
+                prices[index] = price_data
+        return prices
+    
     async def _get_alpha_vantage_price(self, symbol: str) -> Dict[str, Any]:
         """Get stock price from Alpha Vantage"""
         if not self.api_keys["alpha_vantage"]:
@@ -135,23 +383,21 @@ class PriceTracker:
             "apikey": self.api_keys["alpha_vantage"]
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if "Global Quote" in data:
-                        quote = data["Global Quote"]
-                        
-                        return {
-                            "success": True,
-                            "symbol": symbol,
-                            "price": float(quote["05. price"]),
-                            "change": float(quote["09. change"]),
-                            "change_percent": float(quote["10. change percent"].rstrip('%')),
-                            "volume": int(quote["06. volume"]),
-                            "timestamp": datetime.now().isoformat(),
-                            "source": "alpha_vantage"
-                        }
+        status, data = await self._http_get("alpha_vantage", url, params=params)
+        if status == 200:
+            if "Global Quote" in data:
+                quote = data["Global Quote"]
+
+                return {
+                    "success": True,
+                    "symbol": symbol,
+                    "price": float(quote["05. price"]),
+                    "change": float(quote["09. change"]),
+                    "change_percent": float(quote["10. change percent"].rstrip('%')),
+                    "volume": int(quote["06. volume"]),
+                    "timestamp": datetime.now().isoformat(),
+                    "source": "alpha_vantage"
+                }
         
         return {"success": False, "error": "Alpha Vantage API failed"}
     
@@ -166,39 +412,38 @@ class PriceTracker:
             "token": self.api_keys["finnhub"]
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if "c" in data:  # Current price
-                        return {
-                            "success": True,
-                            "symbol": symbol,
-                            "price": data["c"],
-                            "change": data.get("d", 0),
-                            "change_percent": data.get("dp", 0),
-                            "high": data.get("h", 0),
-                            "low": data.get("l", 0),
-                            "open": data.get("o", 0),
-                            "previous_close": data.get("pc", 0),
-                            "timestamp": datetime.now().isoformat(),
-                            "source": "finnhub"
-                        }
+        status, data = await self._http_get("finnhub", url, params=params)
+        if status == 200:
+            if "c" in data:  # Current price
+                return {
+                    "success": True,
+                    "symbol": symbol,
+                    "price": data["c"],
+                    "change": data.get("d", 0),
+                    "change_percent": data.get("dp", 0),
+                    "high": data.get("h", 0),
+                    "low": data.get("l", 0),
+                    "open": data.get("o", 0),
+                    "previous_close": data.get("pc", 0),
+                    "timestamp": datetime.now().isoformat(),
+                    "source": "finnhub"
+                }
         
         return {"success": False, "error": "Finnhub API failed"}
     
+    @async_ttl_cache(CACHE_TTL_CRYPTO, key=lambda self, symbol: symbol.upper())
     async def get_crypto_price(self, symbol: str) -> Dict[str, Any]:
         """Get cryptocurrency price"""
         symbol = symbol.upper()
         
         # Check cache
-        cache_key = f"crypto_{symbol}_{datetime.now().strftime('%Y%m%d%H%M')}"
-        cached_price = self.db.get_from_cache(cache_key)
+        cache_key = f"crypto_{symbol}_{int(time.time()) // 120}"
+        cached_price = await self.db.aget_from_cache(cache_key)
         
         if cached_price:
             try:
-                return json.loads(cached_price)
-            except json.JSONDecodeError:
+                return json_loads(cached_price)
+            except ValueError:
                 pass
         
         # Try multiple APIs (prioritize free APIs)
@@ -210,16 +455,11 @@ class PriceTracker:
             self._get_coinmarketcap_price
         ]
         
-        for api_func in apis_to_try:
-            try:
-                result = await api_func(symbol)
-                if result["success"]:
-                    # Cache for 2 minutes
-                    self.db.add_to_cache(cache_key, json.dumps(result), 2)
-                    return result
-            except Exception as e:
-                logger.warning(f"Crypto API {api_func.__name__} failed: {e}")
-                continue
+        result = await self._first_success(apis_to_try, symbol, "Crypto")
+        if result is not None:
+            # Cache for 2 minutes
+            self._cache_later(cache_key, json_dumps(result), 2)
+            return result
         
         return {
             "success": False,
@@ -239,106 +479,76 @@ class PriceTracker:
         }
         params = {"symbol": symbol}
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if data.get("status", {}).get("error_code") == 0:
-                        crypto_data = data["data"][symbol]
-                        quote = crypto_data["quote"]["USD"]
-                        
-                        return {
-                            "success": True,
-                            "symbol": symbol,
-                            "name": crypto_data["name"],
-                            "price": quote["price"],
-                            "change_24h": quote.get("percent_change_24h", 0),
-                            "volume_24h": quote.get("volume_24h", 0),
-                            "market_cap": quote.get("market_cap", 0),
-                            "circulating_supply": crypto_data.get("circulating_supply", 0),
-                            "max_supply": crypto_data.get("max_supply"),
-                            "timestamp": datetime.now().isoformat(),
-                            "source": "coinmarketcap"
-                        }
+        status, data = await self._http_get("coinmarketcap", url, headers=headers, params=params)
+        if status == 200:
+            if data.get("status", {}).get("error_code") == 0:
+                crypto_data = data["data"][symbol]
+                quote = crypto_data["quote"]["USD"]
+
+                return {
+                    "success": True,
+                    "symbol": symbol,
+                    "name": crypto_data["name"],
+                    "price": quote["price"],
+                    "change_24h": quote.get("percent_change_24h", 0),
+                    "volume_24h": quote.get("volume_24h", 0),
+                    "market_cap": quote.get("market_cap", 0),
+                    "circulating_supply": crypto_data.get("circulating_supply", 0),
+                    "max_supply": crypto_data.get("max_supply"),
+                    "timestamp": datetime.now().isoformat(),
+                    "source": "coinmarketcap"
+                }
         
         return {"success": False, "error": "CoinMarketCap API failed"}
     
     async def _get_binance_price(self, symbol: str, convert_to: str = "USDT") -> Dict[str, Any]:
         """Get crypto price from Binance API (free and fast)"""
-        # Map symbols to Binance trading pairs
-        symbol_map = {
-            "BTC": "BTCUSDT", "ETH": "ETHUSDT", "BNB": "BNBUSDT",
-            "XRP": "XRPUSDT", "ADA": "ADAUSDT", "SOL": "SOLUSDT",
-            "DOT": "DOTUSDT", "DOGE": "DOGEUSDT", "AVAX": "AVAXUSDT",
-            "MATIC": "MATICUSDT", "LTC": "LTCUSDT", "BCH": "BCHUSDT",
-            "UNI": "UNIUSDT", "LINK": "LINKUSDT", "ATOM": "ATOMUSDT",
-            "XLM": "XLMUSDT", "VET": "VETUSDT", "FIL": "FILUSDT",
-            "TRX": "TRXUSDT", "ETC": "ETCUSDT", "SHIB": "SHIBUSDT"
-        }
-        
-        trading_pair = symbol_map.get(symbol.upper())
+        trading_pair = _BINANCE_PAIRS.get(symbol.upper())
         if not trading_pair:
             return {"success": False, "error": f"Symbol {symbol} not supported by Binance"}
         
         url = f"{self.endpoints['binance']}/ticker/price"
         params = {"symbol": trading_pair}
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    return {
-                        "success": True,
-                        "symbol": symbol,
-                        "price": float(data["price"]),
-                        "currency": "USDT",
-                        "trading_pair": trading_pair,
-                        "timestamp": datetime.now().isoformat(),
-                        "source": "binance"
-                    }
+        status, data = await self._http_get("binance", url, params=params)
+        if status == 200:
+            return {
+                "success": True,
+                "symbol": symbol,
+                "price": float(data["price"]),
+                "currency": "USDT",
+                "trading_pair": trading_pair,
+                "timestamp": datetime.now().isoformat(),
+                "source": "binance"
+            }
         
         return {"success": False, "error": "Binance API failed"}
     
     async def _get_kucoin_price(self, symbol: str, convert_to: str = "USDT") -> Dict[str, Any]:
         """Get crypto price from KuCoin API (free alternative)"""
-        # Map symbols to KuCoin trading pairs
-        symbol_map = {
-            "BTC": "BTC-USDT", "ETH": "ETH-USDT", "BNB": "BNB-USDT",
-            "XRP": "XRP-USDT", "ADA": "ADA-USDT", "SOL": "SOL-USDT",
-            "DOT": "DOT-USDT", "DOGE": "DOGE-USDT", "AVAX": "AVAX-USDT",
-            "MATIC": "MATIC-USDT", "LTC": "LTC-USDT", "BCH": "BCH-USDT",
-            "UNI": "UNI-USDT", "LINK": "LINK-USDT", "ATOM": "ATOM-USDT",
-            "XLM": "XLM-USDT", "VET": "VET-USDT", "FIL": "FIL-USDT",
-            "TRX": "TRX-USDT", "ETC": "ETC-USDT", "SHIB": "SHIB-USDT"
-        }
-        
-        trading_pair = symbol_map.get(symbol.upper())
+        trading_pair = _KUCOIN_PAIRS.get(symbol.upper())
         if not trading_pair:
             return {"success": False, "error": f"Symbol {symbol} not supported by KuCoin"}
         
         url = f"{self.endpoints['kucoin']}/market/orderbook/level1"
         params = {"symbol": trading_pair}
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    if data.get("code") == "200000":  # KuCoin success code
-                        order_data = data["data"]
-                        
-                        return {
-                            "success": True,
-                            "symbol": symbol,
-                            "price": float(order_data["price"]),
-                            "currency": "USDT",
-                            "trading_pair": trading_pair,
-                            "best_bid": float(order_data.get("bestBid", 0)),
-                            "best_ask": float(order_data.get("bestAsk", 0)),
-                            "timestamp": datetime.now().isoformat(),
-                            "source": "kucoin"
-                        }
+        status, data = await self._http_get("kucoin", url, params=params)
+        if status == 200:
+            if data.get("code") == "200000":  # KuCoin success code
+                order_data = data["data"]
+
+                return {
+                    "success": True,
+                    "symbol": symbol,
+                    "price": float(order_data["price"]),
+                    "currency": "USDT",
+                    "trading_pair": trading_pair,
+                    "best_bid": float(order_data.get("bestBid", 0)),
+                    "best_ask": float(order_data.get("bestAsk", 0)),
+                    "timestamp": datetime.now().isoformat(),
+                    "source": "kucoin"
+                }
         
         return {"success": False, "error": "KuCoin API failed"}
     
@@ -347,42 +557,28 @@ class PriceTracker:
         url = f"{self.endpoints['cryptingup']}/markets"
         params = {"symbol": f"{symbol.upper()}-{convert_to.upper()}"}
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    if "markets" in data and data["markets"]:
-                        market = data["markets"][0]  # Get first market
-                        
-                        return {
-                            "success": True,
-                            "symbol": symbol,
-                            "price": float(market["price"]),
-                            "currency": convert_to,
-                            "exchange": market.get("exchange", "Unknown"),
-                            "volume_24h": float(market.get("volume_24h", 0)),
-                            "change_24h": float(market.get("change_24h", 0)),
-                            "timestamp": datetime.now().isoformat(),
-                            "source": "cryptingup"
-                        }
+        status, data = await self._http_get("cryptingup", url, params=params)
+        if status == 200:
+            if "markets" in data and data["markets"]:
+                market = data["markets"][0]  # Get first market
+
+                return {
+                    "success": True,
+                    "symbol": symbol,
+                    "price": float(market["price"]),
+                    "currency": convert_to,
+                    "exchange": market.get("exchange", "Unknown"),
+                    "volume_24h": float(market.get("volume_24h", 0)),
+                    "change_24h": float(market.get("change_24h", 0)),
+                    "timestamp": datetime.now().isoformat(),
+                    "source": "cryptingup"
+                }
         
         return {"success": False, "error": "CryptingUp API failed"}
     
     async def _get_coingecko_price(self, symbol: str) -> Dict[str, Any]:
         """Get crypto price from CoinGecko (free API with comprehensive data)"""
-        # Map symbols to CoinGecko IDs
-        symbol_map = {
-            "BTC": "bitcoin", "ETH": "ethereum", "BNB": "binancecoin", 
-            "XRP": "ripple", "ADA": "cardano", "SOL": "solana",
-            "DOT": "polkadot", "DOGE": "dogecoin", "AVAX": "avalanche-2",
-            "MATIC": "matic-network", "LTC": "litecoin", "BCH": "bitcoin-cash",
-            "UNI": "uniswap", "LINK": "chainlink", "ATOM": "cosmos",
-            "XLM": "stellar", "VET": "vechain", "FIL": "filecoin",
-            "TRX": "tron", "ETC": "ethereum-classic", "SHIB": "shiba-inu"
-        }
-        
-        coin_id = symbol_map.get(symbol.upper(), symbol.lower())
+        coin_id = _COINGECKO_IDS.get(symbol.upper(), symbol.lower())
         
         url = f"{self.endpoints['coingecko']}/simple/price"
         params = {
@@ -393,51 +589,32 @@ class PriceTracker:
             "include_24hr_change": "true"
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if coin_id in data:
-                        crypto_data = data[coin_id]
-                        
-                        return {
-                            "success": True,
-                            "symbol": symbol,
-                            "price": crypto_data["usd"],
-                            "currency": "USD",
-                            "market_cap": crypto_data.get("usd_market_cap"),
-                            "volume_24h": crypto_data.get("usd_24h_vol"),
-                            "percent_change_24h": crypto_data.get("usd_24h_change"),
-                            "timestamp": datetime.now().isoformat(),
-                            "source": "coingecko"
-                        }
+        status, data = await self._http_get("coingecko", url, params=params)
+        if status == 200:
+            if coin_id in data:
+                crypto_data = data[coin_id]
+
+                return {
+                    "success": True,
+                    "symbol": symbol,
+                    "price": crypto_data["usd"],
+                    "currency": "USD",
+                    "market_cap": crypto_data.get("usd_market_cap"),
+                    "volume_24h": crypto_data.get("usd_24h_vol"),
+                    "percent_change_24h": crypto_data.get("usd_24h_change"),
+                    "timestamp": datetime.now().isoformat(),
+                    "source": "coingecko"
+                }
         
         return {"success": False, "error": "CoinGecko API failed"}
     
+    @async_ttl_cache(CACHE_TTL_CRYPTO, key=lambda self, symbols: ",".join(s.upper() for s in symbols))
     async def get_multiple_crypto_prices(self, symbols: List[str]) -> Dict[str, Any]:
         """Get prices for multiple cryptocurrencies at once"""
         try:
-            results = {}
-            successful_count = 0
-            
             # Use CoinGecko for multiple symbols (most efficient)
-            symbol_map = {
-                "BTC": "bitcoin", "ETH": "ethereum", "BNB": "binancecoin", 
-                "XRP": "ripple", "ADA": "cardano", "SOL": "solana",
-                "DOT": "polkadot", "DOGE": "dogecoin", "AVAX": "avalanche-2",
-                "MATIC": "matic-network", "LTC": "litecoin", "BCH": "bitcoin-cash",
-                "UNI": "uniswap", "LINK": "chainlink", "ATOM": "cosmos",
-                "XLM": "stellar", "VET": "vechain", "FIL": "filecoin",
-                "TRX": "tron", "ETC": "ethereum-classic", "SHIB": "shiba-inu"
-            }
-            
-            # Map symbols to CoinGecko IDs
-            coin_ids = []
-            symbol_to_id = {}
-            for symbol in symbols:
-                coin_id = symbol_map.get(symbol.upper(), symbol.lower())
-                coin_ids.append(coin_id)
-                symbol_to_id[coin_id] = symbol.upper()
+            coin_ids = [_COINGECKO_IDS.get(s.upper(), s.lower()) for s in symbols]
+            symbol_to_id = dict(zip(coin_ids, (s.upper() for s in symbols)))
             
             url = f"{self.endpoints['coingecko']}/simple/price"
             params = {
@@ -448,42 +625,51 @@ class PriceTracker:
                 "include_24hr_change": "true"
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        for coin_id, crypto_data in data.items():
-                            symbol = symbol_to_id.get(coin_id, coin_id.upper())
-                            results[symbol] = {
-                                "success": True,
-                                "symbol": symbol,
-                                "price": crypto_data["usd"],
-                                "currency": "USD",
-                                "market_cap": crypto_data.get("usd_market_cap"),
-                                "volume_24h": crypto_data.get("usd_24h_vol"),
-                                "percent_change_24h": crypto_data.get("usd_24h_change"),
-                                "timestamp": datetime.now().isoformat(),
-                                "source": "coingecko"
-                            }
-                            successful_count += 1
+            status, data = await self._http_get("coingecko", url, params=params)
+            if status != 200:
+                # Not cached, so the next request retries upstream instead of serving an empty list
+                return {
+                    "success": False,
+                    "error": f"CoinGecko API failed (HTTP {status})",
+                    "symbols": symbols
+                }
+            
+            now_iso = datetime.now().isoformat()
+            results = {
+                symbol: {
+                    "success": True,
+                    "symbol": symbol,
+                    "price": crypto_data["usd"],
+                    "currency": "USD",
+                    "market_cap": crypto_data.get("usd_market_cap"),
+                    "volume_24h": crypto_data.get("usd_24h_vol"),
+                    "percent_change_24h": crypto_data.get("usd_24h_change"),
+                    "timestamp": now_iso,
+                    "source": "coingecko"
+                }
+                for symbol, crypto_data in (
+                    (symbol_to_id.get(coin_id, coin_id.upper()), crypto_data)
+                    for coin_id, crypto_data in data.items()
+                )
+            }
             
             return {
                 "success": True,
                 "total_requested": len(symbols),
-                "successful_count": successful_count,
+                "successful_count": len(results),
                 "results": results,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": now_iso
             }
             
         except Exception as e:
-            logger.error(f"Error getting multiple crypto prices: {e}")
+            logger.error("Error getting multiple crypto prices: %s", e)
             return {
                 "success": False,
                 "error": f"Failed to get multiple crypto prices: {str(e)}",
                 "symbols": symbols
             }
     
+    @async_ttl_cache(CACHE_TTL_CRYPTO, key=lambda self, limit=10: str(limit))
     async def get_top_crypto_prices(self, limit: int = 10) -> Dict[str, Any]:
         """Get top cryptocurrencies by market cap"""
         try:
@@ -496,53 +682,53 @@ class PriceTracker:
                 "sparkline": "false"
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        results = []
-                        for coin in data:
-                            results.append({
-                                "rank": coin.get("market_cap_rank", 0),
-                                "symbol": coin.get("symbol", "").upper(),
-                                "name": coin.get("name", ""),
-                                "price": coin.get("current_price", 0),
-                                "market_cap": coin.get("market_cap", 0),
-                                "volume_24h": coin.get("total_volume", 0),
-                                "percent_change_24h": coin.get("price_change_percentage_24h", 0),
-                                "timestamp": datetime.now().isoformat(),
-                                "source": "coingecko"
-                            })
-                        
-                        return {
-                            "success": True,
-                            "limit": limit,
-                            "results": results,
-                            "timestamp": datetime.now().isoformat()
-                        }
+            status, data = await self._http_get("coingecko", url, params=params)
+            if status == 200:
+                now_iso = datetime.now().isoformat()
+                results = [
+                    {
+                        "rank": coin.get("market_cap_rank", 0),
+                        "symbol": coin.get("symbol", "").upper(),
+                        "name": coin.get("name", ""),
+                        "price": coin.get("current_price", 0),
+                        "market_cap": coin.get("market_cap", 0),
+                        "volume_24h": coin.get("total_volume", 0),
+                        "percent_change_24h": coin.get("price_change_percentage_24h", 0),
+                        "timestamp": now_iso,
+                        "source": "coingecko"
+                    }
+                    for coin in data
+                ]
+
+                return {
+                    "success": True,
+                    "limit": limit,
+                    "results": results,
+                    "timestamp": now_iso
+                }
             
             return {"success": False, "error": "Failed to get top crypto prices"}
             
         except Exception as e:
-            logger.error(f"Error getting top crypto prices: {e}")
+            logger.error("Error getting top crypto prices: %s", e)
             return {
                 "success": False,
                 "error": f"Failed to get top crypto prices: {str(e)}"
             }
     
+    @async_ttl_cache(CACHE_TTL_COMMODITY, key=lambda self, commodity: commodity.upper())
     async def get_commodity_price(self, commodity: str) -> Dict[str, Any]:
         """Get commodity price"""
         commodity = commodity.upper()
         
         # Check cache
-        cache_key = f"commodity_{commodity}_{datetime.now().strftime('%Y%m%d%H%M')}"
-        cached_price = self.db.get_from_cache(cache_key)
+        cache_key = f"commodity_{commodity}_{int(time.time()) // 60}"
+        cached_price = await self.db.aget_from_cache(cache_key)
         
         if cached_price:
             try:
-                return json.loads(cached_price)
-            except json.JSONDecodeError:
+                return json_loads(cached_price)
+            except ValueError:
                 pass
         
         # Try Alpha Vantage for commodities
@@ -550,10 +736,10 @@ class PriceTracker:
             try:
                 result = await self._get_alpha_vantage_commodity(commodity)
                 if result["success"]:
-                    self.db.add_to_cache(cache_key, json.dumps(result), 10)
+                    self._cache_later(cache_key, json_dumps(result), 10)
                     return result
-            except Exception as e:
-                logger.warning(f"Commodity API failed: {e}")
+            except _PROVIDER_ERRORS as e:
+                logger.warning("Commodity API failed: %s", e)
         
         return {
             "success": False,
@@ -563,17 +749,7 @@ class PriceTracker:
     
     async def _get_alpha_vantage_commodity(self, commodity: str) -> Dict[str, Any]:
         """Get commodity price from Alpha Vantage"""
-        # Map commodity symbols to Alpha Vantage symbols
-        commodity_map = {
-            "GOLD": "GC=F",
-            "SILVER": "SI=F",
-            "OIL": "CL=F",
-            "GAS": "NG=F",
-            "COPPER": "HG=F",
-            "WHEAT": "ZW=F"
-        }
-        
-        symbol = commodity_map.get(commodity, commodity)
+        symbol = _COMMODITY_MAP.get(commodity, commodity)
         
         url = self.endpoints["alpha_vantage"]
         params = {
@@ -582,24 +758,22 @@ class PriceTracker:
             "apikey": self.api_keys["alpha_vantage"]
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if "Global Quote" in data:
-                        quote = data["Global Quote"]
-                        
-                        return {
-                            "success": True,
-                            "commodity": commodity,
-                            "symbol": symbol,
-                            "price": float(quote["05. price"]),
-                            "change": float(quote["09. change"]),
-                            "change_percent": float(quote["10. change percent"].rstrip('%')),
-                            "volume": int(quote["06. volume"]),
-                            "timestamp": datetime.now().isoformat(),
-                            "source": "alpha_vantage"
-                        }
+        status, data = await self._http_get("alpha_vantage", url, params=params)
+        if status == 200:
+            if "Global Quote" in data:
+                quote = data["Global Quote"]
+
+                return {
+                    "success": True,
+                    "commodity": commodity,
+                    "symbol": symbol,
+                    "price": float(quote["05. price"]),
+                    "change": float(quote["09. change"]),
+                    "change_percent": float(quote["10. change percent"].rstrip('%')),
+                    "volume": int(quote["06. volume"]),
+                    "timestamp": datetime.now().isoformat(),
+                    "source": "alpha_vantage"
+                }
         
         return {"success": False, "error": "Alpha Vantage commodity API failed"}
     
@@ -608,27 +782,25 @@ class PriceTracker:
         try:
             # Get major stock indices
             indices = ["^GSPC", "^DJI", "^IXIC", "^VIX"]  # S&P 500, Dow, NASDAQ, VIX
-            index_prices = {}
-            
-            for index in indices:
-                try:
-                    price_data = await self._get_yahoo_finance_price(index)
-                    if price_data["success"]:
-                        index_prices[index] = price_data
-                except Exception as e:
-                    logger.warning(f"Failed to get {index}: {e}")
-            
             # Get top crypto prices
             top_crypto = ["BTC", "ETH", "BNB", "XRP", "ADA"]
-            crypto_prices = {}
             
-            for crypto in top_crypto:
-                try:
-                    price_data = await self.get_crypto_price(crypto)
-                    if price_data["success"]:
-                        crypto_prices[crypto] = price_data
-                except Exception as e:
-                    logger.warning(f"Failed to get {crypto}: {e}")
+            # The lookups are independent, so fetch them concurrently
+            index_prices, *results = await asyncio.gather(
+                self._get_index_prices(indices),
+                *[self.get_crypto_price(crypto) for crypto in top_crypto],
+                return_exceptions=True
+            )
+            if isinstance(index_prices, Exception):
+                logger.warning("Failed to get indices: %s", index_prices)
+                index_prices = {}
+            
+            crypto_prices = {}
+            for crypto, price_data in zip(top_crypto, results):
+                if isinstance(price_data, Exception):
+                    logger.warning("Failed to get %s: %s", crypto, price_data)
+                elif price_data["success"]:
+                    crypto_prices[crypto] = price_data
             
             return {
                 "success": True,
@@ -639,7 +811,7 @@ class PriceTracker:
             }
             
         except Exception as e:
-            logger.error(f"Market summary error: {e}")
+            logger.error("Market summary error: %s", e)
             return {
                 "success": False,
                 "error": f"Market summary failed: {str(e)}"
@@ -647,30 +819,21 @@ class PriceTracker:
     
     def _get_market_status(self) -> str:
         """Get current market status"""
-        now = datetime.now()
-        weekday = now.weekday()
-        hour = now.hour
-        
-        # US market hours (9:30 AM - 4:00 PM EST, Monday-Friday)
-        if weekday < 5 and 9.5 <= hour <= 16:
-            return "Open"
-        elif weekday < 5:
-            return "Closed"
-        else:
-            return "Weekend"
+        return _market_status(int(time.time()) // 60)
     
+    @async_ttl_cache(CACHE_TTL_HISTORY, key=lambda self, symbol, period="1d": f"{symbol.upper()}:{period}")
     async def get_price_history(self, symbol: str, period: str = "1d") -> Dict[str, Any]:
         """Get historical price data"""
         symbol = symbol.upper()
         
         # Check cache
-        cache_key = f"history_{symbol}_{period}_{datetime.now().strftime('%Y%m%d%H')}"
-        cached_history = self.db.get_from_cache(cache_key)
+        cache_key = f"history_{symbol}_{period}_{int(time.time()) // 3600}"
+        cached_history = await self.db.aget_from_cache(cache_key)
         
         if cached_history:
             try:
-                return json.loads(cached_history)
-            except json.JSONDecodeError:
+                return json_loads(cached_history)
+            except ValueError:
                 pass
         
         # Try Yahoo Finance for historical data
@@ -678,10 +841,10 @@ class PriceTracker:
             result = await self._get_yahoo_finance_history(symbol, period)
             if result["success"]:
                 # Cache for 1 hour
-                self.db.add_to_cache(cache_key, json.dumps(result), 60)
+                self._cache_later(cache_key, json_dumps(result), 60)
                 return result
-        except Exception as e:
-            logger.warning(f"Historical data API failed: {e}")
+        except _PROVIDER_ERRORS as e:
+            logger.warning("Historical data API failed: %s", e)
         
         return {
             "success": False,
@@ -699,39 +862,30 @@ class PriceTracker:
             "includePrePost": "true"
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if "chart" in data and "result" in data["chart"]:
-                        result = data["chart"]["result"][0]
-                        timestamps = result["timestamp"]
-                        quotes = result["indicators"]["quote"][0]
-                        
-                        # Process historical data
-                        history = []
-                        for i, timestamp in enumerate(timestamps):
-                            if quotes["close"][i] is not None:
-                                history.append({
-                                    "timestamp": datetime.fromtimestamp(timestamp).isoformat(),
-                                    "open": quotes["open"][i],
-                                    "high": quotes["high"][i],
-                                    "low": quotes["low"][i],
-                                    "close": quotes["close"][i],
-                                    "volume": quotes["volume"][i]
-                                })
-                        
-                        return {
-                            "success": True,
-                            "symbol": symbol,
-                            "period": period,
-                            "history": history,
-                            "data_points": len(history),
-                            "source": "yahoo_finance"
-                        }
+        status, data = await self._http_get("yahoo_finance", url, params=params)
+        if status == 200:
+            if "chart" in data and "result" in data["chart"]:
+                result = data["chart"]["result"][0]
+                quotes = result["indicators"]["quote"][0]
+                
+                # Column per field (epoch-second timestamps), keeping only bars that have a close
+                mask = [close is not None for close in quotes["close"]]
+                history = {"timestamp": list(compress(result["timestamp"], mask))}
+                for field in ("open", "high", "low", "close", "volume"):
+                    history[field] = list(compress(quotes[field], mask))
+                
+                return {
+                    "success": True,
+                    "symbol": symbol,
+                    "period": period,
+                    "history": history,
+                    "data_points": len(history["timestamp"]),
+                    "source": "yahoo_finance"
+                }
         
         return {"success": False, "error": "Yahoo Finance history API failed"}
     
+    @memo_by_identity()
     def format_price_result(self, result: Dict[str, Any]) -> str:
         """Format price result for display"""
         if not result["success"]:
@@ -744,37 +898,33 @@ class PriceTracker:
             change_percent = result.get("change_percent", result.get("percent_change_24h", 0))
             
             # Format change with appropriate emoji
-            change_emoji = "📈" if change >= 0 else "📉"
-            change_sign = "+" if change >= 0 else ""
+            change_emoji = _TREND_EMOJI[change >= 0]
             
-            output = f"💰 **{symbol}**\n"
-            output += f"💵 قیمت: ${price:.2f}\n"
+            lines = [f"💰 **{symbol}**", f"💵 قیمت: ${price:.2f}"]
             
             if change != 0:
-                output += f"{change_emoji} تغییر 24h: {change_sign}{change:.2f}% ({change_sign}{change_percent:.2f}%)\n"
+                lines.append(f"{change_emoji} تغییر 24h: {change:+.2f}% ({change_percent:+.2f}%)")
             
             if "volume" in result or "volume_24h" in result:
                 volume = result.get("volume", result.get("volume_24h", 0))
-                output += f"📊 حجم 24h: ${volume:,.0f}\n"
+                lines.append(f"📊 حجم 24h: ${volume:,.0f}")
             
             if "market_cap" in result:
                 market_cap = result["market_cap"]
                 if market_cap:
-                    output += f"🏢 ارزش بازار: ${market_cap:,.0f}\n"
+                    lines.append(f"🏢 ارزش بازار: ${market_cap:,.0f}")
             
             if "trading_pair" in result:
-                output += f"🔄 جفت معاملاتی: {result['trading_pair']}\n"
+                lines.append(f"🔄 جفت معاملاتی: {result['trading_pair']}")
             
             if "exchange" in result:
-                output += f"🏪 صرافی: {result['exchange']}\n"
+                lines.append(f"🏪 صرافی: {result['exchange']}")
             
             if "rank" in result:
-                output += f"🏆 رتبه: #{result['rank']}\n"
-            
-            output += f"🕐 زمان: {result['timestamp']}\n"
-            output += f"🔗 منبع: {result['source']}"
+                lines.append(f"🏆 رتبه: #{result['rank']}")
             
-            return output
+            lines += [f"🕐 زمان: {result['timestamp']}", f"🔗 منبع: {result['source']}"]
+            return "\n".join(lines)
         
         return "❌ Invalid price result format"
     
@@ -791,30 +941,30 @@ class PriceTracker:
         if not result["success"]:
             return f"❌ {result['error']}"
         
-        output = f"💰 **قیمت‌های ارزهای دیجیتال**\n\n"
-        output += f"📊 تعداد درخواستی: {result['total_requested']}\n"
-        output += f"✅ تعداد موفق: {result['successful_count']}\n\n"
-        
+        lines = [
+            "💰 **قیمت‌های ارزهای دیجیتال**",
+            "",
+            f"📊 تعداد درخواستی: {result['total_requested']}",
+            f"✅ تعداد موفق: {result['successful_count']}",
+            "",
+        ]
         for symbol, data in result["results"].items():
             if data["success"]:
                 price = data["price"]
                 change = data.get("percent_change_24h", 0)
-                change_emoji = "📈" if change >= 0 else "📉"
-                change_sign = "+" if change >= 0 else ""
+                change_emoji = _TREND_EMOJI[change >= 0]
                 
-                output += f"**{symbol}**: ${price:.2f} {change_emoji} {change_sign}{change:.2f}%\n"
-        
-        output += f"\n🕐 زمان: {result['timestamp']}"
+                lines.append(f"**{symbol}**: ${price:.2f} {change_emoji} {change:+.2f}%")
         
-        return output
+        lines += ["", f"🕐 زمان: {result['timestamp']}"]
+        return "\n".join(lines)
     
     def format_top_crypto_results(self, result: Dict[str, Any]) -> str:
         """Format top crypto prices for display"""
         if not result["success"]:
             return f"❌ {result['error']}"
         
-        output = f"🏆 **برترین ارزهای دیجیتال** (بر اساس ارزش بازار)\n\n"
-        
+        lines = ["🏆 **برترین ارزهای دیجیتال** (بر اساس ارزش بازار)", ""]
         for i, crypto in enumerate(result["results"], 1):
             symbol = crypto["symbol"]
             name = crypto["name"]
@@ -822,24 +972,27 @@ class PriceTracker:
             change = crypto["percent_change_24h"]
             rank = crypto["rank"]
             
-            change_emoji = "📈" if change >= 0 else "📉"
-            change_sign = "+" if change >= 0 else ""
+            change_emoji = _TREND_EMOJI[change >= 0]
             
-            output += f"{i}. **{symbol}** ({name})\n"
-            output += f"   💵 قیمت: ${price:.2f}\n"
-            output += f"   {change_emoji} تغییر: {change_sign}{change:.2f}%\n"
-            output += f"   🏆 رتبه: #{rank}\n\n"
-        
-        output += f"🕐 زمان: {result['timestamp']}"
+            lines += [
+                f"{i}. **{symbol}** ({name})",
+                f"   💵 قیمت: ${price:.2f}",
+                f"   {change_emoji} تغییر: {change:+.2f}%",
+                f"   🏆 رتبه: #{rank}",
+                "",
+            ]
         
-        return output
+        lines.append(f"🕐 زمان: {result['timestamp']}")
+        return "\n".join(lines)
     
     # New methods for integrated price sources
     
+    @async_ttl_cache(CACHE_TTL_TGJU, key=lambda self: "")
     async def get_integrated_price_data(self) -> Dict[str, Any]:
         """Get comprehensive price data from all sources"""
+        now_iso = datetime.now().isoformat()
         try:
-            # Get data from all sources concurrently
+            # Get data from all sources concurrently (the scrapers run in worker threads)
             tasks = [
                 self._get_binance_popular_data(),
                 self._get_tgju_data(),
@@ -863,163 +1016,160 @@ class PriceTracker:
                 "binance_popular": binance_data,
                 "tgju_assets": tgju_data,
                 "crypto_irr": crypto_irr_data,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": now_iso
             }
             
         except Exception as e:
-            logger.error(f"Error in get_integrated_price_data: {e}")
+            logger.error("Error in get_integrated_price_data: %s", e)
             return {
                 "success": False,
                 "error": f"Failed to get integrated price data: {str(e)}",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": now_iso
             }
     
+    @async_ttl_cache(CACHE_TTL_CRYPTO, key=lambda self: "")
     async def _get_binance_popular_data(self) -> Dict[str, Any]:
         """Get popular crypto data from Binance/CoinGecko"""
         try:
             # Check cache first
-            cache_key = f"binance_popular_{datetime.now().strftime('%Y%m%d%H%M')}"
-            cached_data = self.db.get_from_cache(cache_key)
+            cache_key = "binance_popular"
+            cached_data = await self._source_cache_get(cache_key)
             
             if cached_data:
                 try:
-                    return json.loads(cached_data)
-                except json.JSONDecodeError:
+                    return json_loads(cached_data)
+                except ValueError:
                     pass
             
             # Get fresh data
-            result = get_popular_data()
+            result = await asyncio.to_thread(get_popular_data)
             
             if result["success"]:
                 # Cache for 5 minutes
-                self.db.add_to_cache(cache_key, json.dumps(result), 5)
+                self._source_cache_set(cache_key, json_dumps(result), 5)
             
             return result
             
         except Exception as e:
-            logger.error(f"Error getting Binance popular data: {e}")
+            logger.error("Error getting Binance popular data: %s", e)
             return {"success": False, "error": str(e)}
     
+    @async_ttl_cache(CACHE_TTL_TGJU, key=lambda self: "")
     async def _get_tgju_data(self) -> Dict[str, Any]:
         """Get TGJU asset data"""
         try:
             # Check cache first
-            cache_key = f"tgju_assets_{datetime.now().strftime('%Y%m%d%H%M')}"
-            cached_data = self.db.get_from_cache(cache_key)
+            cache_key = "tgju_assets"
+            cached_data = await self._source_cache_get(cache_key)
             
             if cached_data:
                 try:
-                    return json.loads(cached_data)
-                except json.JSONDecodeError:
+                    return json_loads(cached_data)
+                except ValueError:
                     pass
             
             # Get fresh data
-            result = fetch_mofid_basket()
+            result = await asyncio.to_thread(fetch_mofid_basket)
             
             if result["success"]:
                 # Cache for 10 minutes
-                self.db.add_to_cache(cache_key, json.dumps(result), 10)
+                self._source_cache_set(cache_key, json_dumps(result), 10)
             
             return result
             
         except Exception as e:
-            logger.error(f"Error getting TGJU data: {e}")
+            logger.error("Error getting TGJU data: %s", e)
             return {"success": False, "error": str(e)}
     
+    @async_ttl_cache(CACHE_TTL_TGJU, key=lambda self: "")
     async def _get_crypto_irr_data(self) -> Dict[str, Any]:
         """Get crypto prices in IRR from TGJU"""
         try:
             # Check cache first
-            cache_key = f"crypto_irr_{datetime.now().strftime('%Y%m%d%H%M')}"
-            cached_data = self.db.get_from_cache(cache_key)
+            cache_key = "crypto_irr"
+            cached_data = await self._source_cache_get(cache_key)
             
             if cached_data:
                 try:
-                    return json.loads(cached_data)
-                except json.JSONDecodeError:
+                    return json_loads(cached_data)
+                except ValueError:
                     pass
             
             # Get fresh data
-            result = fetch_top_cryptos(limit=10)
+            result = await asyncio.to_thread(fetch_top_cryptos, limit=10)
             
             if result["success"]:
                 # Cache for 5 minutes
-                self.db.add_to_cache(cache_key, json.dumps(result), 5)
+                self._source_cache_set(cache_key, json_dumps(result), 5)
             
             return result
             
         except Exception as e:
-            logger.error(f"Error getting crypto IRR data: {e}")
+            logger.error("Error getting crypto IRR data: %s", e)
             return {"success": False, "error": str(e)}
     
+    @memo_by_identity()
     def format_integrated_price_message(self, data: Dict[str, Any]) -> str:
         """Format comprehensive price message"""
         if not data["success"]:
             return f"❌ {data['error']}"
         
-        message = "📈 **قیمت‌های لحظه‌ای جامع**\n\n"
+        lines = ["📈 **قیمت‌های لحظه‌ای جامع**", ""]
         
         # Binance Popular (USD)
         binance_data = data["binance_popular"]
-        if binance_data["success"] and binance_data.get("popular"):
-            message += "💰 **ارزهای دیجیتال محبوب (USD)**:\n"
-            for coin in binance_data["popular"]:
-                change_emoji = "📈" if coin["change_percent_24h"] >= 0 else "📉"
-                change_sign = "+" if coin["change_percent_24h"] >= 0 else ""
-                message += (
+        popular = binance_data.get("popular")
+        if binance_data["success"] and popular:
+            lines.append("💰 **ارزهای دیجیتال محبوب (USD)**:")
+            append = lines.append
+            for coin in popular:
+                change = coin["change_percent_24h"]
+                append(
                     f"• {coin['name']} ({coin['symbol']}): ${coin['price_usd']:,.2f} "
-                    f"{change_emoji} {change_sign}{coin['change_percent_24h']:.2f}%\n"
+                    f"{_TREND_EMOJI[change >= 0]} {change:+.2f}%"
                 )
-            message += "\n"
+            lines.append("")
         
         # TGJU Assets (IRR)
         tgju_data = data["tgju_assets"]
-        if tgju_data["success"] and tgju_data.get("data"):
-            message += "🏦 **دارایی‌ها (IRR)**:\n"
-            for title, asset_data in tgju_data["data"].items():
+        assets = tgju_data.get("data")
+        if tgju_data["success"] and assets:
+            lines.append("🏦 **دارایی‌ها (IRR)**:")
+            for title, asset_data in assets.items():
                 price = asset_data["price"]
                 change = asset_data["change"]
                 if price is not None:
-                    message += f"• {title}: {price:,.0f} ({change})\n"
+                    lines.append(f"• {title}: {price:,.0f} ({change})")
                 else:
-                    message += f"• {title}: نامشخص ({change})\n"
-            message += "\n"
+                    lines.append(f"• {title}: نامشخص ({change})")
+            lines.append("")
         
         # Crypto IRR
         crypto_irr_data = data["crypto_irr"]
-        if crypto_irr_data["success"] and crypto_irr_data.get("data"):
-            message += "🌐 **ارزهای دیجیتال (IRR)**:\n"
-            for name, crypto_data in crypto_irr_data["data"].items():
+        cryptos = crypto_irr_data.get("data")
+        if crypto_irr_data["success"] and cryptos:
+            lines.append("🌐 **ارزهای دیجیتال (IRR)**:")
+            append = lines.append
+            for name, crypto_data in cryptos.items():
                 price = crypto_data["price_rial"]
                 change_percent = crypto_data["change_percent"]
                 change_value = crypto_data["change_value_tether"]
                 
                 if price is not None:
-                    change_emoji = "📈" if change_percent and change_percent >= 0 else "📉"
-                    change_sign = "+" if change_percent and change_percent >= 0 else ""
-                    change_text = f"{change_sign}{change_percent:.2f}%" if change_percent is not None else "نامشخص"
-                    message += f"• {name}: {price:,.0f} {change_emoji} {change_text} ({change_value})\n"
+                    change_emoji = _TREND_EMOJI[bool(change_percent) and change_percent >= 0]
+                    if change_percent is None:
+                        change_text = "نامشخص"
+                    elif change_percent:
+                        change_text = f"{change_percent:+.2f}%"
+                    else:
+                        change_text = f"{change_percent:.2f}%"  # 0 was shown without a sign
+                    append(f"• {name}: {price:,.0f} {change_emoji} {change_text} ({change_value})")
                 else:
-                    message += f"• {name}: نامشخص ({change_value})\n"
+                    append(f"• {name}: نامشخص ({change_value})")
         
-        message += f"\n🕐 زمان: {data['timestamp']}"
-        return message
+        lines += ["", f"🕐 زمان: {data['timestamp']}"]
+        return "\n".join(lines)
     
     def create_price_selection_keyboard(self):
         """Create keyboard for price source selection"""
-        from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-        
-        keyboard = [
-            [
-                InlineKeyboardButton("💰 ارزهای دیجیتال (USD)", callback_data="price_crypto_usd"),
-                InlineKeyboardButton("🌐 ارزهای دیجیتال (IRR)", callback_data="price_crypto_irr")
-            ],
-            [
-                InlineKeyboardButton("🏦 دارایی‌ها (TGJU)", callback_data="price_tgju"),
-                InlineKeyboardButton("📊 همه قیمت‌ها", callback_data="price_all")
-            ],
-            [
-                InlineKeyboardButton("🔙 بازگشت", callback_data="back_to_main")
-            ]
-        ]
-        return InlineKeyboardMarkup(keyboard)
+        return _price_selection_keyboard()
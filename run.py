@@ -48,9 +48,9 @@ def check_config():
     try:
         from config import Config
         
-        if not Config.BOT_TOKEN or Config.BOT_TOKEN == "YOUR_BOT_TOKEN_HERE":
+        if not Config.BOT_TOKEN:
             print("❌ Bot token not set!")
-            print("Please set your bot token in config.py")
+            print("Please set the TG_TOKEN environment variable")
             return False
         
         print("✅ Bot token is set")
@@ -11,8 +11,8 @@ from pathlib import Path
 
 def check_python_version():
     """Check if Python version is compatible"""
-    if sys.version_info < (3, 8):
-        print("❌ Python 3.8 or higher is required!")
+    if sys.version_info < (3, 10):
+        print("❌ Python 3.10 or higher is required!")
         print(f"Current version: {sys.version}")
         return False
     print(f"✅ Python version: {sys.version}")
@@ -39,11 +39,6 @@ def create_config():
     
     print("⚙️ Creating configuration file...")
     
-    bot_token = input("Enter your Telegram bot token: ").strip()
-    if not bot_token:
-        print("❌ Bot token is required!")
-        return False
-    
     # Optional API keys
     openweather_key = input("Enter OpenWeather API key (optional): ").strip()
     alpha_vantage_key = input("Enter Alpha Vantage API key (optional): ").strip()
@@ -58,8 +53,8 @@ from typing import Dict, Any
 class Config:
     """Configuration settings for the bot"""
     
-    # Bot token
-    BOT_TOKEN = "{bot_token}"
+    # Bot token (set the TG_TOKEN environment variable)
+    BOT_TOKEN = os.getenv("TG_TOKEN", "")
     
     # Database settings
     DATABASE_URL = "sqlite:///bot.db"
@@ -205,7 +200,8 @@ def main():
     
     print("\n🎉 Setup completed successfully!")
     print("\n📋 Next steps:")
-    print("1. Update your API keys in config.py if needed")
+    print("1. Set your bot token: export TG_TOKEN=<your bot token>")
+    print("   Update your API keys in config.py if needed")
     print("2. Run the bot: python advanced_bot.py")
     print("3. Start chatting with your bot on Telegram!")
     
@@ -10,6 +10,12 @@ from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+_CONVERSION_KEYWORDS = ['to', 'تبدیل', 'به', 'convert']
+
+def _keyword_regex(words: List[str], flags: int = 0) -> "re.Pattern[str]":
+    """یک الگوی کامپایل‌شده معادل any(word in text for word in words)"""
+    return re.compile("|".join(re.escape(word) for word in words), flags)
+
 class SmartTextProcessor:
     """کلاس پردازشگر هوشمند متن"""
     
@@ -92,6 +98,76 @@ class SmartTextProcessor:
             'english': r'[a-zA-Z]',
             'keywords': ['ترجمه', 'ترجمه کن', 'معنی', 'به انگلیسی', 'به فارسی', 'translate']
         }
+        
+        self._compile_patterns()
+    
+    def _compile_patterns(self):
+        """کامپایل یک‌باره همه الگوها؛ هر لیست کلمه کلیدی به یک الگوی واحد تبدیل می‌شود"""
+        self._re_number = re.compile(r'\d+')
+        self._re_decimal = re.compile(r'\d+(?:\.\d+)?')
+        self._re_conversion_kw = _keyword_regex(_CONVERSION_KEYWORDS)
+        
+        # ارز
+        self._re_currency_symbols = re.compile(self.currency_patterns['symbols'])
+        self._re_currency_crypto = re.compile(self.currency_patterns['crypto'])
+        self._re_currency_kw = _keyword_regex(self.currency_patterns['keywords'])
+        self._re_crypto_kw = _keyword_regex(self.currency_patterns['crypto_keywords'])
+        self._re_currency_en = re.compile(r'(\d+(?:\.\d+)?)\s+([A-Z]{3,4})\s+to\s+([A-Z]{3,4})')
+        self._re_conversion_fa = re.compile(r'(\d+(?:\.\d+)?)\s+(.+?)\s+به\s+(.+)')
+        
+        # واحد
+        self._re_fx_substring = _keyword_regex([
+            'USD', 'EUR', 'GBP', 'JPY', 'CHF', 'CAD', 'AUD', 'CNY', 'SEK', 'NZD', 'MXN', 'SGD', 'HKD', 'NOK', 'TRY',
+            'RUB', 'INR', 'BRL', 'ZAR', 'KRW', 'IRR', 'AED', 'SAR', 'QAR', 'KWD', 'BHD', 'OMR', 'JOD', 'LBP', 'EGP',
+            'BTC', 'ETH', 'BNB', 'XRP', 'ADA', 'SOL', 'DOT', 'DOGE', 'AVAX', 'MATIC', 'LTC', 'BCH', 'UNI', 'LINK',
+            'ATOM', 'XLM', 'VET', 'FIL', 'TRX', 'ETC'
+        ])
+        self._re_unit_types = [
+            (unit_type, _keyword_regex(patterns['units'] + patterns['keywords']))
+            for unit_type, patterns in self.unit_patterns.items()
+        ]
+        self._re_persian_unit_types = [
+            (unit_type, _keyword_regex(units))
+            for unit_type, units in {
+                'length': ['متر', 'سانتی متر', 'کیلومتر', 'اینچ', 'فوت', 'یارد', 'مایل'],
+                'weight': ['گرم', 'کیلوگرم', 'تن', 'اونس', 'پوند'],
+                'temperature': ['سانتی گراد', 'فارنهایت', 'کلوین'],
+                'volume': ['لیتر', 'میلی لیتر', 'گالن', 'فنجان'],
+                'area': ['متر مربع', 'کیلومتر مربع', 'فوت مربع', 'هکتار'],
+                'time': ['ثانیه', 'دقیقه', 'ساعت', 'روز', 'هفته', 'ماه', 'سال']
+            }.items()
+        ]
+        self._re_unit_en = re.compile(r'(\d+(?:\.\d+)?)\s+(\w+)\s+to\s+(\w+)')
+        
+        # تاریخ
+        self._re_date_gregorian = [(p, re.compile(p, re.IGNORECASE)) for p in self.date_patterns['gregorian']]
+        self._re_date_persian = [(p, re.compile(p, re.IGNORECASE)) for p in self.date_patterns['persian']]
+        self._re_date_any = re.compile(
+            "|".join(f"(?:{p})" for p in self.date_patterns['gregorian'] + self.date_patterns['persian']),
+            re.IGNORECASE
+        )
+        self._re_date_kw = _keyword_regex(self.date_patterns['keywords'], re.IGNORECASE)
+        self._re_date_format = re.compile(r'\d{1,4}[-/]\d{1,2}[-/]\d{1,4}')
+        
+        # قیمت
+        self._re_stocks = re.compile(self.price_patterns['stocks'])
+        self._re_price_crypto = re.compile(self.price_patterns['crypto'])
+        self._re_commodities = _keyword_regex(self.price_patterns['commodities'])
+        self._re_price_kw = _keyword_regex(self.price_patterns['keywords'])
+        
+        # آب و هوا
+        self._re_weather = _keyword_regex(self.weather_patterns['keywords'] + self.weather_patterns['cities'])
+        
+        # محاسبه
+        self._re_calc_operators = re.compile(self.calculation_patterns['operators'])
+        self._re_calc_functions = re.compile(self.calculation_patterns['functions'])
+        self._re_calc_constants = re.compile(self.calculation_patterns['constants'])
+        self._re_calc_kw = _keyword_regex(self.calculation_patterns['keywords'])
+        
+        # ترجمه
+        self._re_persian_chars = re.compile(self.translation_patterns['persian'])
+        self._re_english_chars = re.compile(self.translation_patterns['english'])
+        self._re_translation_kw = _keyword_regex(self.translation_patterns['keywords'])
     
     def detect_request_type(self, text: str) -> Dict[str, Any]:
         """تشخیص نوع درخواست کاربر"""
@@ -165,19 +241,18 @@ class SmartTextProcessor:
     def _is_currency_conversion(self, text: str, text_lower: str, text_upper: str) -> bool:
         """تشخیص تبدیل ارز"""
         # بررسی وجود کلمات کلیدی تبدیل
-        conversion_keywords = ['to', 'تبدیل', 'به', 'convert']
-        has_conversion_keyword = any(keyword in text_lower for keyword in conversion_keywords)
+        has_conversion_keyword = bool(self._re_conversion_kw.search(text_lower))
         
         # بررسی وجود نمادهای ارز
-        has_currency_symbols = bool(re.search(self.currency_patterns['symbols'], text_upper))
-        has_crypto_symbols = bool(re.search(self.currency_patterns['crypto'], text_upper))
+        has_currency_symbols = bool(self._re_currency_symbols.search(text_upper))
+        has_crypto_symbols = bool(self._re_currency_crypto.search(text_upper))
         
         # بررسی وجود کلمات کلیدی ارز
-        has_currency_keywords = any(keyword in text_lower for keyword in self.currency_patterns['keywords'])
-        has_crypto_keywords = any(keyword in text_lower for keyword in self.currency_patterns['crypto_keywords'])
+        has_currency_keywords = bool(self._re_currency_kw.search(text_lower))
+        has_crypto_keywords = bool(self._re_crypto_kw.search(text_lower))
         
         # بررسی وجود عدد
-        has_number = bool(re.search(r'\d+', text))
+        has_number = bool(self._re_number.search(text))
         
         # اگر کلمه "قیمت" در متن باشد، احتمالاً درخواست قیمت است نه تبدیل ارز
         if 'قیمت' in text_lower:
@@ -189,47 +264,23 @@ class SmartTextProcessor:
     
     def _is_unit_conversion(self, text: str, text_lower: str) -> Optional[str]:
         """تشخیص تبدیل واحد"""
-        conversion_keywords = ['to', 'تبدیل', 'به', 'convert']
-        has_conversion_keyword = any(keyword in text_lower for keyword in conversion_keywords)
-        
-        if not has_conversion_keyword:
+        if not self._re_conversion_kw.search(text_lower):
             return None
         
         # بررسی اینکه آیا متن شامل نمادهای ارز است (اگر بله، احتمالاً تبدیل ارز است)
-        currency_symbols = ['USD', 'EUR', 'GBP', 'JPY', 'CHF', 'CAD', 'AUD', 'CNY', 'SEK', 'NZD', 'MXN', 'SGD', 'HKD', 'NOK', 'TRY', 'RUB', 'INR', 'BRL', 'ZAR', 'KRW', 'IRR', 'AED', 'SAR', 'QAR', 'KWD', 'BHD', 'OMR', 'JOD', 'LBP', 'EGP']
-        crypto_symbols = ['BTC', 'ETH', 'BNB', 'XRP', 'ADA', 'SOL', 'DOT', 'DOGE', 'AVAX', 'MATIC', 'LTC', 'BCH', 'UNI', 'LINK', 'ATOM', 'XLM', 'VET', 'FIL', 'TRX', 'ETC']
-        
-        text_upper = text.upper()
-        has_currency_symbols = any(symbol in text_upper for symbol in currency_symbols)
-        has_crypto_symbols = any(symbol in text_upper for symbol in crypto_symbols)
-        
         # اگر نمادهای ارز دارد، احتمالاً تبدیل ارز است نه واحد
-        if has_currency_symbols or has_crypto_symbols:
+        if self._re_fx_substring.search(text.upper()):
             return None
         
-        for unit_type, patterns in self.unit_patterns.items():
-            # بررسی وجود واحدها
-            has_units = any(unit in text_lower for unit in patterns['units'])
-            # بررسی وجود کلمات کلیدی
-            has_keywords = any(keyword in text_lower for keyword in patterns['keywords'])
-            
-            if has_units or has_keywords:
+        # بررسی وجود واحدها یا کلمات کلیدی
+        for unit_type, pattern in self._re_unit_types:
+            if pattern.search(text_lower):
                 return unit_type
         
         # بررسی خاص برای تبدیل واحد فارسی
         if 'به' in text_lower:
-            # بررسی کلمات فارسی واحدها
-            persian_units = {
-                'length': ['متر', 'سانتی متر', 'کیلومتر', 'اینچ', 'فوت', 'یارد', 'مایل'],
-                'weight': ['گرم', 'کیلوگرم', 'تن', 'اونس', 'پوند'],
-                'temperature': ['سانتی گراد', 'فارنهایت', 'کلوین'],
-                'volume': ['لیتر', 'میلی لیتر', 'گالن', 'فنجان'],
-                'area': ['متر مربع', 'کیلومتر مربع', 'فوت مربع', 'هکتار'],
-                'time': ['ثانیه', 'دقیقه', 'ساعت', 'روز', 'هفته', 'ماه', 'سال']
-            }
-            
-            for unit_type, units in persian_units.items():
-                if any(unit in text_lower for unit in units):
+            for unit_type, pattern in self._re_persian_unit_types:
+                if pattern.search(text_lower):
                     return unit_type
         
         return None
@@ -237,62 +288,54 @@ class SmartTextProcessor:
     def _is_date_conversion(self, text: str, text_lower: str) -> bool:
         """تشخیص تبدیل تاریخ"""
         # بررسی الگوهای تاریخ
-        for pattern_list in self.date_patterns.values():
-            if isinstance(pattern_list, list):
-                for pattern in pattern_list:
-                    if re.search(pattern, text, re.IGNORECASE):
-                        return True
+        if self._re_date_any.search(text):
+            return True
         
         # بررسی کلمات کلیدی تاریخ
-        has_date_keywords = any(keyword in text_lower for keyword in self.date_patterns['keywords'])
+        has_date_keywords = bool(self._re_date_kw.search(text))
         
         # بررسی وجود عدد و جداکننده
-        has_date_format = bool(re.search(r'\d{1,4}[-/]\d{1,2}[-/]\d{1,4}', text))
+        has_date_format = bool(self._re_date_format.search(text))
         
         return has_date_keywords or has_date_format
     
     def _is_price_request(self, text: str, text_lower: str, text_upper: str) -> bool:
         """تشخیص درخواست قیمت"""
         # بررسی نمادهای سهام
-        has_stock_symbols = bool(re.search(self.price_patterns['stocks'], text_upper))
+        has_stock_symbols = bool(self._re_stocks.search(text_upper))
         
         # بررسی نمادهای کریپتو
-        has_crypto_symbols = bool(re.search(self.price_patterns['crypto'], text_upper))
+        has_crypto_symbols = bool(self._re_price_crypto.search(text_upper))
         
         # بررسی کالاها
-        has_commodities = any(commodity in text_lower for commodity in self.price_patterns['commodities'])
+        has_commodities = bool(self._re_commodities.search(text_lower))
         
         # بررسی کلمات کلیدی قیمت
-        has_price_keywords = any(keyword in text_lower for keyword in self.price_patterns['keywords'])
+        has_price_keywords = bool(self._re_price_kw.search(text_lower))
         
         return has_stock_symbols or has_crypto_symbols or has_commodities or has_price_keywords
     
     def _is_weather_request(self, text: str, text_lower: str) -> bool:
         """تشخیص درخواست آب و هوا"""
-        # بررسی کلمات کلیدی آب و هوا
-        has_weather_keywords = any(keyword in text_lower for keyword in self.weather_patterns['keywords'])
-        
-        # بررسی نام شهرها
-        has_city_names = any(city in text_lower for city in self.weather_patterns['cities'])
-        
-        return has_weather_keywords or has_city_names
+        # بررسی کلمات کلیدی آب و هوا و نام شهرها
+        return bool(self._re_weather.search(text_lower))
     
     def _is_calculation(self, text: str, text_lower: str) -> bool:
         """تشخیص محاسبه ریاضی"""
         # بررسی وجود عملگرها
-        has_operators = bool(re.search(self.calculation_patterns['operators'], text))
+        has_operators = bool(self._re_calc_operators.search(text))
         
         # بررسی وجود توابع ریاضی
-        has_functions = bool(re.search(self.calculation_patterns['functions'], text_lower))
+        has_functions = bool(self._re_calc_functions.search(text_lower))
         
         # بررسی وجود ثابت‌ها
-        has_constants = bool(re.search(self.calculation_patterns['constants'], text_lower))
+        has_constants = bool(self._re_calc_constants.search(text_lower))
         
         # بررسی کلمات کلیدی محاسبه
-        has_calc_keywords = any(keyword in text_lower for keyword in self.calculation_patterns['keywords'])
+        has_calc_keywords = bool(self._re_calc_kw.search(text_lower))
         
         # بررسی وجود عدد
-        has_number = bool(re.search(r'\d+', text))
+        has_number = bool(self._re_number.search(text))
         
         # بررسی اینکه آیا متن فقط شامل حروف بزرگ است (احتمالاً نماد سهام)
         is_all_uppercase = text.isupper() and len(text) <= 5 and not has_operators
@@ -306,11 +349,11 @@ class SmartTextProcessor:
     def _is_translation_request(self, text: str, text_lower: str) -> bool:
         """تشخیص درخواست ترجمه"""
         # بررسی کلمات کلیدی ترجمه
-        has_translation_keywords = any(keyword in text_lower for keyword in self.translation_patterns['keywords'])
+        has_translation_keywords = bool(self._re_translation_kw.search(text_lower))
         
         # بررسی وجود متن فارسی و انگلیسی
-        has_persian = bool(re.search(self.translation_patterns['persian'], text))
-        has_english = bool(re.search(self.translation_patterns['english'], text))
+        has_persian = bool(self._re_persian_chars.search(text))
+        has_english = bool(self._re_english_chars.search(text))
         
         # اگر فقط متن فارسی است و کلمات کلیدی ترجمه ندارد، احتمالاً درخواست ترجمه نیست
         if has_persian and not has_english and not has_translation_keywords:
@@ -321,8 +364,7 @@ class SmartTextProcessor:
     def _extract_currency_data(self, text: str, text_upper: str) -> Dict[str, Any]:
         """استخراج داده‌های تبدیل ارز"""
         # جستجوی الگوی تبدیل ارز انگلیسی
-        pattern = r'(\d+(?:\.\d+)?)\s+([A-Z]{3,4})\s+to\s+([A-Z]{3,4})'
-        match = re.search(pattern, text_upper)
+        match = self._re_currency_en.search(text_upper)
         
         if match:
             return {
@@ -332,8 +374,7 @@ class SmartTextProcessor:
             }
         
         # جستجوی الگوی تبدیل ارز فارسی
-        persian_pattern = r'(\d+(?:\.\d+)?)\s+(.+?)\s+به\s+(.+)'
-        persian_match = re.search(persian_pattern, text)
+        persian_match = self._re_conversion_fa.search(text)
         
         if persian_match:
             amount = float(persian_match.group(1))
@@ -352,11 +393,11 @@ class SmartTextProcessor:
             }
         
         # جستجوی نمادهای ارز در متن
-        currency_symbols = re.findall(self.currency_patterns['symbols'], text_upper)
-        crypto_symbols = re.findall(self.currency_patterns['crypto'], text_upper)
+        currency_symbols = self._re_currency_symbols.findall(text_upper)
+        crypto_symbols = self._re_currency_crypto.findall(text_upper)
         
         # جستجوی عدد
-        numbers = re.findall(r'\d+(?:\.\d+)?', text)
+        numbers = self._re_decimal.findall(text)
         
         return {
             'amount': float(numbers[0]) if numbers else 1.0,
@@ -421,8 +462,7 @@ class SmartTextProcessor:
     def _extract_unit_data(self, text: str, text_lower: str, unit_type: str) -> Dict[str, Any]:
         """استخراج داده‌های تبدیل واحد"""
         # جستجوی الگوی تبدیل واحد انگلیسی
-        pattern = r'(\d+(?:\.\d+)?)\s+(\w+)\s+to\s+(\w+)'
-        match = re.search(pattern, text_lower)
+        match = self._re_unit_en.search(text_lower)
         
         if match:
             return {
@@ -433,8 +473,7 @@ class SmartTextProcessor:
             }
         
         # جستجوی الگوی تبدیل واحد فارسی
-        persian_pattern = r'(\d+(?:\.\d+)?)\s+(.+?)\s+به\s+(.+)'
-        persian_match = re.search(persian_pattern, text)
+        persian_match = self._re_conversion_fa.search(text)
         
         if persian_match:
             amount = float(persian_match.group(1))
@@ -460,7 +499,7 @@ class SmartTextProcessor:
                 units.append(unit)
         
         # جستجوی عدد
-        numbers = re.findall(r'\d+(?:\.\d+)?', text)
+        numbers = self._re_decimal.findall(text)
         
         return {
             'amount': float(numbers[0]) if numbers else 1.0,
@@ -531,8 +570,8 @@ class SmartTextProcessor:
     def _extract_date_data(self, text: str) -> Dict[str, Any]:
         """استخراج داده‌های تاریخ"""
         # جستجوی الگوهای مختلف تاریخ
-        for pattern in self.date_patterns['gregorian']:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern, regex in self._re_date_gregorian:
+            match = regex.search(text)
             if match:
                 return {
                     'date_string': match.group(0),
@@ -540,8 +579,8 @@ class SmartTextProcessor:
                     'pattern': pattern
                 }
         
-        for pattern in self.date_patterns['persian']:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern, regex in self._re_date_persian:
+            match = regex.search(text)
             if match:
                 return {
                     'date_string': match.group(0),
@@ -558,10 +597,10 @@ class SmartTextProcessor:
     def _extract_price_data(self, text: str, text_upper: str) -> Dict[str, Any]:
         """استخراج داده‌های قیمت"""
         # جستجوی نمادهای سهام
-        stock_symbols = re.findall(self.price_patterns['stocks'], text_upper)
+        stock_symbols = self._re_stocks.findall(text_upper)
         
         # جستجوی نمادهای کریپتو
-        crypto_symbols = re.findall(self.price_patterns['crypto'], text_upper)
+        crypto_symbols = self._re_price_crypto.findall(text_upper)
         
         # جستجوی کالاها
         commodities = []
@@ -0,0 +1,112 @@
+import asyncio
+import functools
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .config import (
+    CACHE_TTL_COMMODITY, CACHE_TTL_CRYPTO, CACHE_TTL_FOREX, CACHE_TTL_HISTORY, CACHE_TTL_STOCK, CACHE_TTL_TGJU,
+    CACHE_TTL_WEATHER,
+)
+
+_async_cache: Dict[str, Tuple[float, Any]] = {}
+# Fetches currently running, shared by concurrent callers of the same key
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+def _is_cacheable(value: Any) -> bool:
+    """Failed lookups ({"success": False} / {"ok": False}) are not cached"""
+    if isinstance(value, dict):
+        return bool(value.get("success", value.get("ok", True)))
+    return value is not None
+
+
+async def _run_once(key: str, fetcher: Callable[[], Awaitable[Any]]) -> Any:
+    """Body of the shared task; always leaves _inflight"""
+    try:
+        return await fetcher()
+    finally:
+        _inflight.pop(key, None)
+
+
+def _mark_retrieved(task: asyncio.Future) -> None:
+    """Avoid 'exception was never retrieved' when every caller was cancelled"""
+    if not task.cancelled():
+        task.exception()
+
+
+async def single_flight(key: str, fetcher: Callable[[], Awaitable[Any]]) -> Any:
+    """Await fetcher() once for all concurrent callers of key, without keeping the result.
+
+    The fetch runs as its own task, so cancelling one caller does not fail the others.
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_run_once(key, fetcher))
+        task.add_done_callback(_mark_retrieved)
+        _inflight[key] = task
+    return await asyncio.shield(task)
+
+
+async def _fetch_and_store(key: str, ttl: int, fetcher: Callable[[], Awaitable[Any]]) -> Any:
+    """Run the fetch and cache a successful result"""
+    value = await fetcher()
+    if _is_cacheable(value):
+        _async_cache[key] = (time.monotonic() + ttl, value)
+    return value
+
+
+async def cached(key: str, ttl: int, fetcher: Callable[[], Awaitable[Any]]) -> Any:
+    """Return the cached value for key, or await fetcher() and keep it for ttl seconds.
+
+    Concurrent misses on the same key wait for a single fetch instead of each
+    hitting the upstream API.
+    """
+    now = time.monotonic()
+    entry = _async_cache.get(key)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+    return await single_flight(key, lambda: _fetch_and_store(key, ttl, fetcher))
+
+
+def async_ttl_cache(ttl: int, key: Optional[Callable[..., str]] = None):
+    """Decorator form of cached(), keyed on the function name plus key(*args, **kwargs).
+
+    Without key, positional and keyword arguments are lowercased and joined; pass
+    key explicitly for methods so that self does not become part of the key.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if key is not None:
+                suffix = key(*args, **kwargs)
+            else:
+                suffix = ":".join([str(a).lower() for a in args] + [f"{k}={v}" for k, v in sorted(kwargs.items())])
+            return await cached(f"{func.__qualname__}:{suffix}", ttl, lambda: func(*args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def memo_by_identity(maxsize: int = 256):
+    """Cache a method(self, result) -> str per result object.
+
+    The TTL cache hands the same dict to every caller within its window, so the
+    formatted text is reused until the fetcher produces a new object. The entry
+    keeps a reference to the result, so its id() cannot be recycled while cached.
+    """
+    def decorator(func):
+        memo: "OrderedDict[int, Tuple[Any, Any]]" = OrderedDict()
+
+        @functools.wraps(func)
+        def wrapper(self, result):
+            hit = memo.get(id(result))
+            if hit is not None and hit[0] is result:
+                memo.move_to_end(id(result))
+                return hit[1]
+            text = func(self, result)
+            memo[id(result)] = (result, text)
+            if len(memo) > maxsize:
+                memo.popitem(last=False)
+            return text
+        return wrapper
+    return decorator
@@ -0,0 +1,25 @@
+"""aiohttp session handling shared by the async services."""
+
+from typing import Optional
+
+import aiohttp
+
+
+class SharedSessionMixin:
+    """Use the HTTP session injected by the bot (``self.session``), or create one on first use.
+
+    A session created here is also kept in ``_own_session``, so the service knows it owns it.
+    """
+
+    session: Optional[aiohttp.ClientSession] = None
+    _own_session: Optional[aiohttp.ClientSession] = None
+
+    def _new_session(self) -> aiohttp.ClientSession:
+        """Session to create when none was injected; override to tune the connector"""
+        return aiohttp.ClientSession()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, creating one if none was injected"""
+        if self.session is None or self.session.closed:
+            self.session = self._own_session = self._new_session()
+        return self.session
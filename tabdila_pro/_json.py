@@ -0,0 +1,8 @@
+"""Fast JSON helpers shared by the services (orjson; loads also accepts bytes)."""
+
+from orjson import dumps as _orjson_dumps, loads as json_loads
+
+
+def json_dumps(obj) -> str:
+    """Serialize obj to a str, for the text cache columns"""
+    return _orjson_dumps(obj).decode()
@@ -7,6 +7,17 @@ TSETMC_URL = "http://www.tsetmc.com/tsev2/data/MarketWatchInit.aspx"
 
 # Caching
 CACHE_TIME_SECONDS = int(os.getenv("TABDILA_CACHE_SECONDS", "300"))
+# Optional shared cache for the scraped price sources (needs the redis package); SQLite when empty
+REDIS_URL = os.getenv("REDIS_URL", "")
+
+# Per-asset TTLs for the bot's async cache (seconds)
+CACHE_TTL_CRYPTO = 30
+CACHE_TTL_FOREX = 300
+CACHE_TTL_TGJU = 60
+CACHE_TTL_WEATHER = 600
+CACHE_TTL_COMMODITY = 300
+CACHE_TTL_STOCK = 60
+CACHE_TTL_HISTORY = 3600
 
 # Networking
 DEFAULT_TIMEOUT = 8
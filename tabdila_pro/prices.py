@@ -1,9 +1,15 @@
 import requests
 from bs4 import BeautifulSoup
 from typing import Dict, Any
+
+from ._json import json_loads
 from .config import TGJU_URL, TSETMC_URL, CACHE_TIME_SECONDS, DEFAULT_TIMEOUT, USER_AGENT
 from .cache import get_cache, set_cache
 
+# Shared session so repeated fetches (run in worker threads by the bot) reuse keep-alive connections
+_session = requests.Session()
+_session.headers.update({"User-Agent": USER_AGENT})
+
 
 def _safe_result(ok: bool, payload: Dict[str, Any] | None = None, error: str | None = None) -> Dict[str, Any]:
     if ok:
@@ -17,8 +23,8 @@ def get_tgju_prices() -> Dict[str, Any]:
     if cached:
         return cached
     try:
-        res = requests.get(TGJU_URL, timeout=DEFAULT_TIMEOUT, headers={"User-Agent": USER_AGENT})
-        data = res.json().get("data", {})
+        res = _session.get(TGJU_URL, timeout=DEFAULT_TIMEOUT)
+        data = json_loads(res.content).get("data", {})
         result = {
             "gold": data.get("mesghal_24", {}).get("p"),
             "coin": data.get("sekeb", {}).get("p"),
@@ -39,7 +45,7 @@ def get_tsetmc_raw() -> Dict[str, Any]:
     if cached:
         return cached
     try:
-        res = requests.get(TSETMC_URL, timeout=DEFAULT_TIMEOUT, headers={"User-Agent": USER_AGENT})
+        res = _session.get(TSETMC_URL, timeout=DEFAULT_TIMEOUT)
         wrapped = _safe_result(True, {"raw": res.text})
         set_cache(cache_key, wrapped, CACHE_TIME_SECONDS)
         return wrapped
@@ -68,7 +74,7 @@ def fetch_mofid_basket() -> Dict[str, Any]:
         return cached
     try:
         url = "https://www.tgju.org/"
-        res = requests.get(url, headers={"User-Agent": USER_AGENT}, timeout=DEFAULT_TIMEOUT)
+        res = _session.get(url, timeout=DEFAULT_TIMEOUT)
         res.raise_for_status()
         soup = BeautifulSoup(res.text, "html.parser")
 
@@ -138,9 +144,9 @@ def get_popular_crypto() -> Dict[str, Any]:
     if cached:
         return cached
     try:
-        res = requests.get(_POPULAR_API, timeout=DEFAULT_TIMEOUT, headers={"User-Agent": USER_AGENT})
+        res = _session.get(_POPULAR_API, timeout=DEFAULT_TIMEOUT)
         res.raise_for_status()
-        data = res.json()
+        data = json_loads(res.content)
 
         popular_list = []
         for coin_id, info in data.items():
@@ -1,5 +1,7 @@
 import requests
 from typing import Dict, Any
+
+from ._json import json_loads
 from .config import OPENWEATHER_API_KEY, CACHE_TIME_SECONDS, DEFAULT_TIMEOUT, USER_AGENT
 from .cache import get_cache, set_cache
 
@@ -23,7 +25,7 @@ def get_weather(city: str = "Tehran", lang: str = "fa") -> Dict[str, Any]:
             f"&lang={lang}&units=metric"
         )
         res = requests.get(url, timeout=DEFAULT_TIMEOUT, headers={"User-Agent": USER_AGENT})
-        data = res.json()
+        data = json_loads(res.content)
         result = {
             "city": data.get("name", city),
             "temp_c": data.get("main", {}).get("temp"),
@@ -1,17 +1,21 @@
 import requests
 import json
 import asyncio
-import aiohttp
 from typing import Dict, List, Optional, Any
 import logging
 
+from tabdila_pro._cache import single_flight
+from tabdila_pro._http import SharedSessionMixin
+from tabdila_pro._json import json_dumps, json_loads
+
 logger = logging.getLogger(__name__)
 
-class TranslationService:
+class TranslationService(SharedSessionMixin):
     """Multi-language translation service"""
     
     def __init__(self, database):
         self.db = database
+        
         self.api_keys = {
             "google": "",  # Add your Google Translate API key
             "microsoft": "",  # Add your Microsoft Translator API key
@@ -51,6 +55,15 @@ class TranslationService:
     
     async def translate_text(self, text: str, target_lang: str, source_lang: str = "auto") -> Dict[str, Any]:
         """Translate text to target language"""
+        # Identical concurrent requests share one lookup; results are only kept in the DB cache,
+        # since keying an in-process cache on free text would grow without bound
+        return await single_flight(
+            f"translate:{source_lang}:{target_lang}:{text}",
+            lambda: self._translate_text(text, target_lang, source_lang)
+        )
+    
+    async def _translate_text(self, text: str, target_lang: str, source_lang: str) -> Dict[str, Any]:
+        """Translate text to target language (DB cache, then each service in turn)"""
         if not text.strip():
             return {
                 "success": False,
@@ -59,11 +72,11 @@ class TranslationService:
         
         # Check cache
         cache_key = f"translate_{hash(text)}_{source_lang}_{target_lang}"
-        cached_translation = self.db.get_from_cache(cache_key)
+        cached_translation = await self.db.aget_from_cache(cache_key)
         
         if cached_translation:
             try:
-                return json.loads(cached_translation)
+                return json_loads(cached_translation)
             except json.JSONDecodeError:
                 pass
         
@@ -79,10 +92,10 @@ class TranslationService:
                 result = await service_func(text, target_lang, source_lang)
                 if result["success"]:
                     # Cache for 24 hours
-                    self.db.add_to_cache(cache_key, json.dumps(result), 1440)
+                    await self.db.aadd_to_cache(cache_key, json_dumps(result), 1440)
                     return result
             except Exception as e:
-                logger.warning(f"Translation service failed: {e}")
+                logger.warning("Translation service failed: %s", e)
                 continue
         
         return {
@@ -108,21 +121,21 @@ class TranslationService:
         if source_lang != "auto":
             params["source"] = source_lang
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if "data" in data and "translations" in data["data"]:
-                        translation = data["data"]["translations"][0]
-                        
-                        return {
-                            "success": True,
-                            "original_text": text,
-                            "translated_text": translation["translatedText"],
-                            "source_lang": translation.get("detectedSourceLanguage", source_lang),
-                            "target_lang": target_lang,
-                            "source": "google"
-                        }
+        session = self._get_session()
+        async with session.post(url, params=params) as response:
+            if response.status == 200:
+                data = json_loads(await response.read())
+                if "data" in data and "translations" in data["data"]:
+                    translation = data["data"]["translations"][0]
+
+                    return {
+                        "success": True,
+                        "original_text": text,
+                        "translated_text": translation["translatedText"],
+                        "source_lang": translation.get("detectedSourceLanguage", source_lang),
+                        "target_lang": target_lang,
+                        "source": "google"
+                    }
         
         return {"success": False, "error": "Google Translate API failed"}
     
@@ -142,21 +155,21 @@ class TranslationService:
         
         body = [{"text": text}]
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, json=body) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if data and len(data) > 0:
-                        result = data[0]
-                        
-                        return {
-                            "success": True,
-                            "original_text": text,
-                            "translated_text": result["translations"][0]["text"],
-                            "source_lang": result["detectedLanguage"].get("language", source_lang),
-                            "target_lang": target_lang,
-                            "source": "microsoft"
-                        }
+        session = self._get_session()
+        async with session.post(url, headers=headers, json=body) as response:
+            if response.status == 200:
+                data = json_loads(await response.read())
+                if data and len(data) > 0:
+                    result = data[0]
+
+                    return {
+                        "success": True,
+                        "original_text": text,
+                        "translated_text": result["translations"][0]["text"],
+                        "source_lang": result["detectedLanguage"].get("language", source_lang),
+                        "target_lang": target_lang,
+                        "source": "microsoft"
+                    }
         
         return {"success": False, "error": "Microsoft Translator API failed"}
     
@@ -170,19 +183,19 @@ class TranslationService:
             "format": "text"
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=data) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    
-                    return {
-                        "success": True,
-                        "original_text": text,
-                        "translated_text": result["translatedText"],
-                        "source_lang": result.get("detectedLanguage", source_lang),
-                        "target_lang": target_lang,
-                        "source": "libre"
-                    }
+        session = self._get_session()
+        async with session.post(url, json=data) as response:
+            if response.status == 200:
+                result = json_loads(await response.read())
+
+                return {
+                    "success": True,
+                    "original_text": text,
+                    "translated_text": result["translatedText"],
+                    "source_lang": result.get("detectedLanguage", source_lang),
+                    "target_lang": target_lang,
+                    "source": "libre"
+                }
         
         return {"success": False, "error": "LibreTranslate API failed"}
     
@@ -1,18 +1,22 @@
 import requests
 import json
 import asyncio
-import aiohttp
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 import logging
 
+from tabdila_pro._cache import async_ttl_cache, memo_by_identity, CACHE_TTL_WEATHER
+from tabdila_pro._http import SharedSessionMixin
+from tabdila_pro._json import json_dumps, json_loads
+
 logger = logging.getLogger(__name__)
 
-class WeatherService:
+class WeatherService(SharedSessionMixin):
     """Weather forecast and current conditions service"""
     
     def __init__(self, database):
         self.db = database
+        
         self.api_keys = {
             "openweather": "",  # Add your OpenWeather API key
             "weatherapi": ""  # Add your WeatherAPI key
@@ -30,15 +34,16 @@ class WeatherService:
             "fog": "🌫️", "haze": "🌫️", "dust": "🌪️", "sand": "🌪️"
         }
     
+    @async_ttl_cache(CACHE_TTL_WEATHER, key=lambda self, location, units="metric": f"{location.strip().lower()}:{units}")
     async def get_current_weather(self, location: str, units: str = "metric") -> Dict[str, Any]:
         """Get current weather for a location"""
         # Check cache
         cache_key = f"weather_current_{location}_{units}_{datetime.now().strftime('%Y%m%d%H')}"
-        cached_weather = self.db.get_from_cache(cache_key)
+        cached_weather = await self.db.aget_from_cache(cache_key)
         
         if cached_weather:
             try:
-                return json.loads(cached_weather)
+                return json_loads(cached_weather)
             except json.JSONDecodeError:
                 pass
         
@@ -48,20 +53,20 @@ class WeatherService:
                 result = await self._get_openweather_current(location, units)
                 if result["success"]:
                     # Cache for 1 hour
-                    self.db.add_to_cache(cache_key, json.dumps(result), 60)
+                    await self.db.aadd_to_cache(cache_key, json_dumps(result), 60)
                     return result
             except Exception as e:
-                logger.warning(f"OpenWeather API failed: {e}")
+                logger.warning("OpenWeather API failed: %s", e)
         
         # Try WeatherAPI as fallback
         if self.api_keys["weatherapi"]:
             try:
                 result = await self._get_weatherapi_current(location, units)
                 if result["success"]:
-                    self.db.add_to_cache(cache_key, json.dumps(result), 60)
+                    await self.db.aadd_to_cache(cache_key, json_dumps(result), 60)
                     return result
             except Exception as e:
-                logger.warning(f"WeatherAPI failed: {e}")
+                logger.warning("WeatherAPI failed: %s", e)
         
         return {
             "success": False,
@@ -78,30 +83,30 @@ class WeatherService:
             "units": units
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    return {
-                        "success": True,
-                        "location": data["name"],
-                        "country": data["sys"]["country"],
-                        "temperature": data["main"]["temp"],
-                        "feels_like": data["main"]["feels_like"],
-                        "humidity": data["main"]["humidity"],
-                        "pressure": data["main"]["pressure"],
-                        "description": data["weather"][0]["description"],
-                        "main": data["weather"][0]["main"],
-                        "wind_speed": data["wind"]["speed"],
-                        "wind_direction": data["wind"].get("deg", 0),
-                        "visibility": data.get("visibility", 0) / 1000,  # Convert to km
-                        "cloudiness": data["clouds"]["all"],
-                        "sunrise": datetime.fromtimestamp(data["sys"]["sunrise"]).isoformat(),
-                        "sunset": datetime.fromtimestamp(data["sys"]["sunset"]).isoformat(),
-                        "timestamp": datetime.now().isoformat(),
-                        "source": "openweather"
-                    }
+        session = self._get_session()
+        async with session.get(url, params=params) as response:
+            if response.status == 200:
+                data = json_loads(await response.read())
+
+                return {
+                    "success": True,
+                    "location": data["name"],
+                    "country": data["sys"]["country"],
+                    "temperature": data["main"]["temp"],
+                    "feels_like": data["main"]["feels_like"],
+                    "humidity": data["main"]["humidity"],
+                    "pressure": data["main"]["pressure"],
+                    "description": data["weather"][0]["description"],
+                    "main": data["weather"][0]["main"],
+                    "wind_speed": data["wind"]["speed"],
+                    "wind_direction": data["wind"].get("deg", 0),
+                    "visibility": data.get("visibility", 0) / 1000,  # Convert to km
+                    "cloudiness": data["clouds"]["all"],
+                    "sunrise": datetime.fromtimestamp(data["sys"]["sunrise"]).isoformat(),
+                    "sunset": datetime.fromtimestamp(data["sys"]["sunset"]).isoformat(),
+                    "timestamp": datetime.now().isoformat(),
+                    "source": "openweather"
+                }
         
         return {"success": False, "error": "OpenWeather API failed"}
     
@@ -114,30 +119,30 @@ class WeatherService:
             "aqi": "yes"
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    return {
-                        "success": True,
-                        "location": data["location"]["name"],
-                        "country": data["location"]["country"],
-                        "temperature": data["current"]["temp_c"],
-                        "feels_like": data["current"]["feelslike_c"],
-                        "humidity": data["current"]["humidity"],
-                        "pressure": data["current"]["pressure_mb"],
-                        "description": data["current"]["condition"]["text"],
-                        "main": data["current"]["condition"]["text"],
-                        "wind_speed": data["current"]["wind_kph"],
-                        "wind_direction": data["current"]["wind_degree"],
-                        "visibility": data["current"]["vis_km"],
-                        "cloudiness": data["current"]["cloud"],
-                        "uv_index": data["current"]["uv"],
-                        "air_quality": data["current"].get("air_quality", {}),
-                        "timestamp": datetime.now().isoformat(),
-                        "source": "weatherapi"
-                    }
+        session = self._get_session()
+        async with session.get(url, params=params) as response:
+            if response.status == 200:
+                data = json_loads(await response.read())
+
+                return {
+                    "success": True,
+                    "location": data["location"]["name"],
+                    "country": data["location"]["country"],
+                    "temperature": data["current"]["temp_c"],
+                    "feels_like": data["current"]["feelslike_c"],
+                    "humidity": data["current"]["humidity"],
+                    "pressure": data["current"]["pressure_mb"],
+                    "description": data["current"]["condition"]["text"],
+                    "main": data["current"]["condition"]["text"],
+                    "wind_speed": data["current"]["wind_kph"],
+                    "wind_direction": data["current"]["wind_degree"],
+                    "visibility": data["current"]["vis_km"],
+                    "cloudiness": data["current"]["cloud"],
+                    "uv_index": data["current"]["uv"],
+                    "air_quality": data["current"].get("air_quality", {}),
+                    "timestamp": datetime.now().isoformat(),
+                    "source": "weatherapi"
+                }
         
         return {"success": False, "error": "WeatherAPI failed"}
     
@@ -145,11 +150,11 @@ class WeatherService:
         """Get weather forecast"""
         # Check cache
         cache_key = f"weather_forecast_{location}_{days}_{units}_{datetime.now().strftime('%Y%m%d%H')}"
-        cached_forecast = self.db.get_from_cache(cache_key)
+        cached_forecast = await self.db.aget_from_cache(cache_key)
         
         if cached_forecast:
             try:
-                return json.loads(cached_forecast)
+                return json_loads(cached_forecast)
             except json.JSONDecodeError:
                 pass
         
@@ -159,10 +164,10 @@ class WeatherService:
                 result = await self._get_openweather_forecast(location, days, units)
                 if result["success"]:
                     # Cache for 3 hours
-                    self.db.add_to_cache(cache_key, json.dumps(result), 180)
+                    await self.db.aadd_to_cache(cache_key, json_dumps(result), 180)
                     return result
             except Exception as e:
-                logger.warning(f"OpenWeather forecast API failed: {e}")
+                logger.warning("OpenWeather forecast API failed: %s", e)
         
         return {
             "success": False,
@@ -179,53 +184,53 @@ class WeatherService:
             "units": units
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    # Process forecast data
-                    forecast_days = {}
-                    for item in data["list"]:
-                        date = datetime.fromtimestamp(item["dt"]).date()
-                        date_str = date.isoformat()
-                        
-                        if date_str not in forecast_days:
-                            forecast_days[date_str] = {
-                                "date": date_str,
-                                "temperatures": [],
-                                "descriptions": [],
-                                "humidity": [],
-                                "wind_speed": []
-                            }
+        session = self._get_session()
+        async with session.get(url, params=params) as response:
+            if response.status == 200:
+                data = json_loads(await response.read())
+
+                # Process forecast data
+                forecast_days = {}
+                for item in data["list"]:
+                    date = datetime.fromtimestamp(item["dt"]).date()
+                    date_str = date.isoformat()
+
+                    if date_str not in forecast_days:
+                        forecast_days[date_str] = {
+                            "date": date_str,
+                            "temperatures": [],
+                            "descriptions": [],
+                            "humidity": [],
+                            "wind_speed": []
+                        }
                         
-                        forecast_days[date_str]["temperatures"].append(item["main"]["temp"])
-                        forecast_days[date_str]["descriptions"].append(item["weather"][0]["description"])
-                        forecast_days[date_str]["humidity"].append(item["main"]["humidity"])
-                        forecast_days[date_str]["wind_speed"].append(item["wind"]["speed"])
+                    forecast_days[date_str]["temperatures"].append(item["main"]["temp"])
+                    forecast_days[date_str]["descriptions"].append(item["weather"][0]["description"])
+                    forecast_days[date_str]["humidity"].append(item["main"]["humidity"])
+                    forecast_days[date_str]["wind_speed"].append(item["wind"]["speed"])
                     
-                    # Calculate daily averages
-                    daily_forecast = []
-                    for date_str, day_data in list(forecast_days.items())[:days]:
-                        daily_forecast.append({
-                            "date": date_str,
-                            "min_temp": min(day_data["temperatures"]),
-                            "max_temp": max(day_data["temperatures"]),
-                            "avg_temp": sum(day_data["temperatures"]) / len(day_data["temperatures"]),
-                            "description": max(set(day_data["descriptions"]), key=day_data["descriptions"].count),
-                            "humidity": sum(day_data["humidity"]) / len(day_data["humidity"]),
-                            "wind_speed": sum(day_data["wind_speed"]) / len(day_data["wind_speed"])
-                        })
+                # Calculate daily averages
+                daily_forecast = []
+                for date_str, day_data in list(forecast_days.items())[:days]:
+                    daily_forecast.append({
+                        "date": date_str,
+                        "min_temp": min(day_data["temperatures"]),
+                        "max_temp": max(day_data["temperatures"]),
+                        "avg_temp": sum(day_data["temperatures"]) / len(day_data["temperatures"]),
+                        "description": max(set(day_data["descriptions"]), key=day_data["descriptions"].count),
+                        "humidity": sum(day_data["humidity"]) / len(day_data["humidity"]),
+                        "wind_speed": sum(day_data["wind_speed"]) / len(day_data["wind_speed"])
+                    })
                     
-                    return {
-                        "success": True,
-                        "location": data["city"]["name"],
-                        "country": data["city"]["country"],
-                        "forecast": daily_forecast,
-                        "days": len(daily_forecast),
-                        "timestamp": datetime.now().isoformat(),
-                        "source": "openweather"
-                    }
+                return {
+                    "success": True,
+                    "location": data["city"]["name"],
+                    "country": data["city"]["country"],
+                    "forecast": daily_forecast,
+                    "days": len(daily_forecast),
+                    "timestamp": datetime.now().isoformat(),
+                    "source": "openweather"
+                }
         
         return {"success": False, "error": "OpenWeather forecast API failed"}
     
@@ -250,6 +255,7 @@ class WeatherService:
         else:
             return "🌤️"  # Default weather emoji
     
+    @memo_by_identity()
     def format_weather_result(self, result: Dict[str, Any]) -> str:
         """Format weather result for display"""
         if not result["success"]: